@@ -1,16 +1,24 @@
 from django.contrib import admin
-from .models import UserModel, AuditLog
+from core.db.routers import ReplicaChangelistMixin
+from .models import UserModel, AuditLog, EmailOutbox
 
 
 # Register your models here.
 @admin.register(UserModel)
-class UserModelAdmin(admin.ModelAdmin):
+class UserModelAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = ("email", "first_name", "last_name", "is_active")
     filter_horizontal = ('groups', 'user_permissions')
     list_filter = ("role",)
 
 
 @admin.register(AuditLog)
-class AuditLogAdmin(admin.ModelAdmin):
-    list_display = ("user", "action", "details", "created_at")
-    
\ No newline at end of file
+class AuditLogAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
+    list_display = ("user", "action", "target_type", "target_id", "details", "created_at")
+    list_filter = ("action", "target_type")
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
+    list_display = ("subject", "status", "attempts", "created_at", "sent_at")
+    list_filter = ("status",)
+    exclude = ("body",)
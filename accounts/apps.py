@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        # accounts.schema is imported by core.openapi.build_schema, only schema generation needs it
+        from . import signals  # noqa: F401
@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from .models import UserModel
+
+
+# Claims copied from the user into every token issued at login
+USER_CLAIMS = ('email', 'role', 'is_active', 'first_name', 'last_name')
+
+
+def add_user_claims(token, user):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def user_state_key(user_id):
+    return f'auth:user-state:{user_id}'
+
+
+# Role and active flag of a user, cached for JWT_USER_STATE_TTL seconds; None once the user is deleted
+def user_state(user_id):
+    key = user_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        # Deleted users are cached as {} so revoked tokens do not hit the database either
+        state = UserModel.objects.filter(pk=user_id).values('is_active', 'role').first() or {}
+        cache.set(key, state, settings.JWT_USER_STATE_TTL)
+    return state or None
+
+
+# Drop the cached state so the next request sees the change (called from the UserModel signals)
+def invalidate_user_state(user_id):
+    cache.delete(user_state_key(user_id))
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user built from the access token claims instead of a UserModel row.
+    Role and active flag come from the cached user state, so role changes and deactivations
+    apply to tokens that were issued before them.
+    """
+    def __init__(self, token, state):
+        super().__init__(token)
+        self.state = state
+
+    def __str__(self):
+        # Same as UserModel.__str__, audit entries record the user this way
+        return f"{self.first_name} {self.last_name}"
+
+    @property
+    def is_active(self):
+        return self.state['is_active']
+
+    @cached_property
+    def role(self):
+        return self.state['role']
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def first_name(self):
+        return self.token.get('first_name', '')
+
+    @cached_property
+    def last_name(self):
+        return self.token.get('last_name', '')
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the user claims embedded at login instead of loading the user on every request.
+    Deactivated, deleted and re-roled users are caught through the short-lived user state cache.
+    Tokens issued before the claims were added are still authenticated against the database.
+    """
+    def get_user(self, validated_token):
+        if 'role' not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            return super().get_user(validated_token)
+
+        state = user_state(user_id)
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not state['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return ClaimsUser(validated_token, state)
@@ -0,0 +1,75 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from .models import EmailOutbox, EmailStatus
+from utils import email_logger
+
+
+# Claim due pending emails by pushing their availability past the lease period
+def claim_emails(limit, ids=None):
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = EmailOutbox.objects.select_for_update(skip_locked=True).filter(status=EmailStatus.PENDING, available_at__lte=now)
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        emails = list(queryset.order_by('available_at')[:limit])
+        if emails:
+            EmailOutbox.objects.filter(pk__in=[email.pk for email in emails]).update(
+                available_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+            )
+    return emails
+
+
+def _schedule_retry(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = EmailStatus.FAILED
+        # Never delivered, but like sent emails the body may carry reset tokens or default passwords
+        email.body = ''
+    else:
+        # Exponential back-off between attempts, capped at an hour
+        email.available_at = timezone.now() + timedelta(seconds=min(60 * 2 ** email.attempts, 3600))
+    email.save(update_fields=['attempts', 'last_error', 'status', 'available_at', 'body'])
+
+
+# Send claimed emails over a single SMTP connection, returns the connection for reuse
+def send_emails(emails, connection=None):
+    sent = []
+    try:
+        for email in emails:
+            try:
+                if connection is None:
+                    connection = get_connection(timeout=settings.EMAIL_TIMEOUT)
+                    connection.open()
+                connection.send_messages([email.to_message()])
+                sent.append(email.pk)
+            except Exception as e:
+                email_logger.error(f"Error sending email {email.pk} (attempt {email.attempts + 1}): {e}")
+                _schedule_retry(email, e)
+                # Reconnect for the next message, the failure may have broken the connection
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+                connection = None
+    finally:
+        if sent:
+            # The body is cleared once delivered since it may carry reset tokens or default passwords
+            EmailOutbox.objects.filter(pk__in=sent).update(status=EmailStatus.SENT, sent_at=timezone.now(), body='')
+    return connection
+
+
+# Outbox counts per status and age of the oldest pending email
+def email_outbox_stats():
+    counts = dict(EmailOutbox.objects.values_list('status').annotate(total=Count('pk')).order_by())
+    oldest = EmailOutbox.objects.filter(status=EmailStatus.PENDING).aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        "pending": counts.get(EmailStatus.PENDING, 0),
+        "sent": counts.get(EmailStatus.SENT, 0),
+        "failed": counts.get(EmailStatus.FAILED, 0),
+        "oldest_pending_age_seconds": round((timezone.now() - oldest).total_seconds(), 3) if oldest else 0,
+    }
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from accounts.tokens import blacklist_jti, cache_blacklist_enabled
+
+
+class Command(BaseCommand):
+    help = "Copy the refresh tokens blacklisted in the database into the cache blacklist used by CachedRefreshToken"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--purge', action='store_true', help='Delete the OutstandingToken and BlacklistedToken rows once copied')
+
+    def handle(self, *args, **options):
+        if not cache_blacklist_enabled():
+            # The copy would vanish with this process, and CachedRefreshToken keeps reading the tables
+            raise CommandError("The default cache is not shared between processes (set REDIS_URL), the blacklist stays in the database")
+        now = timezone.now()
+        copied = 0
+        # Expired tokens are rejected on their exp claim anyway, only live ones need a blacklist entry
+        rows = BlacklistedToken.objects.filter(token__expires_at__gt=now).values_list('token__jti', 'token__expires_at')
+        for jti, expires_at in rows.iterator(chunk_size=2000):
+            copied += blacklist_jti(jti, expires_at.timestamp())
+        self.stdout.write(f"Copied {copied} blacklisted tokens into the cache")
+
+        if options['purge']:
+            # Blacklisted rows cascade with their outstanding token
+            deleted, _ = OutstandingToken.objects.all().delete()
+            self.stdout.write(f"Deleted {deleted} token blacklist rows")
+        self.stdout.write(self.style.SUCCESS("Token blacklist migrated"))
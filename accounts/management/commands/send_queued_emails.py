@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from accounts.emails import claim_emails, email_outbox_stats, send_emails
+import time
+
+
+class Command(BaseCommand):
+    help = "Send pending emails from the email outbox in batches over a reused SMTP connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.EMAIL_DISPATCH_BATCH_SIZE, help='Emails claimed per batch')
+        parser.add_argument('--poll-interval', type=float, default=10.0, help='Seconds to sleep when no email is due')
+        parser.add_argument('--once', action='store_true', help='Exit once no due emails are left instead of polling')
+
+    def handle(self, *args, **options):
+        connection = None
+        processed = 0
+        try:
+            while True:
+                emails = claim_emails(options['batch_size'])
+                if not emails:
+                    if connection is not None:
+                        connection.close()
+                        connection = None
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                connection = send_emails(emails, connection)
+                processed += len(emails)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if connection is not None:
+                connection.close()
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} emails: {email_outbox_stats()}"))
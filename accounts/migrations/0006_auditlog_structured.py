@@ -0,0 +1,96 @@
+# Generated by Django 4.2 on 2026-10-19 18:12
+
+from collections import Counter
+from django.db import migrations, models
+import re
+
+
+# (action, pattern over the old free-text details, target type, group holding the target id)
+DETAILS = {
+    'CREATE E-MANDATE': (re.compile(r'for (?P<accountNumber>\S+) - (?P<payerName>.*)$'), 'ACCOUNT', 'accountNumber'),
+    'CREATE PAPER MANDATE': (re.compile(r'for (?P<accountNumber>\S+) - (?P<payerName>.*)$'), 'ACCOUNT', 'accountNumber'),
+    'INITIATE BALANCE ENQUIRY MANDATE': (re.compile(r'for (?P<accountNumber>\S+) - (?P<payerName>.*)$'), 'ACCOUNT', 'accountNumber'),
+    'UPDATE MANDATE STATUS': (re.compile(r'for (?P<mandateCode>\S+) - (?P<accountNumber>\S+) to (?P<mandateStatus>\S*)$'), 'MANDATE', 'mandateCode'),
+    'PROCESS MANDATE': (re.compile(r'code (?P<mandateCode>\S+) processed to (?P<workflowStatus>\S*)$'), 'MANDATE', 'mandateCode'),
+}
+# Events where the actor is also the target
+SELF_TARGETED = {'USER LOGIN', 'PASSWORD RESET REQUEST', 'CREATE NEW PASSWORD'}
+
+
+# Fill the structured fields of the events logged before they existed: the actor from the email
+# (or, for the mandate views, the unique full name) they recorded and the target from the details
+def backfill_audit_logs(apps, schema_editor):
+    AuditLog = apps.get_model('accounts', 'AuditLog')
+    UserModel = apps.get_model('accounts', 'UserModel')
+    users = list(UserModel.objects.values_list('id', 'email', 'first_name', 'last_name'))
+    by_email = {email: (pk, email) for pk, email, _, _ in users}
+    names = Counter(f'{first} {last}' for _, _, first, last in users)
+    by_name = {f'{first} {last}': (pk, email) for pk, email, first, last in users if names[f'{first} {last}'] == 1}
+    fields = ['user', 'actor_id', 'target_type', 'target_id', 'metadata']
+    batch = []
+    for log in AuditLog.objects.filter(actor_id__isnull=True, target_type='').iterator(chunk_size=2000):
+        actor = by_email.get(log.user) or by_name.get(log.user)
+        if actor:
+            log.actor_id, log.user = actor
+        if log.action in DETAILS:
+            pattern, target_type, group = DETAILS[log.action]
+            if match := pattern.search(log.details):
+                log.metadata = match.groupdict()
+                log.target_type, log.target_id = target_type, match[group]
+        elif log.action in SELF_TARGETED and actor:
+            log.target_type, log.target_id = 'USER', str(actor[0])
+        elif log.action == 'CREATE USER' and (match := re.search(r'created (\S+) account', log.details)) and match[1] in by_email:
+            log.target_type, log.target_id = 'USER', str(by_email[match[1]][0])
+        batch.append(log)
+        if len(batch) == 2000:
+            AuditLog.objects.bulk_update(batch, fields)
+            batch = []
+    AuditLog.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='actor_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='metadata',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='target_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='target_type',
+            field=models.CharField(blank=True, choices=[('USER', 'User'), ('BILLER', 'Biller'), ('PRODUCT', 'Product'), ('MANDATE', 'Mandate'), ('ACCOUNT', 'Account')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('USER LOGIN', 'User Login'), ('CREATE USER', 'Create User'), ('UPDATE USER', 'Update User'), ('DELETE USER', 'Delete User'), ('PASSWORD RESET REQUEST', 'Password Reset Request'), ('CREATE NEW PASSWORD', 'Create New Password'), ('CREATE BILLER', 'Create Biller'), ('UPDATE BILLER', 'Update Biller'), ('CREATE PRODUCT', 'Create Product'), ('DISABLE PRODUCT', 'Disable Product'), ('CREATE PAPER MANDATE', 'Create Paper Mandate'), ('CREATE E-MANDATE', 'Create E-Mandate'), ('INITIATE BALANCE ENQUIRY MANDATE', 'Initiate Balance Enquiry Mandate'), ('UPDATE MANDATE STATUS', 'Update Mandate Status'), ('PROCESS MANDATE', 'Process Mandate')], max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['actor_id', '-created_at'], name='audit_actor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['user', '-created_at'], name='audit_actor_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['target_type', 'target_id', '-created_at'], name='audit_target_idx'),
+        ),
+        migrations.RunPython(backfill_audit_logs, migrations.RunPython.noop),
+    ]
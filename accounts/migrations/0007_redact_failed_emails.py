@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+# Emails that gave up before the body was cleared on failure still hold it
+def redact_failed_emails(apps, schema_editor):
+    EmailOutbox = apps.get_model('accounts', 'EmailOutbox')
+    EmailOutbox.objects.filter(status='FAILED').exclude(body='').update(body='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_auditlog_structured'),
+    ]
+
+    operations = [
+        migrations.RunPython(redact_failed_emails, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.mail import EmailMultiAlternatives
+from django.utils import timezone
 from uuid import uuid4
 from .managers import UserModelManager
 
@@ -10,6 +13,38 @@ class Role(models.TextChoices):
     CREDIT = 'CREDIT', "Credit"
     IT = 'IT', "IT"
     OTHERS = 'OTHERS', "Others"
+
+
+class EmailStatus(models.TextChoices):
+    PENDING = 'PENDING', "Pending"
+    SENT = 'SENT', "Sent"
+    FAILED = 'FAILED', "Failed"
+
+
+class AuditAction(models.TextChoices):
+    USER_LOGIN = 'USER LOGIN', "User Login"
+    CREATE_USER = 'CREATE USER', "Create User"
+    UPDATE_USER = 'UPDATE USER', "Update User"
+    DELETE_USER = 'DELETE USER', "Delete User"
+    PASSWORD_RESET_REQUEST = 'PASSWORD RESET REQUEST', "Password Reset Request"
+    CREATE_NEW_PASSWORD = 'CREATE NEW PASSWORD', "Create New Password"
+    CREATE_BILLER = 'CREATE BILLER', "Create Biller"
+    UPDATE_BILLER = 'UPDATE BILLER', "Update Biller"
+    CREATE_PRODUCT = 'CREATE PRODUCT', "Create Product"
+    DISABLE_PRODUCT = 'DISABLE PRODUCT', "Disable Product"
+    CREATE_PAPER_MANDATE = 'CREATE PAPER MANDATE', "Create Paper Mandate"
+    CREATE_E_MANDATE = 'CREATE E-MANDATE', "Create E-Mandate"
+    INITIATE_BALANCE_ENQUIRY = 'INITIATE BALANCE ENQUIRY MANDATE', "Initiate Balance Enquiry Mandate"
+    UPDATE_MANDATE_STATUS = 'UPDATE MANDATE STATUS', "Update Mandate Status"
+    PROCESS_MANDATE = 'PROCESS MANDATE', "Process Mandate"
+
+
+class AuditTarget(models.TextChoices):
+    USER = 'USER', "User"
+    BILLER = 'BILLER', "Biller"
+    PRODUCT = 'PRODUCT', "Product"
+    MANDATE = 'MANDATE', "Mandate"
+    ACCOUNT = 'ACCOUNT', "Account"
     
 
 class UserModel(AbstractUser):
@@ -39,16 +74,54 @@ class AuditLog(models.Model):
     This model will serve as the audit trail to log users activity
     """
     id = models.UUIDField(default=uuid4, unique=True, primary_key=True, editable=False)
+    # The acting user's email; actor_id is empty for users that no longer exist or never did
     user = models.CharField(max_length=255)
-    action = models.CharField(max_length=255)
+    actor_id = models.UUIDField(null=True, blank=True)
+    action = models.CharField(choices=AuditAction.choices, max_length=255)
+    target_type = models.CharField(choices=AuditTarget.choices, max_length=20, blank=True)
+    target_id = models.CharField(max_length=255, blank=True)
     details = models.TextField(blank=True)
+    metadata = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        # Investigations look events up by who acted and by what they acted on
+        indexes = [
+            models.Index(fields=['actor_id', '-created_at'], name='audit_actor_idx'),
+            models.Index(fields=['user', '-created_at'], name='audit_actor_email_idx'),
+            models.Index(fields=['target_type', 'target_id', '-created_at'], name='audit_target_idx'),
+        ]
         verbose_name = 'Audit Log'
         verbose_name_plural = 'Audit Logs'
     
     def __str__(self):
         return f"{self.action} by {self.user} at {self.created_at}"
-    
\ No newline at end of file
+
+
+class EmailOutbox(models.Model):
+    """
+    This model will serve as the durable queue of emails waiting to be sent
+    """
+    id = models.UUIDField(default=uuid4, unique=True, primary_key=True, editable=False)
+    subject = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    recipients = models.JSONField()
+    status = models.CharField(choices=EmailStatus.choices, max_length=20, default=EmailStatus.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'available_at'])]
+        verbose_name = 'Email Outbox'
+        verbose_name_plural = 'Email Outbox'
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
+
+    def to_message(self):
+        return EmailMultiAlternatives(self.subject, self.body, settings.DEFAULT_FROM_EMAIL, self.recipients)
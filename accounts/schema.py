@@ -0,0 +1,6 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+# Document StatelessJWTAuthentication as the same bearer scheme as simplejwt's JWTAuthentication
+class StatelessJWTScheme(SimpleJWTScheme):
+    target_class = 'accounts.authentication.StatelessJWTAuthentication'
@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from django.core.validators import MinLengthValidator
-from .models import UserModel, AuditLog
+from .models import AuditAction, AuditLog, AuditTarget, UserModel
+from .tokens import CachedRefreshToken
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -35,4 +37,32 @@ class PasswordConfirmSerializer(serializers.Serializer):
 class AuditLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = AuditLog
-        fields = ['id', 'user', 'action', 'details', 'created_at']
+        fields = ['id', 'user', 'actor_id', 'action', 'target_type', 'target_id', 'details', 'metadata', 'created_at']
+
+
+class AuditLogQuerySerializer(serializers.Serializer):
+    actor = serializers.UUIDField(required=False, help_text='ID of the user who acted')
+    actor_email = serializers.EmailField(required=False, help_text='Email of the user who acted')
+    action = serializers.ChoiceField(choices=AuditAction.choices, required=False)
+    target_type = serializers.ChoiceField(choices=AuditTarget.choices, required=False)
+    target_id = serializers.CharField(max_length=255, required=False, help_text='Requires target_type')
+    mandate_code = serializers.CharField(max_length=255, required=False, help_text='Events on this mandate')
+    account_number = serializers.CharField(min_length=10, max_length=10, required=False, help_text="Events on this account and its mandates")
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if 'target_id' in attrs and 'target_type' not in attrs:
+            raise serializers.ValidationError("target_id requires target_type")
+        if len({'target_type', 'mandate_code', 'account_number'} & attrs.keys()) > 1:
+            raise serializers.ValidationError("Use only one of target_type, mandate_code and account_number")
+        return attrs
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    # Tokens embed the user details read by StatelessJWTAuthentication, the access token inherits them from the refresh token
+    token_class = CachedRefreshToken
+
+
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedRefreshToken
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import invalidate_user_state
+from .models import UserModel
+
+
+# Refresh the cached role and active flag used by StatelessJWTAuthentication
+@receiver(post_save, sender=UserModel)
+@receiver(post_delete, sender=UserModel)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user_state(instance.pk)
@@ -1,3 +1,166 @@
-from django.test import TestCase
-
-# Create your tests here.
+"""
+Behaviour tests of the accounts app.
+
+Run with:  python manage.py test accounts --settings=benchmarks.settings
+"""
+from datetime import timedelta
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from directdebit.models import Mandate
+from .emails import send_emails
+from .models import AuditAction, AuditLog, AuditTarget, EmailOutbox, EmailStatus, Role, UserModel
+from .serializers import RoleTokenObtainPairSerializer
+import io, tempfile, uuid
+
+
+class BrokenConnection:
+    def send_messages(self, messages):
+        raise ConnectionError("SMTP server unavailable")
+
+    def close(self):
+        pass
+
+
+class EmailOutboxTests(TestCase):
+    def queue(self):
+        return EmailOutbox.objects.create(subject='Password reset', body='Token: 123456', recipients=['user@tests.local'])
+
+    def test_sent_email_body_is_cleared(self):
+        email = self.queue()
+        send_emails([email])
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.body), (EmailStatus.SENT, ''))
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_body_is_kept_for_retries_and_cleared_once_failed(self):
+        email = self.queue()
+        send_emails([email], BrokenConnection())
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.body), (EmailStatus.PENDING, 'Token: 123456'))
+        send_emails([email], BrokenConnection())
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.body, email.subject), (EmailStatus.FAILED, '', 'Password reset'))
+
+
+class AuditLogFilterTests(TestCase):
+    def setUp(self):
+        self.admin = UserModel.objects.create_user(email='it@tests.local', password='test-password', role=Role.IT, is_active=True)
+        self.cso = UserModel.objects.create_user(email='cso@tests.local', password='test-password', role=Role.CSO, is_active=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RoleTokenObtainPairSerializer.get_token(self.admin).access_token}")
+        Mandate.objects.create(
+            mandateCode='MC1', branch='Ikeja', productId=1, accountNumber='0123456789', accountName='Payer', payerName='Payer',
+            payerEmail='payer@example.com', amount=1000, phoneNumber='08012345678', subscriberCode='AMFB/1',
+            startDate='2025-01-01', endDate='2025-12-31',
+        )
+        self.events = {
+            'login': self.event(self.cso, AuditAction.USER_LOGIN, AuditTarget.USER, self.cso.pk),
+            'mandate': self.event(self.cso, AuditAction.CREATE_E_MANDATE, AuditTarget.MANDATE, 'MC1'),
+            'other_mandate': self.event(self.cso, AuditAction.CREATE_E_MANDATE, AuditTarget.MANDATE, 'MC2'),
+            'account': self.event(self.admin, AuditAction.UPDATE_MANDATE_STATUS, AuditTarget.ACCOUNT, '0123456789'),
+        }
+        AuditLog.objects.filter(pk=self.events['login']).update(created_at=timezone.now() - timedelta(days=2))
+
+    def event(self, actor, action, target_type, target_id):
+        return AuditLog.objects.create(
+            user=actor.email, actor_id=actor.pk, action=action, target_type=target_type, target_id=str(target_id),
+        ).pk
+
+    def found(self, **params):
+        response = self.client.get('/api/v1/audit/log', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        names = {pk: name for name, pk in self.events.items()}
+        return sorted(names[pk] for pk in (uuid.UUID(row['id']) for row in response.json()['data']))
+
+    def test_filters(self):
+        yesterday = (timezone.now() - timedelta(days=1)).isoformat()
+        for params, expected in [
+            ({}, ['account', 'login', 'mandate', 'other_mandate']),
+            ({'actor': self.admin.pk}, ['account']),
+            ({'actor_email': self.cso.email}, ['login', 'mandate', 'other_mandate']),
+            ({'action': AuditAction.CREATE_E_MANDATE}, ['mandate', 'other_mandate']),
+            ({'target_type': AuditTarget.USER, 'target_id': self.cso.pk}, ['login']),
+            ({'mandate_code': 'MC1'}, ['mandate']),
+            ({'account_number': '0123456789'}, ['account', 'mandate']),
+            ({'since': yesterday}, ['account', 'mandate', 'other_mandate']),
+            ({'until': yesterday}, ['login']),
+            ({'actor_email': self.cso.email, 'action': AuditAction.CREATE_E_MANDATE, 'since': yesterday}, ['mandate', 'other_mandate']),
+        ]:
+            with self.subTest(params=params):
+                self.assertEqual(self.found(**params), expected)
+
+    def test_invalid_filters_are_rejected(self):
+        for params in [{'target_id': 'MC1'}, {'mandate_code': 'MC1', 'account_number': '0123456789'},
+                       {'action': 'NOT AN ACTION'}, {'actor': 'not-a-uuid'}, {'account_number': '123'}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/v1/audit/log', params).status_code, 400)
+
+    def test_only_it_can_read_the_audit_log(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RoleTokenObtainPairSerializer.get_token(self.cso).access_token}")
+        self.assertEqual(self.client.get('/api/v1/audit/log').status_code, 403)
+
+
+# Audit events are written from another thread, which only sees committed rows
+class LoginAuditTests(TransactionTestCase):
+    def test_login_is_recorded_against_the_user(self):
+        user = UserModel.objects.create_user(email='cso@tests.local', password='test-password', role=Role.CSO, is_active=True)
+        response = APIClient().post('/api/v1/auth/login', {'email': user.email, 'password': 'test-password'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json()['data'])
+        event = AuditLog.objects.get(action=AuditAction.USER_LOGIN)
+        self.assertEqual((event.user, event.actor_id), (user.email, user.pk))
+
+
+class RefreshTokenBlacklistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserModel.objects.create_user(email='cso@tests.local', password='test-password', role=Role.CSO, is_active=True)
+
+    def login(self):
+        response = self.client.post('/api/v1/auth/login', {'email': self.user.email, 'password': 'test-password'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def refresh(self, token):
+        return self.client.post('/api/v1/auth/refresh', {'refresh': token}, content_type='application/json').status_code
+
+    def check_logout_revokes_the_refresh_token(self):
+        tokens, other = self.login(), self.login()
+        self.assertEqual(self.refresh(tokens['refresh']), 200)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(client.post('/api/v1/auth/logout', {'refresh': tokens['refresh']}, format='json').status_code, 205)
+        self.assertEqual(self.refresh(tokens['refresh']), 401)
+        self.assertEqual(self.refresh(other['refresh']), 200)
+
+    def test_blacklist_is_kept_in_the_database_without_a_shared_cache(self):
+        self.check_logout_revokes_the_refresh_token()
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+        # Another worker has an empty cache of its own, the refresh token must stay revoked there too
+        cache.clear()
+        self.assertEqual(self.refresh(OutstandingToken.objects.get().token), 401)
+
+    def test_blacklist_is_not_migrated_into_a_process_local_cache(self):
+        self.check_logout_revokes_the_refresh_token()
+        with self.assertRaises(CommandError):
+            call_command('migrate_token_blacklist', '--purge', stdout=io.StringIO())
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+    def test_blacklist_is_migrated_into_a_shared_cache(self):
+        self.check_logout_revokes_the_refresh_token()
+        revoked = OutstandingToken.objects.get().token
+        with tempfile.TemporaryDirectory() as location:
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}):
+                call_command('migrate_token_blacklist', '--purge', stdout=io.StringIO())
+                self.assertFalse(OutstandingToken.objects.exists())
+                self.assertEqual(self.refresh(revoked), 401)
+
+    def test_blacklist_is_kept_in_a_shared_cache(self):
+        with tempfile.TemporaryDirectory() as location:
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}):
+                self.check_logout_revokes_the_refresh_token()
+        self.assertFalse(BlacklistedToken.objects.exists())
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken
+from .authentication import add_user_claims
+import time
+
+
+# Caches private to each process: a token blacklisted by one worker would still be accepted by the others
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+
+def cache_blacklist_enabled():
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def blacklist_key(jti):
+    return f'jwt:blacklist:{jti}'
+
+
+# Blacklist a token id until the token expires on its own, afterwards the entry is useless and the cache drops it
+def blacklist_jti(jti, expires_at):
+    remaining = int(expires_at - time.time())
+    if remaining > 0:
+        cache.set(blacklist_key(jti), 1, timeout=remaining)
+    return remaining > 0
+
+
+class CachedRefreshToken(RefreshToken):
+    """
+    Refresh token whose blacklist lives in the cache (Redis whenever REDIS_URL is set) keyed by jti,
+    instead of simplejwt's OutstandingToken/BlacklistedToken tables. Logout and refresh cost one cache
+    round-trip however many tokens were ever issued, and entries expire together with the token.
+    Without a shared cache the blacklist stays in simplejwt's tables, which record only the blacklisted tokens.
+    """
+    @classmethod
+    def for_user(cls, user):
+        # Bypass BlacklistMixin.for_user, issued tokens are no longer recorded in OutstandingToken
+        token = super(BlacklistMixin, cls).for_user(user)
+        return add_user_claims(token, user)
+
+    def check_blacklist(self):
+        if not cache_blacklist_enabled():
+            return super().check_blacklist()
+        if cache.get(blacklist_key(self.payload[api_settings.JTI_CLAIM])):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        if not cache_blacklist_enabled():
+            return super().blacklist()
+        return blacklist_jti(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
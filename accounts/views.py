@@ -1,17 +1,22 @@
 from rest_framework import views, generics, permissions, status
 from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.tokens import TokenError
+from drf_spectacular.utils import extend_schema
 from django_rest_passwordreset.models import ResetPasswordToken
 from django_rest_passwordreset.views import ResetPasswordRequestToken
-from drf_yasg.utils import swagger_auto_schema
 from django.db import IntegrityError
+from django.db.models import Q
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
-from threading import Thread
-from utils import IsAuthorized, log_audit_event, send_async_email, general_logger
-from .models import Role, UserModel
+from core.db.routers import replica_reads
+from core.fastlist import fast_rows
+from core.renderers import FastJSONRenderer
+from utils import IsAuthorized, log_audit_event, queue_email, general_logger
+from .models import AuditAction, AuditTarget, Role, UserModel
 from .serializers import *
+from .tokens import CachedRefreshToken
 import asyncio
 
 
@@ -34,7 +39,7 @@ class UserListCreateView(generics.ListCreateAPIView):
     allowed_roles = ['IT']
     parser_classes = [JSONParser,]
 
-    @swagger_auto_schema(request_body=UserSerializer, responses={200: 'OK', 401: 'UNAUTHORIZED', 500:'SERVER ERROR'})
+    @replica_reads
     def list(self, request, *args, **kwargs):
         # Users List Endpoint
         try:
@@ -45,7 +50,6 @@ class UserListCreateView(generics.ListCreateAPIView):
             general_logger.error("An error occurred: %s", e)
             return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @swagger_auto_schema(request_body=UserSerializer, responses={201: 'CREATED', 401: 'UNAUTHORIZED', 400: 'BAD REQUEST', 500:'SERVER ERROR'})
     def create(self, request, *args, **kwargs):
         # Users Signup Endpoint
         data = request.data
@@ -60,13 +64,16 @@ class UserListCreateView(generics.ListCreateAPIView):
             Regards,\n
             Alert Group Direct Debit\n
             https://ndd.dap-alertgroup.com.ng"""
-            # Asynchronously handle send mail
-            Thread(target=send_async_email, args=(email_subject, email_boby, [data['email']])).start()
+            # Hand the mail over to the email dispatcher
+            queue_email(email_subject, email_boby, [data['email']])
             # log account created for audit monitoring
             asyncio.run(log_audit_event(
-                user=request.user.email,
-                action='CREATE USER',
-                details=f'User created {data["email"]} account'
+                user=request.user,
+                action=AuditAction.CREATE_USER,
+                details=f'User created {data["email"]} account',
+                target_type=AuditTarget.USER,
+                target_id=serializer.instance.pk,
+                metadata={'email': data['email']}
             ))
             return Response({'status': 'success', 'message': 'User created successfully', 'data': serializer.data}, status=status.HTTP_201_CREATED)
         except (ValidationError, IntegrityError) as e:
@@ -89,7 +96,6 @@ class UserRetrUpdtDelView(generics.RetrieveUpdateDestroyAPIView):
     allowed_roles = ['IT']
     parser_classes = [JSONParser,]
 
-    @swagger_auto_schema(request_body=UserSerializer, responses={200: 'OK', 401: 'UNAUTHORIZED', 404:'NOT FOUND'})
     def retrieve(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
@@ -100,7 +106,6 @@ class UserRetrUpdtDelView(generics.RetrieveUpdateDestroyAPIView):
             return Response({'status': 'error', 'message': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
         
 
-    @swagger_auto_schema(request_body=UserSerializer, responses={200: 'OK', 401: 'UNAUTHORIZED', 400:'BAD REQUEST', 404: 'NOT FOUND'})
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         try:
@@ -111,9 +116,12 @@ class UserRetrUpdtDelView(generics.RetrieveUpdateDestroyAPIView):
                 self.perform_update(serializer)
                 # log account updated for audit monitoring
                 asyncio.run(log_audit_event(
-                    user=request.user.email,
-                    action='UPDATE USER',
-                    details=f'User updated "{instance}" information'
+                    user=request.user,
+                    action=AuditAction.UPDATE_USER,
+                    details=f'User updated "{instance}" information',
+                    target_type=AuditTarget.USER,
+                    target_id=instance.pk,
+                    metadata={'email': instance.email, 'fields': sorted(serializer.validated_data)}
                 ))
                 return Response({'status': 'success', 'message': 'User updated successfully', 'data': serializer.data}, status=status.HTTP_200_OK)
             except (Exception, IntegrityError, ValidationError, ValueError) as e:
@@ -124,16 +132,20 @@ class UserRetrUpdtDelView(generics.RetrieveUpdateDestroyAPIView):
             return Response({'status': 'error', 'message': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
                 
     
-    @swagger_auto_schema(request_body=UserSerializer, responses={204: 'NO CONTENT', 401: 'UNAUTHORIZED', 404: 'NOT FOUND'})
     def destroy(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
+            # Deleting clears the instance's primary key
+            user_id = instance.pk
             self.perform_destroy(instance)
             # log account daleted for audit monitoring
             asyncio.run(log_audit_event(
-                user=request.user.email,
-                action='DELETE USER',
-                details=f'User deleted "{instance}" account'
+                user=request.user,
+                action=AuditAction.DELETE_USER,
+                details=f'User deleted "{instance}" account',
+                target_type=AuditTarget.USER,
+                target_id=user_id,
+                metadata={'email': instance.email}
             ))
             return Response({'status': 'success', 'message': 'User deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
         except (Exception, ObjectDoesNotExist) as e:
@@ -150,26 +162,44 @@ class LoginView(TokenObtainPairView):
     permission_classes = [permissions.AllowAny]
     parser_classes = [JSONParser,]
 
-    @swagger_auto_schema(responses={200: 'OK', 400: 'BAD REQUEST', 401:'UNAUTHORIZED'})
     def post(self, request, *args, **kwargs):
         try:
             email = request.data.get('email')
             password = request.data.get('password')
             if not email or not password:
                 return Response({'status': 'error', 'message': 'Email and password fields are required!'}, status=status.HTTP_400_BAD_REQUEST)
-            response = super().post(request, *args, **kwargs)
-            # log successful user login for audit monitoring
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            # log successful user login for audit monitoring, the serializer already loaded the user
             asyncio.run(log_audit_event(
-                user=email,
-                action='USER LOGIN',
+                user=serializer.user,
+                action=AuditAction.USER_LOGIN,
                 details='User successfully logged in'
             ))
-            return Response({'status': 'success', 'message': 'User logged in successfully', 'data': response.data}, status=status.HTTP_200_OK)
+            return Response({'status': 'success', 'message': 'User logged in successfully', 'data': serializer.validated_data}, status=status.HTTP_200_OK)
         except Exception as e:
             general_logger.error("Exception error occurred: %s", e)
             return Response({'status': 'error', 'message': 'Incorrect email or password'}, status=status.HTTP_401_UNAUTHORIZED)
         
 
+class RefreshView(TokenRefreshView):
+    """
+        Token Refresh Endpoint
+
+        Exchange a valid refresh token for a new access token
+    """
+    permission_classes = [permissions.AllowAny]
+    parser_classes = [JSONParser,]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            response = super().post(request, *args, **kwargs)
+            return Response({'status': 'success', 'message': 'Token refreshed successfully', 'data': response.data}, status=status.HTTP_200_OK)
+        except Exception as e:
+            general_logger.error("Exception error occurred: %s", e)
+            return Response({'status': 'error', 'message': 'Invalid or expired refresh token'}, status=status.HTTP_401_UNAUTHORIZED)
+
+
 class LogoutView(generics.GenericAPIView):
     """
         User Logout Endpoint
@@ -180,13 +210,12 @@ class LogoutView(generics.GenericAPIView):
     serializer_class = LogoutSerializer
     parser_classes = [JSONParser,]
 
-    @swagger_auto_schema(responses={205: 'RESET CONTENT', 400: 'BAD REQUEST', 500:'SERVER ERROR'})
     def post(self, request, *args, **kwargs):
         data = request.data
         serializer = self.get_serializer(data=data)
         try:
             serializer.is_valid(raise_exception=True)
-            token = RefreshToken(data['refresh'])
+            token = CachedRefreshToken(data['refresh'])
             token.blacklist()
             return Response({'status': 'success', 'message': 'User logged out successfully'}, status=status.HTTP_205_RESET_CONTENT)
         except TokenError as e:
@@ -206,7 +235,6 @@ class PasswordResetView(ResetPasswordRequestToken):
     permission_classes = [permissions.AllowAny]
     parser_classes = [JSONParser,]
 
-    @swagger_auto_schema(responses={200: 'OK', 400: 'BAD REQUEST', 500:'SERVER ERROR'})
     def post(self, request, *args, **kwargs):
         try:
             email = request.data.get('email')
@@ -223,13 +251,15 @@ class PasswordResetView(ResetPasswordRequestToken):
                 Regards,\n
                 Alert Group Direct Debit"""
                 recipient = [token.user.email]
-                # Asynchronously handle send mail
-                Thread(target=send_async_email, args=(email_subject, email_body, recipient)).start()
+                # Hand the mail over to the email dispatcher
+                queue_email(email_subject, email_body, recipient)
                 # log password reset request for audit monitoring
                 asyncio.run(log_audit_event(
-                    user=email,
-                    action='PASSWORD RESET REQUEST',
-                    details='User made request to rest password'
+                    user=token.user,
+                    action=AuditAction.PASSWORD_RESET_REQUEST,
+                    details='User made request to rest password',
+                    target_type=AuditTarget.USER,
+                    target_id=token.user.pk
                 ))
                 return Response({'status': 'success', 'message': 'Password reset email has been sent!'}, status=status.HTTP_200_OK)
             else:
@@ -249,7 +279,6 @@ class PasswordConfirmView(generics.GenericAPIView):
     serializer_class = PasswordConfirmSerializer
     parser_classes = [JSONParser,]
     
-    @swagger_auto_schema(request_body=PasswordConfirmSerializer, responses={200: 'OK', 400: 'BAD REQUEST', 500:'SERVER ERROR'})
     def post(self, request, *args, **kwargs):
         data = request.data
         otp_token = data.get('token')
@@ -266,9 +295,11 @@ class PasswordConfirmView(generics.GenericAPIView):
             token.delete()
             # log changed password for audit monitoring
             asyncio.run(log_audit_event(
-                user=user.email,
-                action='CREATE NEW PASSWORD',
-                details='User created new password'
+                user=user,
+                action=AuditAction.CREATE_NEW_PASSWORD,
+                details='User created new password',
+                target_type=AuditTarget.USER,
+                target_id=user.pk
             ))
             return Response({'status': 'success', 'message': 'Password has been reset successfully.'}, status=status.HTTP_200_OK)
         except ResetPasswordToken.DoesNotExist as e:
@@ -279,24 +310,55 @@ class PasswordConfirmView(generics.GenericAPIView):
             return Response({'status': 'error', 'message': 'Password: '+str(e.detail['password']).split("'")[1]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
 
+@extend_schema(parameters=[AuditLogQuerySerializer])
 class AuditLogView(generics.ListAPIView):
     """
         Audit Log Endpoint
 
-        List records of all event/activity by a user
+        List records of all event/activity by a user, optionally narrowed to an actor, an action or a target
     """
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthorized]
     allowed_roles = ['IT']
     parser_classes = [JSONParser,]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def filter_events(self, queryset, params):
+        # Every filter is served by one of the AuditLog indexes (actor, actor email or target)
+        if 'actor' in params:
+            queryset = queryset.filter(actor_id=params['actor'])
+        if 'actor_email' in params:
+            queryset = queryset.filter(user=params['actor_email'])
+        if 'action' in params:
+            queryset = queryset.filter(action=params['action'])
+        if 'target_type' in params:
+            queryset = queryset.filter(target_type=params['target_type'])
+        if 'target_id' in params:
+            queryset = queryset.filter(target_id=params['target_id'])
+        if 'mandate_code' in params:
+            queryset = queryset.filter(target_type=AuditTarget.MANDATE, target_id=params['mandate_code'])
+        if 'account_number' in params:
+            from directdebit.models import Mandate  # Local import, directdebit depends on accounts
+            # Mandate events are recorded against the mandate code, earlier events against the account itself
+            codes = list(Mandate.objects.filter(accountNumber=params['account_number']).values_list('mandateCode', flat=True))
+            queryset = queryset.filter(
+                Q(target_type=AuditTarget.ACCOUNT, target_id=params['account_number']) | Q(target_type=AuditTarget.MANDATE, target_id__in=codes)
+            )
+        if 'since' in params:
+            queryset = queryset.filter(created_at__gte=params['since'])
+        if 'until' in params:
+            queryset = queryset.filter(created_at__lt=params['until'])
+        return queryset
 
-    @swagger_auto_schema(request_body=AuditLogSerializer, responses={200: 'OK', 401: 'UNAUTHORIZED', 500:'SERVER ERROR'})
+    @replica_reads
     def list(self, request, *args, **kwargs):
+        params = AuditLogQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
         try:
-            queryset = self.filter_queryset(self.get_queryset())
-            serializer = self.get_serializer(queryset, many=True)
-            return Response({'status': 'success', 'message': 'Audit log retrieved successfully', 'data': serializer.data}, status=status.HTTP_200_OK)
+            queryset = self.filter_events(self.filter_queryset(self.get_queryset()), params.validated_data)
+            data = fast_rows(self.serializer_class, queryset)
+            return Response({'status': 'success', 'message': 'Audit log retrieved successfully', 'data': data}, status=status.HTTP_200_OK)
         except (Exception, ObjectDoesNotExist) as e:
             general_logger.error("An error occurred: %s", e)
             return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
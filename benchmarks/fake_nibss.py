@@ -0,0 +1,146 @@
+"""
+Local stand-in for the NIBSS NDD API used by the benchmarks and the test suite.
+
+Run standalone with:  python -m benchmarks.fake_nibss --port 8765 --latency 0.2 --error-rate 0.01
+then point the application at it with NIBSS_BASE_URL=http://127.0.0.1:8765
+"""
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+import argparse, json, random, threading, time, uuid
+
+
+class FakeNIBSS:
+    """
+    Threaded HTTP server answering the NIBSS endpoints the application calls.
+
+    latency:      mean seconds added to every response
+    jitter:       standard deviation of the added latency
+    error_rate:   fraction of API calls answered with a 500
+    token_expiry: lifetime in seconds of issued access tokens (expired tokens get a 401)
+    """
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0, token_expiry=3600, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.token_expiry = token_expiry
+        self.random = random.Random(seed)
+        self.calls = Counter()
+        self.tokens = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fake-nibss', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    def total_calls(self):
+        with self._lock:
+            return sum(self.calls.values())
+
+    # Operation name of a request path, e.g. /ndd/api/MandateRequest/MandateStatus -> MandateStatus
+    @staticmethod
+    def operation(path):
+        parts = urlsplit(path).path.strip('/').split('/')
+        return parts[3] if len(parts) > 3 and parts[:2] == ['ndd', 'api'] else parts[-1]
+
+    def respond(self, method, path, headers):
+        operation = self.operation(path)
+        with self._lock:
+            self.calls[operation] += 1
+            fail = self.random.random() < self.error_rate
+            delay = max(self.random.gauss(self.latency, self.jitter), 0) if self.latency else 0
+        if delay:
+            time.sleep(delay)
+
+        if operation == 'reset':
+            token = uuid.uuid4().hex
+            with self._lock:
+                self.tokens[token] = time.monotonic() + self.token_expiry
+            return 200, {"access_token": token, "expires_in": self.token_expiry, "token_type": "Bearer"}
+
+        token = headers.get('Authorization', '').removeprefix('Bearer ')
+        with self._lock:
+            expires_at = self.tokens.get(token)
+        if expires_at is None or expires_at < time.monotonic():
+            return 401, {"message": "Invalid or expired token"}
+        if fail:
+            return 500, {"message": "Simulated NIBSS failure"}
+
+        if operation in ('CreateEmandate', 'CreateMandateDirectDebit', 'CreateMandateBalanceEnquiry'):
+            return 200, {"data": {"mandateCode": f"MC{uuid.uuid4().hex[:16].upper()}", "responseCode": "00"}}
+        if operation == 'MandateStatus':
+            return 200, {"data": {"status": "Active", "workflowStatus": "Bank Approved", "responseCode": "00"}}
+        if operation == 'FetchMandate':
+            return 200, {"data": {"items": [], "page": 1, "pageSize": 20, "total": 0}}
+        if operation == 'GetProduct':
+            return 200, {"data": [{"id": 1, "productName": "Loan Repayment", "billerId": 455}]}
+        return 200, {"data": {"responseCode": "00"}}
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                status, body = fake.respond(self.command, self.path, self.headers)
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='Mean seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Standard deviation of the added latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls answered with a 500')
+    parser.add_argument('--token-expiry', type=int, default=3600, help='Access token lifetime in seconds')
+    args = parser.parse_args()
+    fake = FakeNIBSS(args.host, args.port, args.latency, args.jitter, args.error_rate, args.token_expiry)
+    print(f"Fake NIBSS listening on {fake.url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == '__main__':
+    main()
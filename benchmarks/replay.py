@@ -0,0 +1,185 @@
+"""
+Replays a trace captured by TrafficCaptureMiddleware against a running test instance.
+
+    python -m benchmarks.replay traffic.jsonl --base-url http://127.0.0.1:8000
+    python -m benchmarks.replay traffic.jsonl --base-url http://127.0.0.1:8000 --speed 4 --fake-nibss-port 8765 --latency 0.2
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.run import PASSWORD, mandate_payload, print_table, summarize
+import argparse, json, requests, sys, threading, time
+
+
+# Values used for fields whose captured type does not say enough to build a valid request
+KNOWN_FIELDS = {
+    'email': 'cso@benchmark.local',
+    'password': PASSWORD,
+    'mandate_code': 'MC0000000001',
+    'mandateCode': 'MC0000000001',
+    'workflowStatus': '2',
+    'mandateStatus': '1',
+    'status': '1',
+    'billerId': 455,
+}
+TYPE_DEFAULTS = {'str': 'replay', 'int': 1, 'float': 1.0, 'bool': True, 'null': None}
+
+
+def synthesize(shape, i, field=None):
+    """
+    Builds a value matching a captured payload shape, preferring realistic values for known field names.
+    """
+    if isinstance(shape, dict):
+        if 'file' in shape and len(shape) == 1:
+            return b'\x89PNG' + b'0' * max(shape['file'] - 4, 0)
+        return {key: synthesize(value, i, key) for key, value in shape.items()}
+    if isinstance(shape, list):
+        return [synthesize(shape[0], i)] if shape else []
+    samples = mandate_payload(i)
+    if field in samples and shape in ('str', 'int'):
+        return samples[field]
+    if field in KNOWN_FIELDS:
+        return KNOWN_FIELDS[field]
+    return TYPE_DEFAULTS.get(shape, 'replay')
+
+
+class ReplayError(Exception):
+    pass
+
+
+def load(path):
+    entries = []
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                entries.append(json.loads(line))
+    return sorted(entries, key=lambda entry: entry['ts'])
+
+
+def parse_credentials(value):
+    try:
+        role, login = value.split('=', 1)
+        email, password = login.split(':', 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid credentials '{value}', expected ROLE=EMAIL:PASSWORD")
+    return role.upper(), (email, password)
+
+
+class Replayer:
+    """
+    Sends the captured requests with synthesized payloads, logging in once per captured role.
+    """
+    def __init__(self, base_url, credentials, concurrency):
+        self.base_url = base_url.rstrip('/')
+        self.credentials = credentials
+        self.tokens = {}
+        self.token_lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.mount('http', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+
+    def token(self, role):
+        with self.token_lock:
+            if role not in self.tokens:
+                email, password = self.credentials.get(role, (f'{role.lower()}@benchmark.local', PASSWORD))
+                response = self.session.post(f"{self.base_url}/api/v1/auth/login", json={'email': email, 'password': password}, timeout=30)
+                if response.status_code != 200:
+                    raise ReplayError(f"Login as {email} failed with status {response.status_code}")
+                self.tokens[role] = response.json()['data']['access']
+            return self.tokens[role]
+
+    def send(self, i, entry):
+        headers = {}
+        kwargs = {'params': {key: 'replay' for key in entry.get('query') or {}}}
+        payload = synthesize(entry['payload'], i) if isinstance(entry.get('payload'), dict) else None
+        if payload is not None and entry.get('content_type') == 'multipart/form-data':
+            kwargs['files'] = {key: ('replay.png', value, 'image/png') for key, value in payload.items() if isinstance(value, bytes)}
+            kwargs['data'] = {key: value for key, value in payload.items() if not isinstance(value, bytes)}
+        elif payload is not None and entry.get('content_type') == 'application/x-www-form-urlencoded':
+            kwargs['data'] = payload
+        elif payload is not None:
+            kwargs['json'] = payload
+        started = time.perf_counter()
+        try:
+            if entry.get('role'):
+                headers['Authorization'] = f"Bearer {self.token(entry['role'])}"
+            response = self.session.request(entry['method'], f"{self.base_url}{entry['path']}", headers=headers, timeout=120, **kwargs)
+            status = response.status_code
+        except (requests.RequestException, ReplayError) as e:
+            print(f"{entry['method']} {entry['path']} failed: {e}", file=sys.stderr)
+            status = 599
+        return time.perf_counter() - started, status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay a trace captured by TrafficCaptureMiddleware against a running test instance.')
+    parser.add_argument('trace', help='JSON lines file written by TrafficCaptureMiddleware')
+    parser.add_argument('--base-url', required=True, help='Root URL of the instance under test, e.g. http://127.0.0.1:8000')
+    parser.add_argument('--speed', type=float, default=1.0, help='Replay speed multiplier, 0 replays as fast as possible')
+    parser.add_argument('--concurrency', type=int, default=32, help='Maximum number of requests in flight')
+    parser.add_argument('--credentials', action='append', default=[], type=parse_credentials, metavar='ROLE=EMAIL:PASSWORD',
+                        help='Login used for requests captured under ROLE (default <role>@benchmark.local)')
+    parser.add_argument('--fake-nibss-port', type=int,
+                        help='Also run the fake NIBSS on this port (start the instance with NIBSS_BASE_URL pointing at it)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mean fake NIBSS latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of fake NIBSS calls failing with a 500')
+    args = parser.parse_args(argv)
+
+    entries = load(args.trace)
+    if not entries:
+        parser.error(f"no requests found in {args.trace}")
+    replayer = Replayer(args.base_url, dict(args.credentials), args.concurrency)
+
+    fake = None
+    if args.fake_nibss_port:
+        from benchmarks.fake_nibss import FakeNIBSS
+        fake = FakeNIBSS(port=args.fake_nibss_port, latency=args.latency, error_rate=args.error_rate).start()
+        print(f"Fake NIBSS listening on {fake.url}")
+
+    print(f"Replaying {len(entries)} requests at {f'{args.speed}x' if args.speed else 'maximum'} speed")
+    # name -> [latencies, errors, NIBSS calls made when the trace was captured]
+    results = defaultdict(lambda: [[], 0, 0])
+    lock = threading.Lock()
+
+    def replay(i, entry):
+        latency, status = replayer.send(i, entry)
+        with lock:
+            result = results[f"{entry['method']} {entry.get('url_name') or entry['path']}"]
+            result[0].append(latency)
+            # Requests that failed during capture are expected to fail again
+            result[1] += status >= 500 or (status >= 400 and entry['status'] < 400)
+            result[2] += len(entry.get('upstream') or [])
+
+    first = entries[0]['ts']
+    started = time.perf_counter()
+    futures = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(args.concurrency, 1), thread_name_prefix='replay') as executor:
+            for i, entry in enumerate(entries):
+                if args.speed:
+                    # Keep the captured inter-arrival times, scaled by the speed multiplier
+                    delay = (entry['ts'] - first) / args.speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                futures.append((entry, executor.submit(replay, i, entry)))
+    finally:
+        if fake:
+            fake.stop()
+    elapsed = time.perf_counter() - started
+
+    # A request that could not even be built (e.g. a malformed trace line) is reported instead of dropped
+    crashed = 0
+    for entry, future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            crashed += 1
+            print(f"{entry.get('method')} {entry.get('path')} was not replayed: {e!r}", file=sys.stderr)
+
+    print_table([summarize(name, *result[:2], elapsed, result[2]) for name, result in sorted(results.items())])
+    print(f"Replayed {len(entries) - crashed} of {len(entries)} requests in {elapsed:.1f}s")
+    if crashed:
+        print(f"{crashed} requests failed before they were sent, see the errors above", file=sys.stderr)
+    return 1 if crashed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
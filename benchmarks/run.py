@@ -0,0 +1,230 @@
+"""
+Offline benchmark of the hot API paths, driven through the real URLs, views and middleware
+against a SQLite database and the local fake NIBSS.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --requests 500 --concurrency 16 --latency 0.2 --error-rate 0.01
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --compare before.json
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import argparse, json, os, random, sys, time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+PASSWORD = 'benchmark-password'
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(round(pct / 100 * (len(sorted_values) - 1)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(name, latencies, errors, elapsed, upstream_calls):
+    latencies = sorted(latencies)
+    return {
+        'name': name,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'upstream_calls': upstream_calls,
+    }
+
+
+def prepare_database():
+    from django.conf import settings
+    from django.core.management import call_command
+    path = settings.DATABASES['default']['NAME']
+    if os.path.exists(path):
+        os.remove(path)
+    call_command('migrate', verbosity=0)
+
+
+def create_users():
+    from accounts.models import Role, UserModel
+    for role in Role.values:
+        UserModel.objects.create_user(
+            email=f'{role.lower()}@benchmark.local', password=PASSWORD, role=role,
+            is_active=True, first_name=role.title(), last_name='Benchmark',
+        )
+
+
+def login(role):
+    from django.test import Client
+    response = Client().post('/api/v1/auth/login', {'email': f'{role.lower()}@benchmark.local', 'password': PASSWORD}, content_type='application/json')
+    return response.json()['data']['access']
+
+
+def seed_mandates(total, seed=0):
+    from directdebit.models import Branch, Frequency, Mandate
+    from directdebit.rollups import rebuild
+    from directdebit.signals import rollups_paused
+    rng = random.Random(seed)
+    branches = Branch.values
+    frequencies = [Frequency.MONTHLY] * 8 + [Frequency.WEEKLY, Frequency.EVERY_2_WEEKS]
+    batch = []
+    with rollups_paused():
+        Mandate.objects.all().delete()
+        for i in range(total):
+            start = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+            batch.append(Mandate(
+                mandateCode=f'BENCH{i:012d}', branch=rng.choice(branches), productId=1,
+                accountNumber=f'{rng.randrange(10 ** 10):010d}', accountName=f'Account {i}', payerName=f'Payer {i}',
+                payerEmail=f'payer{i}@example.com', amount=rng.randrange(1000, 500000), phoneNumber=f'080{rng.randrange(10 ** 8):08d}',
+                subscriberCode=f'AMFB/{i:010d}', startDate=start, endDate=start + timedelta(days=365), frequency=rng.choice(frequencies),
+            ))
+            if len(batch) == 5000:
+                Mandate.objects.bulk_create(batch)
+                batch = []
+        Mandate.objects.bulk_create(batch)
+    rebuild()
+
+
+def mandate_payload(i):
+    return {
+        'branch': 'IKEJA', 'productId': 1, 'accountNumber': f'{i % 10 ** 10:010d}', 'bankCode': '044',
+        'payerName': f'Payer {i}', 'payerEmail': f'payer{i}@example.com', 'mandateType': '1', 'payerAddress': '1 Broad Street, Lagos',
+        'accountName': f'Account {i}', 'amount': 5000, 'frequency': '4', 'narration': f'DD/AMFB/payer/{i}',
+        'phoneNumber': '08012345678', 'subscriberCode': f'AMFB/{i:010d}', 'startDate': '2025-01-01', 'endDate': '2026-01-01',
+    }
+
+
+# name -> (role or None for anonymous, request function)
+def scenarios():
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    def login_request(client, i):
+        return client.post('/api/v1/auth/login', {'email': 'cso@benchmark.local', 'password': PASSWORD}, content_type='application/json')
+
+    def choices(client, i):
+        return client.get('/api/v1/utils')
+
+    def e_mandate(client, i):
+        return client.post('/api/v1/mandates/e-mandate', mandate_payload(i), content_type='application/json')
+
+    def paper_mandate(client, i):
+        payload = mandate_payload(i)
+        payload.pop('frequency')
+        payload.pop('mandateType')
+        payload['mandateImageFile'] = SimpleUploadedFile('mandate.png', b'\x89PNG' + b'0' * 2048, content_type='image/png')
+        return client.post('/api/v1/mandates/create', payload)
+
+    def mandate_status(client, i):
+        return client.post('/api/v1/mandates/status', {'mandate_code': f'MC{i:010d}'}, content_type='application/json')
+
+    return {
+        'login': (None, login_request),
+        'choices': ('CSO', choices),
+        'e_mandate': ('CSO', e_mandate),
+        'paper_mandate': ('CSO', paper_mandate),
+        'mandate_status': ('CSO', mandate_status),
+    }
+
+
+def mandate_list(client, i):
+    return client.get('/api/v1/mandates')
+
+
+def run_scenario(name, request, token, count, concurrency, fake):
+    from django.db import connections
+    from django.test import Client
+
+    def worker(indexes):
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}') if token else Client()
+        latencies, errors = [], 0
+        for i in indexes:
+            started = time.perf_counter()
+            response = request(client, i)
+            latencies.append(time.perf_counter() - started)
+            errors += response.status_code >= 400
+        connections.close_all()
+        return latencies, errors
+
+    # Warm up caches, token and connections before measuring
+    worker(range(count, count + min(5, count)))
+    fake.reset_calls()
+    chunks = [range(n, count, concurrency) for n in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, chunks))
+    elapsed = time.perf_counter() - started
+    latencies = [latency for result in results for latency in result[0]]
+    return summarize(name, latencies, sum(result[1] for result in results), elapsed, fake.total_calls())
+
+
+def print_table(results, baseline=None):
+    baseline = {result['name']: result for result in (baseline or [])}
+    header = f"{'scenario':<24}{'reqs':>7}{'errs':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'nibss':>7}"
+    if baseline:
+        header += f"{'req/s Δ':>10}{'p95 Δ':>9}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        line = (f"{result['name']:<24}{result['requests']:>7}{result['errors']:>6}{result['rps']:>10.1f}"
+                f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['upstream_calls']:>7}")
+        if before := baseline.get(result['name']):
+            rps_delta = (result['rps'] - before['rps']) / before['rps'] * 100 if before['rps'] else 0
+            p95_delta = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            line += f"{rps_delta:>+9.1f}%{p95_delta:>+8.1f}%"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmark of the API hot paths against a fake NIBSS.')
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients per scenario')
+    parser.add_argument('--latency', type=float, default=0.05, help='Mean fake NIBSS latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.01, help='Standard deviation of the fake NIBSS latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of NIBSS calls failing with a 500')
+    parser.add_argument('--token-expiry', type=int, default=3600, help='Fake NIBSS access token lifetime in seconds')
+    parser.add_argument('--list-sizes', default='100,1000,10000', help='Comma separated Mandate table sizes for the list scenario')
+    parser.add_argument('--list-requests', type=int, default=20, help='Measured requests per list size')
+    parser.add_argument('--only', help='Comma separated scenario names to run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--compare', help='Results JSON of a previous run to compare against')
+    args = parser.parse_args(argv)
+
+    import django
+    django.setup()
+    from django.conf import settings
+    from benchmarks.fake_nibss import FakeNIBSS
+
+    only = set(args.only.split(',')) if args.only else None
+    prepare_database()
+    create_users()
+    tokens = {role: login(role) for role in ('CSO', 'IT')}
+    results = []
+    with FakeNIBSS(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, token_expiry=args.token_expiry, seed=args.seed) as fake:
+        settings.NIBSS_BASE_URL = fake.url
+        for name, (role, request) in scenarios().items():
+            if only and name not in only:
+                continue
+            results.append(run_scenario(name, request, tokens.get(role), args.requests, args.concurrency, fake))
+        for size in [int(size) for size in args.list_sizes.split(',') if size]:
+            name = f'mandate_list[{size}]'
+            if only and 'mandate_list' not in only and name not in only:
+                continue
+            seed_mandates(size, args.seed)
+            results.append(run_scenario(name, mandate_list, tokens['CSO'], args.list_requests, min(args.concurrency, 4), fake))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)['results']
+    print_table(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'options': vars(args), 'results': results}, file, indent=2)
+    return 0 if all(result['errors'] == 0 for result in results) or args.error_rate else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
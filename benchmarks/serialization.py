@@ -0,0 +1,80 @@
+"""
+Benchmark of the list rendering paths: DRF ModelSerializer + JSONRenderer against
+values_list rows (core.fastlist) + FastJSONRenderer, for the Mandate and AuditLog lists.
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --rows 10000,100000 --repeat 5
+"""
+from datetime import datetime, timedelta, timezone
+import argparse, json, os, random, sys, time, uuid
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+
+def seed_audit_logs(total, seed=0):
+    from accounts.models import AuditLog
+    rng = random.Random(seed)
+    AuditLog.objects.all().delete()
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    batch = []
+    for i in range(total):
+        code = f'MC{rng.randrange(10 ** 10):010d}'
+        batch.append(AuditLog(
+            user=f'user{rng.randrange(200)}@benchmark.local', actor_id=uuid.UUID(int=rng.getrandbits(128)),
+            action=rng.choice(['USER LOGIN', 'CREATE E-MANDATE', 'PROCESS MANDATE']), target_type='MANDATE', target_id=code,
+            metadata={'accountNumber': f'{rng.randrange(10 ** 10):010d}', 'workflowStatus': rng.choice(['2', '4', '8'])},
+            details=f'Benchmark audit entry {i}', created_at=started + timedelta(seconds=rng.randrange(365 * 86400), microseconds=rng.randrange(10 ** 6)),
+        ))
+        if len(batch) == 5000:
+            AuditLog.objects.bulk_create(batch)
+            batch = []
+    AuditLog.objects.bulk_create(batch)
+
+
+def best_of(repeat, render):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = render()
+        timings.append(time.perf_counter() - started)
+    return min(timings), body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare serializer and values_list list rendering.')
+    parser.add_argument('--rows', default='10000,100000', help='Comma separated table sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement, the fastest is reported')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    import django
+    django.setup()
+    from rest_framework.renderers import JSONRenderer
+    from accounts.models import AuditLog
+    from accounts.serializers import AuditLogSerializer
+    from benchmarks.run import prepare_database, seed_mandates
+    from core.fastlist import fast_rows
+    from core.renderers import FastJSONRenderer, orjson
+    from directdebit.models import Mandate
+    from directdebit.serializers import DBMandateSerializer
+
+    prepare_database()
+    print(f"{'list':<10}{'rows':>9}{'serializer ms':>16}{'fast path ms':>15}{'speed-up':>10}{'same JSON':>11}")
+    failed = False
+    for size in [int(size) for size in args.rows.split(',') if size]:
+        seed_mandates(size, args.seed)
+        seed_audit_logs(size, args.seed)
+        for name, serializer_class, queryset in (('mandates', DBMandateSerializer, Mandate.objects.all()),
+                                                 ('audit_log', AuditLogSerializer, AuditLog.objects.all())):
+            slow, expected = best_of(args.repeat, lambda: JSONRenderer().render(serializer_class(queryset.all(), many=True).data))
+            fast, body = best_of(args.repeat, lambda: FastJSONRenderer().render(fast_rows(serializer_class, queryset.all())))
+            same = json.loads(expected) == json.loads(body)
+            failed |= not same
+            print(f"{name:<10}{size:>9}{slow * 1000:>16.1f}{fast * 1000:>15.1f}{slow / fast:>9.1f}x{str(same):>11}")
+    if orjson is None:
+        print("orjson is not installed, the fast path rendered with the standard JSON encoder")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""
+Settings for the offline benchmarks and tests: SQLite, the local fake NIBSS and in-memory email.
+The required environment variables get harmless defaults so no .env file is needed.
+"""
+import os, tempfile
+
+for key, value in {
+    'SECRET_KEY': 'benchmark-secret-key-not-for-production-use',
+    'DEBUG': 'False',
+    'DB_NAME': '', 'DB_HOST': '', 'DB_USER': '', 'DB_PORT': '', 'DB_PASS': '',
+    'EMAIL_HOST': 'localhost', 'EMAIL_PORT': '25', 'EMAIL_HOST_USER': 'noreply@example.com', 'EMAIL_HOST_PASSWORD': '',
+    'API_KEY': 'benchmark', 'CLIENT_SECRET': 'benchmark', 'CLIENT_ID': 'benchmark', 'SCOPE': 'benchmark',
+    'API_REQUEST_TIMEOUT': '30',
+    'METRICS_TOKEN': 'benchmark-metrics-token',
+    'NIBSS_BASE_URL': 'http://127.0.0.1:8765',
+}.items():
+    os.environ.setdefault(key, value)
+
+from core.settings import *  # noqa: E402,F403
+
+BENCHMARK_DIR = os.environ.get('BENCHMARK_DIR', tempfile.gettempdir())
+
+ALLOWED_HOSTS = ['*']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BENCHMARK_DIR, 'nibss-benchmark.sqlite3'),
+        'OPTIONS': {'timeout': 30},
+    }
+}
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+REST_FRAMEWORK = {**REST_FRAMEWORK, 'DEFAULT_THROTTLE_CLASSES': []}
+
+LOGGING['handlers']['file_general']['filename'] = os.path.join(BENCHMARK_DIR, 'nibss-benchmark-general.log')
+LOGGING['handlers']['file_email']['filename'] = os.path.join(BENCHMARK_DIR, 'nibss-benchmark-email.log')
@@ -0,0 +1,74 @@
+"""
+mysql.connector backend that checks connections out of a per-process pool instead of opening one per request.
+
+    DATABASES = {'default': {'ENGINE': 'core.db.mysql', ..., 'POOL': {'MIN_SIZE': 1, 'MAX_SIZE': 10}}}
+
+POOL keys: MIN_SIZE, MAX_SIZE, MAX_LIFETIME, MAX_IDLE, PING_AFTER and TIMEOUT (see core.db.pool.ConnectionPool).
+Keep CONN_MAX_AGE at 0: Django then "closes" the connection after every request, which hands it back to the pool.
+"""
+from mysql.connector import errors
+from mysql.connector.django.base import DatabaseWrapper as MySQLDatabaseWrapper, DjangoMySQLConverter
+from core.db.pool import ConnectionPool
+import functools, mysql.connector, threading
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _connect(conn_params):
+    return mysql.connector.connect(**{'converter_class': DjangoMySQLConverter, **conn_params})
+
+
+def _ping(connection):
+    connection.ping(reconnect=False)
+
+
+def _close(connection):
+    try:
+        connection.close()
+    except errors.Error:
+        pass
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+    def pool(self, conn_params):
+        pool = _pools.get(self.alias)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(self.alias)
+                if pool is None:
+                    options = self.settings_dict.get('POOL', {})
+                    pool = _pools[self.alias] = ConnectionPool(
+                        self.alias,
+                        connect=functools.partial(_connect, conn_params),
+                        ping=_ping,
+                        close=_close,
+                        min_size=options.get('MIN_SIZE', 1),
+                        max_size=options.get('MAX_SIZE', 10),
+                        max_lifetime=options.get('MAX_LIFETIME', 1800),
+                        max_idle=options.get('MAX_IDLE', 300),
+                        ping_after=options.get('PING_AFTER', 30),
+                        timeout=options.get('TIMEOUT', 10),
+                    )
+        return pool
+
+    def get_new_connection(self, conn_params):
+        try:
+            return self.pool(conn_params).acquire()
+        except TimeoutError as e:
+            raise errors.OperationalError(str(e))
+
+    def init_connection_state(self):
+        # Session settings survive in the pool, only run them on connections that have not seen them yet
+        if getattr(self.connection, '_django_initialized', False):
+            return
+        super().init_connection_state()
+        self.connection._django_initialized = True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # A connection left inside a transaction, or broken by an error, is not reused
+        discard = self.in_atomic_block or not self.autocommit or (self.errors_occurred and not self.is_usable())
+        _pools[self.alias].release(self.connection, discard=discard)
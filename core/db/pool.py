@@ -0,0 +1,173 @@
+from collections import deque
+from core.metrics import DB_POOL_CONNECTIONS, DB_POOL_DISCARDS, DB_POOL_TIMEOUTS, DB_POOL_WAIT_SECONDS
+import logging, threading, time
+
+
+general_logger = logging.getLogger('general_logger')
+
+
+class PooledConnection:
+    __slots__ = ('connection', 'created_at', 'released_at')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = self.released_at = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of open DB-API connections for one database alias in one process.
+
+    min_size:     connections kept open even when idle (opened on first use)
+    max_size:     connections open at once, further checkouts wait up to `timeout` seconds
+    max_lifetime: seconds after which a connection is closed instead of reused
+    max_idle:     seconds an idle connection above min_size is kept
+    ping_after:   idle seconds after which a connection is pinged before reuse (0 pings on every checkout)
+    """
+    def __init__(self, alias, connect, ping, close, min_size=1, max_size=10, max_lifetime=1800, max_idle=300, ping_after=30, timeout=10):
+        self.alias = alias
+        self._connect = connect
+        self._ping = ping
+        self._close = close
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        self.timeout = timeout
+        self.idle = deque()
+        self.in_use = {}
+        self.opening = 0
+        self.condition = threading.Condition()
+        self.filled = False
+
+    @property
+    def size(self):
+        return len(self.idle) + len(self.in_use) + self.opening
+
+    def acquire(self):
+        """
+        Returns an open connection, reusing an idle one when possible.
+        Raises TimeoutError when the pool stays exhausted for `timeout` seconds.
+        """
+        if not self.filled:
+            self._fill()
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            with self.condition:
+                entry = None
+                while entry is None:
+                    if self.idle:
+                        # Most recently used first, so surplus connections go idle and get pruned
+                        entry = self.idle.pop()
+                    elif self.size < self.max_size:
+                        self.opening += 1
+                        break
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            DB_POOL_TIMEOUTS.labels(self.alias).inc()
+                            raise TimeoutError(f"No connection available in the '{self.alias}' pool after {self.timeout}s ({self.max_size} in use)")
+                        self.condition.wait(remaining)
+            if entry is None:
+                entry = self._open()
+            elif not self._healthy(entry):
+                continue
+            with self.condition:
+                self.in_use[id(entry.connection)] = entry
+                self._report()
+            DB_POOL_WAIT_SECONDS.labels(self.alias).observe(time.monotonic() - started)
+            return entry.connection
+
+    def release(self, connection, discard=False):
+        """
+        Returns a connection to the pool, or closes it when `discard` is set or it outlived max_lifetime.
+        """
+        with self.condition:
+            entry = self.in_use.pop(id(connection), None)
+            if entry is None:
+                # Not checked out from this pool (e.g. opened before the pool existed)
+                self._close(connection)
+                return
+            now = time.monotonic()
+            expired = now - entry.created_at > self.max_lifetime
+            if not discard and not expired:
+                entry.released_at = now
+                self.idle.append(entry)
+            stale = self._prune(now)
+            self._report()
+            self.condition.notify()
+        if discard or expired:
+            DB_POOL_DISCARDS.labels(self.alias, 'error' if discard else 'lifetime').inc()
+            self._close(connection)
+        for entry in stale:
+            DB_POOL_DISCARDS.labels(self.alias, 'idle').inc()
+            self._close(entry.connection)
+
+    def close_all(self):
+        with self.condition:
+            entries, self.idle = list(self.idle), deque()
+            self._report()
+        for entry in entries:
+            self._close(entry.connection)
+
+    def _open(self):
+        try:
+            entry = PooledConnection(self._connect())
+        finally:
+            with self.condition:
+                self.opening -= 1
+                self.condition.notify()
+        return entry
+
+    def _fill(self):
+        # Open min_size connections up front so the first requests do not pay for them
+        with self.condition:
+            if self.filled:
+                return
+            self.filled = True
+            missing = max(self.min_size - self.size, 0)
+        for _ in range(missing):
+            with self.condition:
+                if self.size >= self.max_size:
+                    break
+                self.opening += 1
+            try:
+                entry = self._open()
+            except Exception as e:
+                general_logger.error(f"Could not prefill the '{self.alias}' connection pool: {e}")
+                break
+            with self.condition:
+                self.idle.append(entry)
+                self._report()
+                self.condition.notify()
+
+    def _healthy(self, entry):
+        now = time.monotonic()
+        reason = None
+        if now - entry.created_at > self.max_lifetime:
+            reason = 'lifetime'
+        elif now - entry.released_at >= self.ping_after:
+            try:
+                self._ping(entry.connection)
+            except Exception:
+                reason = 'ping'
+        if reason is None:
+            return True
+        DB_POOL_DISCARDS.labels(self.alias, reason).inc()
+        self._close(entry.connection)
+        with self.condition:
+            self.condition.notify()
+        return False
+
+    def _prune(self, now):
+        # Take out connections idle for longer than max_idle while the pool is above min_size (oldest idle first)
+        stale = []
+        while self.idle and self.size > self.min_size and now - self.idle[0].released_at > self.max_idle:
+            stale.append(self.idle.popleft())
+        return stale
+
+    def _report(self):
+        DB_POOL_CONNECTIONS.labels(self.alias, 'idle').set(len(self.idle))
+        DB_POOL_CONNECTIONS.labels(self.alias, 'in_use').set(len(self.in_use))
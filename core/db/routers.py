@@ -0,0 +1,132 @@
+from contextlib import contextmanager
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+import contextvars, logging, random, threading, time
+
+
+general_logger = logging.getLogger('general_logger')
+
+# Set while a view marked with replica_reads runs, reads are routed to a replica only then
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def pin_key(user_id):
+    return f'db:pin:{user_id}'
+
+
+# Send the user's reads to the primary for a while after they wrote, so they always see their own changes
+def pin_to_primary(user_id):
+    cache.set(pin_key(user_id), 1, settings.DB_REPLICA_STICKY_SECONDS)
+
+
+@contextmanager
+def replica_reads_for(request):
+    user = getattr(request, 'user', None)
+    try:
+        pinned = bool(user and user.is_authenticated and cache.get(pin_key(user.pk)))
+    except Exception:
+        # Without the cache we cannot tell whether the user just wrote, so stay on the primary
+        pinned = True
+    token = _replica_reads.set(not pinned and request.method in ('GET', 'HEAD'))
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(view_method):
+    """
+    Lets the read queries of a list/report view go to a healthy replica.
+    Users who wrote within DB_REPLICA_STICKY_SECONDS keep reading from the primary.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        with replica_reads_for(request):
+            return view_method(self, request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaHealth:
+    """
+    Remembers per process whether each replica is reachable and within DB_REPLICA_MAX_LAG seconds of the primary,
+    re-checking at most every DB_REPLICA_CHECK_INTERVAL seconds.
+    """
+    def __init__(self):
+        self.checked = {}
+        self.lock = threading.Lock()
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        healthy, checked_at = self.checked.get(alias, (False, None))
+        if checked_at is not None and now - checked_at < settings.DB_REPLICA_CHECK_INTERVAL:
+            return healthy
+        with self.lock:
+            # Only one thread re-checks, the others keep the previous answer meanwhile
+            healthy, checked_at = self.checked.get(alias, (False, None))
+            if checked_at is not None and now - checked_at < settings.DB_REPLICA_CHECK_INTERVAL:
+                return healthy
+            self.checked[alias] = (healthy, now)
+        healthy = self.check(alias)
+        self.checked[alias] = (healthy, time.monotonic())
+        return healthy
+
+    @staticmethod
+    def check(alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                if connections[alias].vendor != 'mysql':
+                    cursor.execute('SELECT 1')
+                    return True
+                cursor.execute('SHOW REPLICA STATUS')
+                row = cursor.fetchone()
+                if row is None:
+                    # Not replicating at all, e.g. a standalone copy
+                    return True
+                columns = [column[0] for column in cursor.description]
+                lag = dict(zip(columns, row)).get('Seconds_Behind_Source')
+                if lag is None or lag > settings.DB_REPLICA_MAX_LAG:
+                    general_logger.warning(f"Replica {alias} skipped, replication lag is {lag}s")
+                    return False
+                return True
+        except Exception as e:
+            general_logger.error(f"Replica {alias} health check failed: {e}")
+            return False
+
+
+health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    """
+    Routes reads made inside replica_reads views to a random healthy replica and everything else to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return 'default'
+        healthy = [alias for alias in replica_aliases() if health.is_healthy(alias)]
+        return random.choice(healthy) if healthy else 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaChangelistMixin:
+    """
+    ModelAdmin mixin serving the changelist pages from a replica.
+    """
+    def changelist_view(self, request, extra_context=None):
+        with replica_reads_for(request):
+            return super().changelist_view(request, extra_context)
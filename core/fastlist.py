@@ -0,0 +1,84 @@
+from functools import lru_cache
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+# Fields whose primitive database value is already what the serializer would output (JSON columns come back decoded)
+PASSTHROUGH = (serializers.CharField, serializers.IntegerField, serializers.BooleanField, serializers.ChoiceField, serializers.JSONField)
+
+
+def _iso_datetime(value):
+    # DRF's ISO 8601 output for UTC datetimes, which is what the database hands back when TIME_ZONE is UTC
+    text = value.isoformat()
+    return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+
+def _converter(field):
+    if isinstance(field, PASSTHROUGH):
+        return None
+    if isinstance(field, serializers.DateTimeField):
+        utc = settings.USE_TZ and settings.TIME_ZONE == 'UTC'
+        if utc and getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601 and getattr(field, 'timezone', None) is None:
+            return _iso_datetime
+    elif isinstance(field, serializers.DateField):
+        if getattr(field, 'format', api_settings.DATE_FORMAT) == ISO_8601:
+            return lambda value: value.isoformat()
+    elif isinstance(field, serializers.UUIDField):
+        if field.uuid_format == 'hex_verbose':
+            return str
+    elif isinstance(field, (serializers.FileField, serializers.SerializerMethodField, serializers.BaseSerializer)):
+        raise ImproperlyConfigured(f"{field.__class__.__name__} '{field.field_name}' is not supported by the fast list path")
+    return field.to_representation
+
+
+class RowPlan:
+    """
+    Read-only rendering of a plain ModelSerializer: the columns to fetch with values_list
+    and a converter per column that needs one, worked out once per serializer class.
+    """
+    def __init__(self, serializer_class):
+        model = serializer_class.Meta.model
+        self.names, self.columns, self.converters = [], [], []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            self.names.append(name)
+            self.columns.append(model._meta.get_field(field.source).attname)
+            if convert := _converter(field):
+                self.converters.append((len(self.columns) - 1, convert))
+
+    def rows(self, queryset):
+        names, converters = self.names, self.converters
+        data = []
+        for values in queryset.values_list(*self.columns):
+            if converters:
+                values = list(values)
+                for index, convert in converters:
+                    if values[index] is not None:
+                        values[index] = convert(values[index])
+            data.append(dict(zip(names, values)))
+        return data
+
+
+@lru_cache(maxsize=None)
+def row_plan(serializer_class):
+    return RowPlan(serializer_class)
+
+
+# Plans depend on the time zone and DRF format settings they were built under
+@receiver(setting_changed)
+def _reset_row_plans(setting, **kwargs):
+    if setting in ('TIME_ZONE', 'USE_TZ', 'REST_FRAMEWORK'):
+        row_plan.cache_clear()
+
+
+def fast_rows(serializer_class, queryset):
+    """
+    Same output as serializer_class(queryset, many=True).data, built from values_list tuples
+    without model instances or per-row serializer field calls.
+    """
+    return row_plan(serializer_class).rows(queryset)
@@ -0,0 +1,65 @@
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler, WatchedFileHandler
+import contextvars, json, logging, queue
+
+
+# Id of the request being served by the current thread/task, set by RequestIdMiddleware
+request_id_var = contextvars.ContextVar('request_id', default='-')
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Attaches the current request id to every record so formatters can reference it.
+    """
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats each record as a single JSON object, including the request id and upstream timings when present.
+    """
+    extra_fields = ('upstream_method', 'upstream_endpoint', 'upstream_status', 'upstream_ms', 'timings_ms')
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'request_id': getattr(record, 'request_id', request_id_var.get()),
+            'message': record.getMessage(),
+        }
+        for field in self.extra_fields:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class QueuedFileHandler(QueueHandler):
+    """
+    Formats records in the calling thread and hands them to a single listener thread that writes the file,
+    so disk latency never blocks a request.
+    By default the file is only appended to and reopened once an external logrotate moves it, which is safe with
+    every gunicorn worker writing the same file. Rotating by size (`maxBytes`) or time (`when`) in-process is only
+    safe for a single process, e.g. runserver or a management command with a file of its own.
+    """
+    def __init__(self, filename, maxBytes=0, backupCount=0, when=None, interval=1, encoding='utf-8'):
+        super().__init__(queue.SimpleQueue())
+        if when:
+            self.target = TimedRotatingFileHandler(filename, when=when, interval=interval, backupCount=backupCount, encoding=encoding, delay=True)
+        elif maxBytes:
+            self.target = RotatingFileHandler(filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding, delay=True)
+        else:
+            self.target = WatchedFileHandler(filename, encoding=encoding, delay=True)
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def close(self):
+        # Drain pending records before the file is closed (also called by logging.shutdown at exit)
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.target.close()
+        super().close()
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+import os
+
+
+# NIBSS client metrics, labelled by operation name (see endpoint_label)
+NIBSS_REQUEST_SECONDS = Histogram(
+    'nibss_request_duration_seconds', 'Latency of NIBSS API calls', ['endpoint', 'method'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60),
+)
+NIBSS_RESPONSES = Counter('nibss_responses_total', 'NIBSS API responses by status code', ['endpoint', 'status'])
+NIBSS_TIMEOUTS = Counter('nibss_timeouts_total', 'NIBSS API calls that timed out', ['endpoint'])
+NIBSS_RETRIES = Counter('nibss_retries_total', 'NIBSS API calls scheduled for another attempt', ['endpoint'])
+NIBSS_TOKEN_CACHE = Counter('nibss_token_cache_total', 'API token cache lookups by result', ['endpoint', 'result'])
+NIBSS_COALESCED = Counter('nibss_coalesced_total', 'NIBSS calls answered by an identical call already in flight', ['endpoint'])
+
+# Database connection pool (core.db.pool), per database alias
+DB_POOL_WAIT_SECONDS = Histogram(
+    'db_pool_wait_seconds', 'Time spent checking a connection out of the pool', ['alias'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_POOL_CONNECTIONS = Gauge('db_pool_connections', 'Pooled database connections by state', ['alias', 'state'], multiprocess_mode='livesum')
+DB_POOL_TIMEOUTS = Counter('db_pool_timeouts_total', 'Checkouts that gave up waiting for a free connection', ['alias'])
+DB_POOL_DISCARDS = Counter('db_pool_discards_total', 'Pooled connections closed instead of reused', ['alias', 'reason'])
+
+# Emails waiting for the in-process email dispatcher, summed over live workers
+EMAIL_DISPATCH_QUEUE = Gauge('email_dispatch_queue_depth', 'Emails queued for the in-process dispatcher', multiprocess_mode='livesum')
+
+
+# Operation name of a NIBSS path, e.g. ndd/api/MandateRequest/MandateStatus?MandateCode=... -> MandateStatus
+def endpoint_label(endpoint):
+    parts = endpoint.split('?')[0].strip('/').split('/')
+    # Paths are ndd/api/<Controller>/<Operation>/<path parameters...>
+    if len(parts) > 3 and parts[:2] == ['ndd', 'api']:
+        return parts[3]
+    return parts[-1]
+
+
+class OutboxCollector:
+    """
+    Reports the NIBSS and email outbox backlogs from the database at scrape time.
+    """
+    def collect(self):
+        from directdebit.outbox import outbox_stats  # Local import to avoid circular imports
+        from accounts.emails import email_outbox_stats
+        try:
+            nibss, email = outbox_stats(), email_outbox_stats()
+        except Exception:
+            return
+        yield GaugeMetricFamily('nibss_outbox_depth', 'Mandate requests waiting in the NIBSS outbox', value=nibss['depth'])
+        yield GaugeMetricFamily('nibss_outbox_oldest_age_seconds', 'Age of the oldest NIBSS outbox row', value=nibss['oldest_age_seconds'])
+        yield GaugeMetricFamily('email_outbox_pending', 'Emails waiting in the email outbox', value=email['pending'])
+        yield GaugeMetricFamily('email_outbox_oldest_pending_age_seconds', 'Age of the oldest pending email', value=email['oldest_pending_age_seconds'])
+
+
+class _DefaultCollector:
+    # Exposes the process default registry next to the outbox collector
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def _registry():
+    # gunicorn workers write their samples to PROMETHEUS_MULTIPROC_DIR and are aggregated per scrape
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = CollectorRegistry()
+        registry.register(_DefaultCollector())
+    registry.register(OutboxCollector())
+    return registry
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of the application metrics.
+    Requires "Authorization: Bearer <METRICS_TOKEN>", the endpoint is only open without a token when DEBUG is on.
+    """
+    if not settings.METRICS_TOKEN:
+        if not settings.DEBUG:
+            return HttpResponse(status=404)
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f"Bearer {settings.METRICS_TOKEN}"):
+        return HttpResponse(status=401)
+    return HttpResponse(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
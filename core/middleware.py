@@ -0,0 +1,185 @@
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from core.db.routers import pin_to_primary, replica_aliases
+from core.log_handlers import request_id_var
+from core.timing import span, start_recording, start_upstream_capture, stop_recording, stop_upstream_capture
+from utils import general_logger
+import json, logging, math, random, re, time, uuid
+
+
+class RequestIdMiddleware:
+    """
+    Assigns every request an id (reusing a well-formed X-Request-ID header from the client or proxy),
+    exposes it to the log records of the request and echoes it back in the response.
+    """
+    header_pattern = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get('X-Request-ID', '')
+        if not self.header_pattern.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        token = request_id_var.set(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id_var.reset(token)
+        response['X-Request-ID'] = request_id
+        return response
+
+
+class ServerTimingMiddleware:
+    """
+    Records how long each phase of a request took (database queries plus the spans opened with
+    core.timing.span, e.g. validate, token, nibss, insert, audit) and reports them in a Server-Timing
+    header and one log line per request. Removed from the stack entirely unless SERVER_TIMING_ENABLED.
+    """
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = start_recording()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self.time_query))
+                response = self.get_response(request)
+        finally:
+            timings = stop_recording(token)
+        timings['total'] = (time.perf_counter() - started, 1)
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={seconds * 1000:.1f}' + (f';desc="{count}x"' if count > 1 else '')
+            for name, (seconds, count) in timings.items()
+        )
+        general_logger.info(
+            f"Server timing {request.method} {request.path} -> {response.status_code}: "
+            + ' '.join(f'{name}={seconds * 1000:.1f}ms' + (f'({count})' if count > 1 else '') for name, (seconds, count) in timings.items()),
+            extra={'timings_ms': {name: round(seconds * 1000, 2) for name, (seconds, _) in timings.items()}},
+        )
+        return response
+
+    @staticmethod
+    def time_query(execute, sql, params, many, context):
+        with span('db'):
+            return execute(sql, params, many, context)
+
+
+# Field names and value types of a payload, values themselves are never recorded
+def payload_shape(value):
+    if isinstance(value, dict):
+        return {str(key): payload_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [payload_shape(value[0])] if value else []
+    if value is None:
+        return 'null'
+    return type(value).__name__
+
+
+class TrafficCaptureMiddleware:
+    """
+    Opt-in recorder of sanitized API traffic for load-test replay (see benchmarks/replay.py).
+    Writes one JSON line per sampled API request to TRAFFIC_CAPTURE_FILE with the route, caller role,
+    status, duration, the shape of the query and payload, and the NIBSS calls it made.
+    Removed from the stack entirely unless TRAFFIC_CAPTURE_FILE is set.
+    """
+    max_json_body = 1024 * 1024
+
+    def __init__(self, get_response):
+        if not settings.TRAFFIC_CAPTURE_FILE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.logger = logging.getLogger('traffic_logger')
+
+    def __call__(self, request):
+        if not request.path.startswith('/api/') or random.random() >= settings.TRAFFIC_CAPTURE_SAMPLE_RATE:
+            return self.get_response(request)
+        body = None
+        if request.content_type == 'application/json' and int(request.META.get('CONTENT_LENGTH') or 0) <= self.max_json_body:
+            # Read the body before the view consumes the stream so it can still be inspected afterwards
+            body = request.body
+        token = start_upstream_capture()
+        timestamp, started = time.time(), time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            upstream = stop_upstream_capture(token)
+        duration = time.perf_counter() - started
+        try:
+            self.logger.info(json.dumps(self.entry(request, response, body, timestamp, duration, upstream)))
+        except Exception as e:
+            general_logger.error(f"Traffic capture failed for {request.path}: {e}")
+        return response
+
+    @staticmethod
+    def entry(request, response, body, timestamp, duration, upstream):
+        if body:
+            try:
+                payload = payload_shape(json.loads(body))
+            except ValueError:
+                payload = 'invalid'
+        elif request.content_type in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+            payload = {key: 'str' for key in request.POST}
+            payload.update({key: {'file': file.size} for key, file in request.FILES.items()})
+        else:
+            payload = None
+        match = request.resolver_match
+        return {
+            'ts': round(timestamp, 3),
+            'method': request.method,
+            'path': request.path,
+            'route': match.route if match else None,
+            'url_name': match.url_name if match else None,
+            'role': getattr(getattr(request, 'user', None), 'role', None),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'content_type': request.content_type,
+            'query': {key: 'str' for key in request.GET},
+            'payload': payload,
+            'upstream': upstream,
+        }
+
+
+class RateLimitHeadersMiddleware:
+    """
+    Reports the caller's remaining throttle budget, as recorded by RoleRateThrottle, in X-RateLimit-* headers.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if rate_limit := getattr(request, 'rate_limit', None):
+            response['X-RateLimit-Limit'] = str(rate_limit['limit'])
+            response['X-RateLimit-Remaining'] = str(rate_limit['remaining'])
+            response['X-RateLimit-Reset'] = str(math.ceil(rate_limit['reset']))
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Pins a user's reads to the primary database for DB_REPLICA_STICKY_SECONDS after a successful write request,
+    so list views served from a replica never miss the user's own changes.
+    """
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # DRF leaves the authenticated user on the request once the view ran
+        user = getattr(request, 'user', None)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400 and user and user.is_authenticated:
+            try:
+                pin_to_primary(user.pk)
+            except Exception as e:
+                general_logger.error(f"Could not pin user {user.pk} to the primary database: {e}")
+        return response
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from utils import general_logger
+import hashlib, threading
+
+
+CONTENT_TYPE = 'application/vnd.oai.openapi+json'
+
+_schema = None
+_schema_lock = threading.Lock()
+
+
+def build_schema():
+    """
+    Generates the OpenAPI document from the views, as the indented JSON stored in OPENAPI_SCHEMA_FILE.
+    """
+    from drf_spectacular.renderers import OpenApiJsonRenderer
+    from drf_spectacular.settings import spectacular_settings
+    # Registers the JWT authentication extension, only schema generation needs it
+    import accounts.schema  # noqa: F401
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    return OpenApiJsonRenderer().render(schema, renderer_context={'indent': 2}) + b'\n'
+
+
+def load_schema():
+    """
+    The stored schema and its ETag, read once per process.
+    Without a stored file the schema is generated on first use instead.
+    """
+    global _schema
+    if _schema is None:
+        with _schema_lock:
+            if _schema is None:
+                try:
+                    with open(settings.OPENAPI_SCHEMA_FILE, 'rb') as file:
+                        content = file.read()
+                except FileNotFoundError:
+                    general_logger.warning(f"{settings.OPENAPI_SCHEMA_FILE} not found, generating the schema at runtime")
+                    content = build_schema()
+                _schema = (content, f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+    return _schema
+
+
+def schema_view(request):
+    content, etag = load_schema()
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type=CONTENT_TYPE)
+    response['ETag'] = etag
+    # Clients revalidate, the ETag only changes when a deploy ships a new schema
+    response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+    return response
+
+
+def _lazy_view(name):
+    # The drf_spectacular views are imported on the first documentation request instead of with the URLconf
+    view = None
+
+    def lazy_view(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            from drf_spectacular import views
+            view = getattr(views, name).as_view(url_name='schema')
+        return view(request, *args, **kwargs)
+    lazy_view.csrf_exempt = True
+    return lazy_view
+
+
+swagger_ui_view = _lazy_view('SpectacularSwaggerView')
+redoc_view = _lazy_view('SpectacularRedocView')
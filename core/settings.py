@@ -11,7 +11,8 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
+from corsheaders.defaults import default_headers
 from datetime import timedelta
 import os, logging.config
 
@@ -33,6 +34,9 @@ ALLOWED_HOSTS = ["127.0.0.1", "dap-alertgroup.com.ng", "ndd.dap-alertgroup.com.n
 
 CORS_ALLOWED_ORIGINS = ["http://localhost:5173", "http://localhost:3000", "http://127.0.0.1:5173", "https://ndd.dap-alertgroup.com.ng"]
 
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+CORS_EXPOSE_HEADERS = ["x-ratelimit-limit", "x-ratelimit-remaining", "x-ratelimit-reset", "retry-after"]
+
 CSRF_TRUSTED_ORIGINS = ["https://ndd.dap-alertgroup.com.ng"]
 
 
@@ -59,6 +63,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestIdMiddleware',
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.TrafficCaptureMiddleware',
+    'core.middleware.RateLimitHeadersMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -102,15 +111,40 @@ DATABASES = {
 
     # Remote or production db
     'default': {
-        'ENGINE': 'mysql.connector.django',
+        # core.db.mysql is mysql.connector.django with a per-process connection pool (see core/db/mysql/base.py)
+        'ENGINE': 'core.db.mysql' if config('DB_POOL_ENABLED', default=True, cast=bool) else 'mysql.connector.django',
         'NAME': config('DB_NAME'),
         'HOST': config('DB_HOST'),
         'USER': config('DB_USER'),
         'PORT': config('DB_PORT'),
-        'PASSWORD': config('DB_PASS')
+        'PASSWORD': config('DB_PASS'),
+        'POOL': {
+            'MIN_SIZE': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+            'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=10, cast=int),  # per worker process
+            'MAX_LIFETIME': config('DB_POOL_MAX_LIFETIME', default=1800, cast=int),  # below MySQL's wait_timeout
+            'MAX_IDLE': config('DB_POOL_MAX_IDLE', default=300, cast=int),
+            'PING_AFTER': config('DB_POOL_PING_AFTER', default=30, cast=int),  # idle seconds before a pre-ping
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=10, cast=int),  # wait for a free connection
+        },
     }
 }
 
+# Read replicas as host or host:port, same credentials as the primary, e.g. DB_REPLICA_HOSTS=10.0.0.5,10.0.0.6:3307
+# Only list/report views marked with core.db.routers.replica_reads read from them
+for number, replica in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    replica_host, _, replica_port = replica.partition(':')
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+DB_REPLICA_STICKY_SECONDS = config('DB_REPLICA_STICKY_SECONDS', default=10, cast=int)  # user reads from the primary after a write
+DB_REPLICA_MAX_LAG = config('DB_REPLICA_MAX_LAG', default=5, cast=int)  # seconds behind the primary before a replica is skipped
+DB_REPLICA_CHECK_INTERVAL = config('DB_REPLICA_CHECK_INTERVAL', default=5, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -171,16 +205,31 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Throttling: sliding-window quotas per caller role and endpoint scope (core.throttling.RoleRateThrottle).
+# Counted in Redis, and so shared by every worker, whenever REDIS_URL is set. Views select a scope with `throttle_scope`.
+ROLE_THROTTLE_RATES = {
+    'default': {'anon': '5/minute', 'CSO': '120/minute', 'CREDIT': '60/minute', 'IT': '60/minute', 'OTHERS': '10/minute'},
+    # Views that call NIBSS
+    'nibss': {'CSO': '60/minute', 'CREDIT': '60/minute', 'IT': '30/minute'},
+}
+
+
+# Authenticate API calls from the role, email and active flag embedded in the access token instead of loading the user.
+# Role and active flag are re-checked through a cache entry refreshed every JWT_USER_STATE_TTL seconds and on user changes.
+JWT_STATELESS_AUTH = config('JWT_STATELESS_AUTH', default=True, cast=bool)
+JWT_USER_STATE_TTL = config('JWT_USER_STATE_TTL', default=60, cast=int)
+
+
 # REST_FRAMEWORK configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.StatelessJWTAuthentication' if JWT_STATELESS_AUTH
+        else 'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
 
-    'DEFAULT_THROTTLE_RATES': {
-        'anon': '5/minute',
-        'user': '10/minute',
-    },
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.RoleRateThrottle',
+    ],
 
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.MultiPartParser',
@@ -192,6 +241,9 @@ REST_FRAMEWORK = {
 
 
 # drf_spectacular (swagger) configuration
+# Generated schema served at /schema, rebuild with "manage.py generate_schema" when the API changes
+OPENAPI_SCHEMA_FILE = BASE_DIR / 'core' / 'openapi.json'
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Alert Group Direct Debit API',
     'DESCRIPTION': 'This is a backend system for Alert Group Direct Debit application where staff can log in, create mandate, and track mandate status integrated with JWT authentication feature.',
@@ -205,6 +257,8 @@ SPECTACULAR_SETTINGS = {
         'persistAuthorization': True,
     },
     'COMPONENT_SPLIT_REQUEST': True,  # Better handling of request/response schemas
+    # Pinned so operation ids and tags do not depend on which other views the URLconf holds
+    'SCHEMA_PATH_PREFIX': '/',
 }
 
 
@@ -225,25 +279,42 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     'JTI_CLAIM': 'jti',
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.RoleTokenObtainPairSerializer',
+    # Refresh tokens are blacklisted by jti in the cache when it is shared between workers (REDIS_URL),
+    # otherwise in the token_blacklist tables (see accounts.tokens.CachedRefreshToken)
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.CachedTokenRefreshSerializer',
 }
 
 
 # Cache configuration
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',  # or use Redis
-        'LOCATION': 'unique-api-key-cache',
+# Redis is used whenever REDIS_URL is set so that every worker shares the same cache,
+# otherwise each process falls back to its own in-memory cache.
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    # Remote or production cache
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            }
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-api-key-cache',
+        }
     }
 
-    # # Remote or production cache 
-    # 'default': {
-    #     'BACKEND': 'django_redis.cache.RedisCache',  # or use Redis
-    #     'LOCATION': config('REDIS_URL', 'redis://localhost:6379/0'),
-    #     'OPTIONS': {
-    #         'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-    #     }
-    # }
-}
+
+# Idempotency-Key configuration
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)  # how long a stored response can be replayed
+IDEMPOTENCY_LOCK_TIMEOUT = config('IDEMPOTENCY_LOCK_TIMEOUT', default=120, cast=int)  # in-flight marker expiry
+IDEMPOTENCY_WAIT_TIMEOUT = config('IDEMPOTENCY_WAIT_TIMEOUT', default=60, cast=int)  # how long a duplicate waits
 
 
 # Email settings
@@ -255,10 +326,16 @@ EMAIL_HOST_USER = config("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD")
 EMAIL_USE_TLS = True
 EMAIL_USE_SSL = False
-EMAIL_TIMEOUT = 3600  # 3600 sec
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=30, cast=int)  # seconds per SMTP operation
+EMAIL_DISPATCH_WORKERS = config('EMAIL_DISPATCH_WORKERS', default=2, cast=int)  # sending threads per process
+EMAIL_DISPATCH_BATCH_SIZE = config('EMAIL_DISPATCH_BATCH_SIZE', default=50, cast=int)  # emails sent per connection round
+EMAIL_DISPATCH_QUEUE_SIZE = config('EMAIL_DISPATCH_QUEUE_SIZE', default=1000, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_OUTBOX_LEASE = config('EMAIL_OUTBOX_LEASE', default=300, cast=int)  # seconds before a claimed email is retried
 
 
 # NIBSS API Config
+NIBSS_BASE_URL=config('NIBSS_BASE_URL', default='https://api.nibss-plc.com.ng').rstrip('/')
 API_KEY=config('API_KEY')
 CLIENT_SECRET=config('CLIENT_SECRET')
 CLIENT_ID=config('CLIENT_ID')
@@ -266,32 +343,83 @@ SCOPE=config('SCOPE')
 API_REQUEST_TIMEOUT=config('API_REQUEST_TIMEOUT')
 
 
+# Server-Timing header and per-request phase log line (middleware is dropped when disabled)
+SERVER_TIMING_ENABLED = config('SERVER_TIMING_ENABLED', default=False, cast=bool)
+
+
+# Traffic capture for load-test replay, one JSON line per API request (middleware is dropped when unset)
+TRAFFIC_CAPTURE_FILE = config('TRAFFIC_CAPTURE_FILE', default='')
+TRAFFIC_CAPTURE_SAMPLE_RATE = config('TRAFFIC_CAPTURE_SAMPLE_RATE', default=1.0, cast=float)
+
+
+# Prometheus metrics endpoint, scrapes must send "Authorization: Bearer <METRICS_TOKEN>"
+# Without a token /metrics answers 404 unless DEBUG is on
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+
+# NIBSS outbox configuration
+NIBSS_ASYNC_WRITES = config('NIBSS_ASYNC_WRITES', default=False, cast=bool)  # queue every write, not only "Prefer: respond-async"
+NIBSS_OUTBOX_CONCURRENCY = config('NIBSS_OUTBOX_CONCURRENCY', default=4, cast=int)  # parallel NIBSS calls per worker
+NIBSS_OUTBOX_MAX_ATTEMPTS = config('NIBSS_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)
+NIBSS_OUTBOX_LEASE = config('NIBSS_OUTBOX_LEASE', default=300, cast=int)  # seconds before a claimed row is retried
+
+
+# Mandate status lookups
+MANDATE_STATUS_CACHE_TTL = config('MANDATE_STATUS_CACHE_TTL', default=60, cast=int)  # seconds a fetched status is reused
+MANDATE_STATUS_FANOUT = config('MANDATE_STATUS_FANOUT', default=8, cast=int)  # parallel NIBSS calls per batch request
+MANDATE_STATUS_BATCH_MAX = config('MANDATE_STATUS_BATCH_MAX', default=500, cast=int)  # codes accepted per batch request
+
+
 # Error logger configuration
+# Handlers only enqueue records, a listener thread per file does the writing and rotation.
+LOG_FORMAT = config('LOG_FORMAT', default='verbose')  # 'json' for structured JSON lines
+# Log files are rotated by an external logrotate, the handlers reopen a file once it has been moved.
+# In-process rotation races between gunicorn workers, only enable it for a single process.
+LOG_MAX_BYTES = config('LOG_MAX_BYTES', default=0, cast=int)  # size based rotation, 0 leaves it to logrotate
+LOG_ROTATE_WHEN = config('LOG_ROTATE_WHEN', default=None)  # time based rotation instead, e.g. 'midnight'
+LOG_BACKUP_COUNT = config('LOG_BACKUP_COUNT', default=10, cast=int)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {
+            '()': 'core.log_handlers.RequestIdFilter',
+        },
+    },
     'formatters': {
         'verbose': {
-            'format': '{levelname} {asctime} {module} {message}',
+            'format': '{levelname} {asctime} {request_id} {module} {message}',
             'style': '{',
         },
         'simple': {
             'format': '{levelname} {asctime} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'core.log_handlers.JsonLinesFormatter',
+        },
     },
     'handlers': {
         'file_general': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
+            'class': 'core.log_handlers.QueuedFileHandler',
             'filename': 'general.log',
-            'formatter': 'verbose',
+            'maxBytes': LOG_MAX_BYTES,
+            'backupCount': LOG_BACKUP_COUNT,
+            'when': LOG_ROTATE_WHEN,
+            'filters': ['request_id'],
+            'formatter': LOG_FORMAT,
         },
         'file_email': {
             'level': 'ERROR',
-            'class': 'logging.FileHandler',
+            'class': 'core.log_handlers.QueuedFileHandler',
             'filename': 'email_errors.log',
-            'formatter': 'verbose',
+            'maxBytes': LOG_MAX_BYTES,
+            'backupCount': LOG_BACKUP_COUNT,
+            'when': LOG_ROTATE_WHEN,
+            'filters': ['request_id'],
+            'formatter': LOG_FORMAT,
         },
     },
     'loggers': {
@@ -313,4 +441,20 @@ LOGGING = {
     },
 }
 
+if TRAFFIC_CAPTURE_FILE:
+    LOGGING['formatters']['message'] = {'format': '{message}', 'style': '{'}
+    LOGGING['handlers']['file_traffic'] = {
+        'level': 'INFO',
+        'class': 'core.log_handlers.QueuedFileHandler',
+        'filename': TRAFFIC_CAPTURE_FILE,
+        'maxBytes': LOG_MAX_BYTES,
+        'backupCount': LOG_BACKUP_COUNT,
+        'formatter': 'message',
+    }
+    LOGGING['loggers']['traffic_logger'] = {
+        'handlers': ['file_traffic'],
+        'level': 'INFO',
+        'propagate': False,
+    }
+
 logging.config.dictConfig(LOGGING)
@@ -0,0 +1,136 @@
+from collections import deque
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+from utils import general_logger
+import threading, time, uuid
+
+
+# Sliding-window log in a sorted set, evaluated atomically in Redis.
+# KEYS[1] = window key; ARGV = now in ms, window in ms, limit, unique member
+# Returns {allowed, requests in the window, ms until the oldest request leaves the window}
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+local count = redis.call('ZCARD', KEYS[1])
+local allowed = 0
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    count = count + 1
+    allowed = 1
+end
+redis.call('PEXPIRE', KEYS[1], window)
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+local reset = window
+if oldest[2] then
+    reset = tonumber(oldest[2]) + window - now
+end
+return {allowed, count, reset}
+"""
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+# '120/minute' -> (120, 60)
+def parse_rate(rate):
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class RedisWindow:
+    """
+    Sliding windows shared by every worker through the Redis cache.
+    """
+    def __init__(self):
+        from django_redis import get_redis_connection
+        self.script = get_redis_connection('default').register_script(SLIDING_WINDOW_SCRIPT)
+
+    def hit(self, key, limit, window):
+        now_ms = int(time.time() * 1000)
+        allowed, count, reset_ms = self.script(keys=[key], args=[now_ms, window * 1000, limit, f'{now_ms}-{uuid.uuid4().hex[:8]}'])
+        return bool(allowed), int(count), int(reset_ms) / 1000
+
+
+class LocalWindow:
+    """
+    In-process sliding windows, used when no Redis cache is configured (each worker counts on its own).
+    Keys nobody hit for a whole window, e.g. one-off anonymous addresses, are swept every `sweep_interval` seconds.
+    """
+    sweep_interval = 60
+
+    def __init__(self):
+        # key -> (window in seconds, deque of hit times)
+        self.windows = {}
+        self.lock = threading.Lock()
+        self.next_sweep = time.monotonic() + self.sweep_interval
+
+    def hit(self, key, limit, window):
+        now = time.monotonic()
+        with self.lock:
+            if now >= self.next_sweep:
+                self.sweep(now)
+            _, hits = self.windows.setdefault(key, (window, deque()))
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            allowed = len(hits) < limit
+            if allowed:
+                hits.append(now)
+            reset = hits[0] + window - now if hits else window
+            if not hits:
+                del self.windows[key]
+            return allowed, len(hits), reset
+
+    def sweep(self, now):
+        # The newest hit is last, a key whose newest hit left its window has nothing left to count
+        self.windows = {key: entry for key, entry in self.windows.items() if entry[1][-1] > now - entry[0]}
+        self.next_sweep = now + self.sweep_interval
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def window_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                redis = settings.CACHES['default']['BACKEND'].startswith('django_redis')
+                _store = RedisWindow() if redis else LocalWindow()
+    return _store
+
+
+class RoleRateThrottle(BaseThrottle):
+    """
+    Sliding-window throttle with quotas per caller role and per endpoint scope (ROLE_THROTTLE_RATES).
+    Views pick their scope with `throttle_scope`; a scope without a rate for the role uses the 'default' scope.
+    Anonymous callers are throttled per client address under the 'anon' rate.
+    The outcome is left on the request for RateLimitHeadersMiddleware to report.
+    """
+    def allow_request(self, request, view):
+        user = request.user
+        role = getattr(user, 'role', None) if user and user.is_authenticated else 'anon'
+        scope = getattr(view, 'throttle_scope', None) or 'default'
+        rates = settings.ROLE_THROTTLE_RATES
+        rate = rates.get(scope, {}).get(role) or rates['default'].get(role)
+        if not rate:
+            return True
+        # Scopes without their own rate for this role share the default window
+        if role not in rates.get(scope, {}):
+            scope = 'default'
+        ident = user.pk if role != 'anon' else self.get_ident(request)
+        limit, window = parse_rate(rate)
+
+        try:
+            allowed, count, reset = window_store().hit(f'throttle:{scope}:{role}:{ident}', limit, window)
+        except Exception as e:
+            # The rate limiter must never take the API down with it
+            general_logger.error(f"Throttle check failed, allowing request: {e}")
+            return True
+        self.reset = reset
+        request._request.rate_limit = {'limit': limit, 'remaining': max(limit - count, 0), 'reset': reset}
+        return allowed
+
+    def wait(self):
+        return self.reset
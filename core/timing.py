@@ -0,0 +1,71 @@
+from contextlib import nullcontext
+import contextvars, time
+
+
+# Phase totals of the request being recorded by ServerTimingMiddleware, None when not recording
+_timings = contextvars.ContextVar('server_timings', default=None)
+
+
+class _Span:
+    __slots__ = ('timings', 'name', 'started')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        totals = self.timings.setdefault(self.name, [0.0, 0])
+        totals[0] += time.perf_counter() - self.started
+        totals[1] += 1
+        return False
+
+
+def span(name):
+    """
+    Times the enclosed block under `name` for the current request.
+    Returns a shared no-op context manager when the request is not being recorded.
+    """
+    timings = _timings.get()
+    if timings is None:
+        return _NOOP
+    return _Span(timings, name)
+
+
+_NOOP = nullcontext()
+
+
+# Start collecting spans for the current context, returns the token to pass to stop_recording
+def start_recording():
+    return _timings.set({})
+
+
+# Stop collecting spans, returns {name: (total seconds, count)}
+def stop_recording(token):
+    timings = _timings.get()
+    _timings.reset(token)
+    return {name: (totals[0], totals[1]) for name, totals in (timings or {}).items()}
+
+
+# NIBSS calls made by the request being captured by TrafficCaptureMiddleware, None when not capturing
+_upstream_calls = contextvars.ContextVar('upstream_calls', default=None)
+
+
+def start_upstream_capture():
+    return _upstream_calls.set([])
+
+
+def stop_upstream_capture(token):
+    calls = _upstream_calls.get()
+    _upstream_calls.reset(token)
+    return calls or []
+
+
+# Note an upstream call for the current request when it is being captured
+def record_upstream(call):
+    calls = _upstream_calls.get()
+    if calls is not None:
+        calls.append(call)
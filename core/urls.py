@@ -19,25 +19,29 @@ from accounts.views import *
 from directdebit.views import *
 from django.conf.urls.static import static
 from django.conf import settings
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from core.metrics import metrics_view
+from core.openapi import redoc_view, schema_view, swagger_ui_view
 # from drf_spectacular.renderers import OpenApiYamlRenderer
 
 
 urlpatterns = [
-    # JSON Schema endpoint
-    path('schema', SpectacularAPIView.as_view(), name='schema'),
+    # JSON Schema endpoint, precomputed by "manage.py generate_schema" and served from memory
+    path('schema', schema_view, name='schema'),
     
     # # YAML Schema endpoint (requires OpenAPIRenderer)
     # path('schema.yaml', SpectacularAPIView.as_view(renderer_classes=[OpenApiYamlRenderer]), name='schema-yaml'),
     
     # Swagger UI
-    path('', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+    path('', swagger_ui_view, name='swagger-ui'),
     
     # Redoc UI
-    path('redoc', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path('redoc', redoc_view, name='redoc'),
 
     path("admin", admin.site.urls),
 
+    # Prometheus metrics
+    path('metrics', metrics_view, name='metrics'),
+
     # Utilities Field
     path('api/v1/utils', ChoicesView.as_view(), name='utils'),
 
@@ -46,6 +50,7 @@ urlpatterns = [
     
     # User authentication routes (API)
     path('api/v1/auth/login', LoginView.as_view(), name='user_login'),
+    path('api/v1/auth/refresh', RefreshView.as_view(), name='token_refresh'),
     path('api/v1/auth/logout', LogoutView.as_view(), name='user_logout'),
     path('api/v1/auth/password/reset', PasswordResetView.as_view(), name='password_reset'),
     path('api/v1/auth/password/confirm', PasswordConfirmView.as_view(), name='password_confirm'),
@@ -68,10 +73,16 @@ urlpatterns = [
     path('api/v1/mandates/balance', BalanceEnquiryView.as_view(), name='mandate_balance'),
     path('api/v1/mandates/e-mandate', CreateEMandateView.as_view(), name='create_e_mandate'),
     path('api/v1/mandates/status', MandateStatusView.as_view(), name='mandate_status'),
+    path('api/v1/mandates/status/batch', MandateStatusBatchView.as_view(), name='mandate_status_batch'),
     path('api/v1/mandates/update', UpdateMandateStatusView.as_view(), name='update_mandate_status'),
     path('api/v1/mandates/process', ProcessMandateView.as_view(), name='process_mandate'),
     path('api/v1/mandates/fetch', FetchMandateView.as_view(), name='fetch_mandates'),
     path('api/v1/mandates', MandateListView.as_view(), name='list_mandates'),
+    path('api/v1/mandates/search', MandateSearchView.as_view(), name='search_mandates'),
+    path('api/v1/mandates/summary', MandateSummaryView.as_view(), name='mandate_summary'),
+    path('api/v1/mandates/forecast', MandateForecastView.as_view(), name='mandate_forecast'),
+    path('api/v1/mandates/requests/<uuid:pk>', MandateRequestStatusView.as_view(), name='mandate_request_status'),
+    path('api/v1/mandates/outbox/metrics', OutboxMetricsView.as_view(), name='outbox_metrics'),
 
     # Key request routes (API)
     path('api/v1/key', GetAPIKeyView.as_view(), name='get_key'),
@@ -1,9 +1,31 @@
 from django.contrib import admin
-from .models import Mandate
+from core.db.routers import ReplicaChangelistMixin
+from .models import Mandate, MandateDailyRollup, MandateRequest
+from .search import search_mandates
 
 
 # Register your models here.
 @admin.register(Mandate)
-class MandateAdmin(admin.ModelAdmin):
+class MandateAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = ("mandateCode", "branch", "accountNumber", "subscriberCode", "created_at")
     list_filter = ("branch",)
+    search_fields = ("payerName", "accountName", "payerEmail", "subscriberCode", "accountNumber", "phoneNumber")
+
+    def get_search_results(self, request, queryset, search_term):
+        # Indexed search instead of a LIKE '%term%' scan over every search field
+        if not search_term.strip():
+            return queryset, False
+        return search_mandates(queryset, search_term), False
+
+
+@admin.register(MandateRequest)
+class MandateRequestAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
+    list_display = ("id", "operation", "status", "mandateCode", "requested_by", "created_at")
+    list_filter = ("operation", "status")
+
+
+@admin.register(MandateDailyRollup)
+class MandateDailyRollupAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
+    list_display = ("day", "branch", "mandates", "amount", "updated_at")
+    list_filter = ("branch",)
+    date_hierarchy = "day"
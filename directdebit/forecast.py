@@ -0,0 +1,117 @@
+from datetime import timedelta
+from .models import Branch, Frequency, Mandate, MandateType
+import numpy as np
+
+
+# Days between debits of the fixed-interval frequencies, monthly debits fall on the start date's day of the month
+INTERVALS = {Frequency.WEEKLY: 7, Frequency.EVERY_2_WEEKS: 14}
+SCHEDULED = [*INTERVALS, Frequency.MONTHLY]
+BRANCHES = list(Branch.values)
+
+
+def load_schedules(start, end, branch=None):
+    """
+    Columns of every direct debit mandate with a fixed frequency that is running at some point between start and end,
+    as NumPy arrays: branch index (into BRANCHES), amount, frequency, start and end dates.
+    """
+    mandates = Mandate.objects.filter(mandateType=MandateType.DIRECT_DEBIT, frequency__in=SCHEDULED, startDate__lte=end, endDate__gte=start)
+    if branch:
+        mandates = mandates.filter(branch=branch)
+    rows = list(mandates.order_by().values_list('branch', 'amount', 'frequency', 'startDate', 'endDate'))
+    branches, amounts, frequencies, starts, ends = zip(*rows) if rows else ((), (), (), (), ())
+    index = {name: i for i, name in enumerate(BRANCHES)}
+    return {
+        'branch': np.fromiter((index[name] for name in branches), dtype=np.int64, count=len(rows)),
+        'amount': np.array(amounts, dtype=np.float64),
+        'frequency': np.array(frequencies, dtype='U2'),
+        'start': np.array(starts, dtype='datetime64[D]'),
+        'end': np.array(ends, dtype='datetime64[D]'),
+    }
+
+
+def _interval_debits(branch, amount, first, last, interval, days, size):
+    """
+    Debits every `interval` days from `first` to `last` (day offsets) summed per branch and day,
+    with a strided difference array: +amount at the first debit, -amount one interval after the last,
+    then a running sum along each of the `interval` residues.
+    """
+    length = -(-(days + interval) // interval) * interval
+    totals = []
+    for weights in (amount, None):
+        diff = (np.bincount(branch * length + first, weights, minlength=size * length)
+                - np.bincount(branch * length + last + interval, weights, minlength=size * length))
+        totals.append(diff.reshape(size, length // interval, interval).cumsum(axis=1).reshape(size, length)[:, :days])
+    return totals
+
+
+def expand(schedules, start, days):
+    """
+    Expected debits per branch and day over `days` days from `start`, without a per-mandate Python loop.
+    Returns (amounts, debits), two arrays shaped (len(BRANCHES), days).
+    """
+    size = len(BRANCHES)
+    amounts = np.zeros((size, days))
+    debits = np.zeros((size, days), dtype=np.int64)
+    origin = np.datetime64(start, 'D')
+    # Day offsets from the horizon start, the end is clipped to the horizon
+    first_day = (schedules['start'] - origin).astype(np.int64)
+    last_day = np.minimum((schedules['end'] - origin).astype(np.int64), days - 1)
+
+    for frequency, interval in INTERVALS.items():
+        selected = schedules['frequency'] == frequency
+        begin, finish = first_day[selected], last_day[selected]
+        # First debit on or after the horizon start, and the last one on or before the end
+        first = begin + np.maximum(interval - 1 - begin, 0) // interval * interval
+        running = first <= finish
+        first = first[running]
+        last = first + (finish[running] - first) // interval * interval
+        amount, count = _interval_debits(schedules['branch'][selected][running], schedules['amount'][selected][running],
+                                         first, last, interval, days, size)
+        amounts += amount
+        debits += count.astype(np.int64)
+
+    # Months differ in length, so monthly schedules take one vectorised pass per calendar month of the horizon
+    selected = schedules['frequency'] == Frequency.MONTHLY
+    branch, amount = schedules['branch'][selected], schedules['amount'][selected]
+    begin, finish = first_day[selected], last_day[selected]
+    starts = schedules['start'][selected]
+    day_of_month = (starts - starts.astype('datetime64[M]')).astype(np.int64)
+    horizon_end = origin + days - 1
+    for month in np.arange(origin.astype('datetime64[M]'), horizon_end.astype('datetime64[M]') + 1):
+        month_start = month.astype('datetime64[D]')
+        month_length = ((month + 1).astype('datetime64[D]') - month_start).astype(np.int64)
+        # Debits on the 29th-31st move to the last day of shorter months
+        offset = (month_start - origin).astype(np.int64) + np.minimum(day_of_month, month_length - 1)
+        due = (offset >= np.maximum(begin, 0)) & (offset <= finish)
+        cells = branch[due] * days + offset[due]
+        amounts += np.bincount(cells, amount[due], minlength=size * days).reshape(size, days)
+        debits += np.bincount(cells, minlength=size * days).reshape(size, days)
+    return np.rint(amounts).astype(np.int64), debits
+
+
+def expected_collections(start, days, branch=None):
+    """
+    Expected direct debits per day over the horizon, in total and per branch.
+    """
+    end = start + timedelta(days=days - 1)
+    schedules = load_schedules(start, end, branch)
+    amounts, debits = expand(schedules, start, days)
+    return {
+        'start': start,
+        'end': end,
+        'mandates': len(schedules['amount']),
+        'amount': int(amounts.sum()),
+        'debits': int(debits.sum()),
+        'days': [
+            {
+                'date': start + timedelta(days=day),
+                'amount': int(amounts[:, day].sum()),
+                'debits': int(debits[:, day].sum()),
+                'branches': [
+                    {'branch': BRANCHES[i], 'amount': int(amounts[i, day]), 'debits': int(debits[i, day])}
+                    for i in np.flatnonzero(debits[:, day])
+                ],
+            }
+            for day in range(days)
+        ],
+    }
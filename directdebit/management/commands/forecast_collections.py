@@ -0,0 +1,38 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from directdebit.forecast import expand, load_schedules, BRANCHES
+from directdebit.models import Branch
+import time
+
+
+class Command(BaseCommand):
+    help = "Print the expected direct debits per day, from the amount, frequency and period of running mandates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, default=None, help='First day of the forecast (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--days', type=int, default=30, help='Number of days to forecast')
+        parser.add_argument('--branch', choices=Branch.values, help='Only forecast this branch')
+        parser.add_argument('--by-branch', action='store_true', help='Also print the totals of each branch')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1")
+        start = options['start'] or date.today()
+        days = options['days']
+
+        started = time.perf_counter()
+        schedules = load_schedules(start, start + timedelta(days=days - 1), options['branch'])
+        loaded = time.perf_counter()
+        amounts, debits = expand(schedules, start, days)
+        expanded = time.perf_counter()
+
+        self.stdout.write(f"{'date':<12}{'debits':>10}{'amount':>18}")
+        for day in range(days):
+            self.stdout.write(f"{str(start + timedelta(days=day)):<12}{debits[:, day].sum():>10}{amounts[:, day].sum():>18,}")
+            if options['by_branch']:
+                for i in debits[:, day].nonzero()[0]:
+                    self.stdout.write(f"  {BRANCHES[i]:<10}{debits[i, day]:>10}{amounts[i, day]:>18,}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{debits.sum()} debits totalling {amounts.sum():,} from {len(schedules['amount'])} mandates "
+            f"(loaded in {loaded - started:.2f}s, expanded in {expanded - loaded:.3f}s)"
+        ))
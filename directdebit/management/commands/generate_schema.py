@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.openapi import build_schema
+
+
+class Command(BaseCommand):
+    help = "Write the OpenAPI schema served at /schema to OPENAPI_SCHEMA_FILE, run on every deploy that changes the API"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report whether the stored schema is out of date')
+
+    def handle(self, *args, **options):
+        path = settings.OPENAPI_SCHEMA_FILE
+        schema = build_schema()
+        if options['check']:
+            try:
+                with open(path, 'rb') as file:
+                    current = file.read() == schema
+            except FileNotFoundError:
+                current = False
+            if not current:
+                raise CommandError(f"{path} is out of date, run manage.py generate_schema")
+            self.stdout.write(self.style.SUCCESS(f"{path} is up to date"))
+            return
+        with open(path, 'wb') as file:
+            file.write(schema)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(schema)} bytes to {path}"))
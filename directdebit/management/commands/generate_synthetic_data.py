@@ -0,0 +1,230 @@
+from contextlib import contextmanager
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from accounts.models import AuditAction, AuditLog, AuditTarget, Role, UserModel
+from directdebit.models import BankCode, Branch, Frequency, Mandate
+from directdebit.rollups import rebuild
+from directdebit.signals import rollups_paused
+import random, time, uuid
+
+
+# Default end of the generated period, fixed so that a seed gives the same rows whenever it is run
+UNTIL = date(2025, 6, 30)
+
+FIRST_NAMES = ['Adebayo', 'Chinedu', 'Ngozi', 'Oluwaseun', 'Aisha', 'Emeka', 'Funmilayo', 'Ibrahim', 'Kemi', 'Tunde',
+               'Chioma', 'Yusuf', 'Bisi', 'Obinna', 'Zainab', 'Segun', 'Amaka', 'Musa', 'Folake', 'Ifeanyi']
+LAST_NAMES = ['Okafor', 'Adeyemi', 'Bello', 'Eze', 'Ogunleye', 'Abubakar', 'Nwosu', 'Balogun', 'Okonkwo', 'Lawal',
+              'Afolabi', 'Chukwu', 'Danjuma', 'Oyelaran', 'Ibe', 'Salami', 'Olatunji', 'Umeh', 'Ajayi', 'Garba']
+
+# Larger branches and banks get proportionally more mandates
+BRANCH_WEIGHTS = {Branch.Head_Office: 6, Branch.Ikeja: 5, Branch.Idumota: 4, Branch.Ebute_Metta: 3, Branch.Agege: 3, Branch.Ikorodu: 3}
+BANK_WEIGHTS = {BankCode.ACCESS_DIAMOND: 12, BankCode.GTB: 11, BankCode.FIRST_BANK: 10, BankCode.UBA: 10, BankCode.ZENITH: 10,
+                BankCode.FIDELITY: 6, BankCode.FCMB: 5, BankCode.STANBIC: 4, BankCode.STERLING: 4, BankCode.WEMA: 4, BankCode.UNION: 3}
+ROLE_WEIGHTS = {Role.CSO: 70, Role.CREDIT: 20, Role.IT: 3, Role.OTHERS: 7}
+# Most loans are repaid monthly; paper mandates carry no frequency
+FREQUENCY_WEIGHTS = {Frequency.MONTHLY: 60, Frequency.WEEKLY: 10, Frequency.EVERY_2_WEEKS: 10, Frequency.VARIABLE: 2, '': 18}
+
+# (action, weight, target, details template); mandate actions are the bulk of the audit trail.
+# The target is the acted on mandate, the acting user ('self'), another user or nothing
+AUDIT_ACTIONS = [
+    (AuditAction.USER_LOGIN, 30, None, 'User successfully logged in'),
+    (AuditAction.CREATE_E_MANDATE, 20, 'mandate', 'Created e-mandate for {account} - {payer}'),
+    (AuditAction.CREATE_PAPER_MANDATE, 12, 'mandate', 'Created paper mandate for {account} - {payer}'),
+    (AuditAction.UPDATE_MANDATE_STATUS, 10, 'mandate', 'Updated mandate for {code} - {account} to {status}'),
+    (AuditAction.PROCESS_MANDATE, 10, 'mandate', 'Mandate code {code} processed to {workflow}'),
+    (AuditAction.INITIATE_BALANCE_ENQUIRY, 5, 'mandate', 'Initiated balance enquiry mandate for {account} - {payer}'),
+    (AuditAction.PASSWORD_RESET_REQUEST, 3, 'self', 'User made request to rest password'),
+    (AuditAction.CREATE_NEW_PASSWORD, 3, 'self', 'User created new password'),
+    (AuditAction.UPDATE_USER, 2, 'user', 'User updated "{payer}" information'),
+    (AuditAction.CREATE_USER, 1, 'user', 'User created {email} account'),
+]
+
+
+# Account number with a valid NUBAN check digit for the given bank code
+def nuban(rng, bank_code):
+    serial = f'{rng.randrange(10 ** 9):09d}'
+    total = sum(int(digit) * weight for digit, weight in zip(bank_code + serial, [3, 7, 3] * 4))
+    return serial + str((10 - total % 10) % 10)
+
+
+@contextmanager
+def historical_timestamps(*models):
+    # created_at is auto_now_add, switch that off so generated rows keep their historical timestamps
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = "Generate large, deterministic volumes of synthetic users, mandates and audit logs for performance testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mandates', type=int, default=100000, help='Number of Mandate rows to create')
+        parser.add_argument('--audit-logs', type=int, default=300000, help='Number of AuditLog rows to create')
+        parser.add_argument('--users', type=int, default=200, help='Number of UserModel rows to create')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator, the same seed gives the same rows')
+        parser.add_argument('--years', type=int, default=3, help='Spread the rows over this many years')
+        parser.add_argument('--until', type=date.fromisoformat, default=UNTIL, help=f'Last date of the generated period (YYYY-MM-DD), defaults to {UNTIL}')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create')
+        parser.add_argument('--password', default='synthetic-password', help='Password given to every generated user')
+        parser.add_argument('--clear', action='store_true', help='Delete the rows previously generated with the same seed first')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        self.rng = random.Random(options['seed'])
+        self.prefix = f"SYN{options['seed']:04d}"
+        # Every generated email ends in this, so a seed's users and their audit trail can be told apart
+        self.email_suffix = f'.{self.prefix.lower()}@synthetic.local'
+        self.batch_size = options['batch_size']
+        self.until = options['until']
+        self.days = max(options['years'], 1) * 365
+
+        # bulk_create skips signals, so the mandate rollups are rebuilt once at the end
+        with rollups_paused():
+            if options['clear']:
+                self.clear()
+            with historical_timestamps(Mandate, AuditLog):
+                actors = self.create_users(options['users'], options['password'])
+                mandates = self.create_mandates(options['mandates'])
+                self.create_audit_logs(options['audit_logs'], actors or [(None, f'system{self.email_suffix}')], mandates)
+        self.stdout.write(f"Rebuilt {rebuild()} mandate rollup rows")
+        self.stdout.write(self.style.SUCCESS("Synthetic data generated"))
+
+    def clear(self):
+        mandates, _ = Mandate.objects.filter(mandateCode__startswith=self.prefix).delete()
+        audit_logs, _ = AuditLog.objects.filter(user__endswith=self.email_suffix).delete()
+        users, _ = UserModel.objects.filter(email__endswith=self.email_suffix).delete()
+        self.stdout.write(f"Deleted {mandates} mandates, {audit_logs} audit logs and {users} users")
+
+    def timestamp(self, day=None):
+        day = day or self.until - timedelta(days=self.rng.randrange(self.days))
+        # Office hours, 8am to 6pm
+        seconds = self.rng.randrange(8 * 3600, 18 * 3600)
+        return datetime.combine(day, dtime(), tzinfo=timezone.utc) + timedelta(seconds=seconds)
+
+    def name(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def uuid(self):
+        # The models default to uuid4, which would make the primary keys differ between runs with the same seed
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def bulk_create(self, model, rows, total):
+        created, batch, started = 0, [], time.perf_counter()
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                created += self.flush(model, batch)
+                batch = []
+                self.stdout.write(f"  {model.__name__}: {created}/{total} ({created / (time.perf_counter() - started):.0f} rows/s)")
+        created += self.flush(model, batch)
+        self.stdout.write(f"Created {created} {model._meta.verbose_name_plural} in {time.perf_counter() - started:.1f}s")
+
+    @staticmethod
+    def flush(model, batch):
+        if not batch:
+            return 0
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+        return len(batch)
+
+    def create_users(self, total, password):
+        # Hashing is deliberately slow, so every user shares one precomputed hash
+        hashed = make_password(password)
+        roles, weights = zip(*ROLE_WEIGHTS.items())
+        # (id, email) of every user, the actors of the audit trail
+        actors = []
+
+        def rows():
+            for i in range(total):
+                first, last = self.name()
+                email = f'{first.lower()}.{last.lower()}{i}{self.email_suffix}'
+                user = UserModel(
+                    id=self.uuid(), email=email, password=hashed, first_name=first, last_name=last,
+                    role=self.rng.choices(roles, weights)[0], is_active=self.rng.random() < 0.95,
+                    date_joined=self.timestamp(),
+                )
+                actors.append((user.id, email))
+                yield user
+
+        self.bulk_create(UserModel, rows(), total)
+        return actors
+
+    def create_mandates(self, total):
+        branches = list(Branch.values)
+        branch_weights = [BRANCH_WEIGHTS.get(branch, 1) for branch in branches]
+        banks = list(BankCode.values)
+        bank_weights = [BANK_WEIGHTS.get(bank, 1) for bank in banks]
+        frequencies, frequency_weights = zip(*FREQUENCY_WEIGHTS.items())
+        # Kept for the audit trail: (mandate code, account number, payer name)
+        mandates = []
+
+        def rows():
+            for i in range(total):
+                # Newer mandates are more frequent than old ones
+                start = self.until - timedelta(days=int(self.days * self.rng.random() ** 1.5))
+                first, last = self.name()
+                code = f'{self.prefix}{i:012d}'
+                account = nuban(self.rng, self.rng.choices(banks, bank_weights)[0])
+                if len(mandates) < 100000:
+                    mandates.append((code, account, f'{first} {last}'))
+                yield Mandate(
+                    mandateCode=code, branch=self.rng.choices(branches, branch_weights)[0],
+                    productId=self.rng.choice([1, 1, 1, 2, 3]), accountNumber=account,
+                    accountName=f'{last.upper()} {first.upper()}', payerName=f'{first} {last}',
+                    payerEmail=f'{first.lower()}.{last.lower()}{i}@example.com',
+                    # Loan repayments cluster between 5k and 200k naira, in steps of 500
+                    amount=max(int(self.rng.lognormvariate(10.3, 0.8)) // 500 * 500, 1000),
+                    phoneNumber=f"{self.rng.choice(['080', '081', '070', '090', '091'])}{self.rng.randrange(10 ** 8):08d}",
+                    subscriberCode=f'AMFB/{self.prefix}/{i:010d}',
+                    startDate=start, endDate=start + timedelta(days=30 * self.rng.choice([3, 6, 6, 12, 12, 12, 18, 24, 36])),
+                    frequency=self.rng.choices(frequencies, frequency_weights)[0],
+                    created_at=self.timestamp(start - timedelta(days=self.rng.randrange(8))),
+                )
+
+        self.bulk_create(Mandate, rows(), total)
+        return mandates
+
+    def create_audit_logs(self, total, actors, mandates):
+        actions, weights, targets, templates = zip(*AUDIT_ACTIONS)
+        targets, templates = dict(zip(actions, targets)), dict(zip(actions, templates))
+        mandates = mandates or [('MC0000000000', '0000000000', 'Synthetic Payer')]
+
+        def rows():
+            for _ in range(total):
+                action = self.rng.choices(actions, weights)[0]
+                code, account, payer = self.rng.choice(mandates)
+                actor_id, email = self.rng.choice(actors)
+                status, workflow = self.rng.choice(['1', '2', '3']), self.rng.choice(['2', '4', '8'])
+                target, metadata = targets[action], {}
+                if target == 'mandate':
+                    target_type, target_id = AuditTarget.MANDATE, code
+                    metadata = {'accountNumber': account}
+                    if action == AuditAction.UPDATE_MANDATE_STATUS:
+                        metadata['mandateStatus'] = status
+                    elif action == AuditAction.PROCESS_MANDATE:
+                        metadata = {'workflowStatus': workflow}
+                    else:
+                        metadata['payerName'] = payer
+                elif target == 'self':
+                    target_type, target_id = AuditTarget.USER, actor_id or ''
+                elif target == 'user':
+                    target_type, target_id = AuditTarget.USER, self.rng.choice(actors)[0] or ''
+                else:
+                    target_type, target_id = '', ''
+                yield AuditLog(
+                    id=self.uuid(), user=email, actor_id=actor_id, action=action,
+                    target_type=target_type, target_id=str(target_id), metadata=metadata,
+                    details=templates[action].format(code=code, account=account, payer=payer, email=email, status=status, workflow=workflow),
+                    created_at=self.timestamp(),
+                )
+
+        self.bulk_create(AuditLog, rows(), total)
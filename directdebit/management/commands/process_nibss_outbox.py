@@ -0,0 +1,49 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from directdebit.outbox import claim_batch, process_entry
+from utils import general_logger
+import time
+
+
+class Command(BaseCommand):
+    help = "Drain the NIBSS outbox: send queued mandate requests to NIBSS and finalize them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.NIBSS_OUTBOX_CONCURRENCY, help='Maximum number of NIBSS calls in flight')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once no due rows are left instead of polling')
+
+    def handle(self, *args, **options):
+        concurrency = max(options['concurrency'], 1)
+        processed = 0
+        self.stdout.write(f"Outbox worker started with concurrency {concurrency}")
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='nibss-outbox') as executor:
+            in_flight = set()
+            try:
+                while True:
+                    # Only claim as many rows as there are free slots so the lease is not wasted on queued work
+                    if len(in_flight) < concurrency:
+                        for entry in claim_batch(concurrency - len(in_flight)):
+                            in_flight.add(executor.submit(self.process, entry))
+                    if not in_flight:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+                    done, in_flight = wait(in_flight, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    processed += len(done)
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping, waiting for in-flight requests to finish")
+                wait(in_flight)
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} outbox rows"))
+
+    @staticmethod
+    def process(entry):
+        try:
+            process_entry(entry)
+        except Exception as e:
+            general_logger.error(f"Outbox worker failed on mandate request {entry.mandate_request_id}: {e}")
+        finally:
+            close_old_connections()
@@ -0,0 +1,80 @@
+from collections import defaultdict
+from django.core.management.base import BaseCommand, CommandError
+import json, os, re, subprocess, sys
+
+
+# Runs in a fresh interpreter: what a gunicorn worker does before it can serve, i.e. set up Django and load the URLconf
+PROBE = """
+import json, resource, sys, time
+memory = '--memory' in sys.argv
+if memory:
+    import tracemalloc
+    tracemalloc.start()
+started = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+ready = time.perf_counter()
+result = {'setup': setup - started, 'urls': ready - setup, 'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+if memory:
+    files = {}
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None)
+        if path:
+            # Aliases (e.g. requests.packages.*) come later, keep the name the file was first imported under
+            files.setdefault(path, name)
+    sizes = {}
+    for stat in tracemalloc.take_snapshot().statistics('filename'):
+        name = files.get(stat.traceback[0].filename)
+        if name:
+            sizes[name] = sizes.get(name, 0) + stat.size
+    result['memory'] = sizes
+print(json.dumps(result))
+"""
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+class Command(BaseCommand):
+    help = "Report how long a fresh worker takes to import and set up the project, and which modules cost the most time and memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Number of rows to show')
+        parser.add_argument('--modules', action='store_true', help='Report single modules instead of top-level packages')
+        parser.add_argument('--sort', choices=['time', 'memory'], default='time')
+
+    def probe(self, flags=(), arguments=()):
+        completed = subprocess.run([sys.executable, *flags, '-c', PROBE, *arguments], capture_output=True, text=True, env=os.environ.copy())
+        if completed.returncode:
+            raise CommandError(f"Startup probe failed:\n{completed.stderr[-2000:]}")
+        return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+    def handle(self, *args, **options):
+        # Timing and memory come from separate runs, tracing allocations slows imports down
+        timing, importtime = self.probe(flags=['-X', 'importtime'])
+        memory, _ = self.probe(arguments=['--memory'])
+
+        key = (lambda name: name) if options['modules'] else (lambda name: name.split('.')[0])
+        # name -> [milliseconds, bytes, modules]
+        rows = defaultdict(lambda: [0.0, 0, 0])
+        for line in importtime.splitlines():
+            if match := IMPORT_LINE.match(line):
+                row = rows[key(match[4])]
+                # Packages add up their modules' own time, single modules show their cumulative time
+                row[0] += int(match[2] if options['modules'] else match[1]) / 1000
+                row[2] += 1
+        for name, size in memory['memory'].items():
+            rows[key(name)][1] += size
+
+        column = 0 if options['sort'] == 'time' else 1
+        ranked = sorted(rows.items(), key=lambda item: item[1][column], reverse=True)[:options['top']]
+        label = 'module' if options['modules'] else 'package'
+        self.stdout.write(f"{label:<48}{'import ms':>12}{'memory KB':>12}{'modules':>9}")
+        for name, (ms, size, count) in ranked:
+            self.stdout.write(f"{name:<48}{ms:>12.1f}{size / 1024:>12.0f}{count:>9}")
+        self.stdout.write(self.style.SUCCESS(
+            f"django.setup() {timing['setup'] * 1000:.0f} ms, URLconf {timing['urls'] * 1000:.0f} ms, "
+            f"peak RSS {timing['rss_kb'] / 1024:.1f} MB, {sum(row[2] for row in rows.values())} modules imported"
+        ))
@@ -0,0 +1,16 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from directdebit.rollups import rebuild
+import time
+
+
+class Command(BaseCommand):
+    help = "Recompute the branch/day mandate rollups from the mandates table, e.g. after bulk imports that skip signals"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, default=None, help='Only rebuild days from this date (YYYY-MM-DD), defaults to everything')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = rebuild(options['since'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup rows in {time.perf_counter() - started:.1f}s"))
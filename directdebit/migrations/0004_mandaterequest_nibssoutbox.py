@@ -0,0 +1,58 @@
+# Generated by Django 4.2 on 2026-10-19 17:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directdebit', '0003_rename_id_mandate_mandatecode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MandateRequest',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('operation', models.CharField(choices=[('CREATE_E_MANDATE', 'Create E-Mandate'), ('UPDATE_MANDATE_STATUS', 'Update Mandate Status'), ('PROCESS_MANDATE', 'Process Mandate')], max_length=50)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('payload', models.JSONField()),
+                ('requested_by', models.CharField(max_length=255)),
+                ('mandateCode', models.CharField(blank=True, max_length=255)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='mandate',
+            name='branch',
+            field=models.CharField(choices=[('HEAD OFFICE', 'Head Office'), ('EBUTE METTA', 'Ebute Metta'), ('IDUMAGBO', 'Idumagbo'), ('IDUMOTA', 'Idumota'), ('SANGO', 'Sango'), ('IKEJA', 'Ikeja'), ('AGEGE', 'Agege'), ('IKORODU', 'Ikorodu'), ('MUSHIN', 'Mushin'), ('TRADE FAIR', 'Trade Fair'), ('IKOTUN', 'Ikotun'), ('AJAH', 'Ajah'), ('ABEOKUTA', 'Abeokuta'), ('IBANDAN', 'Ibandan')], max_length=255),
+        ),
+        migrations.CreateModel(
+            name='NIBSSOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('mandate_request', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='outbox', to='directdebit.mandaterequest')),
+            ],
+            options={
+                'verbose_name': 'NIBSS Outbox',
+                'verbose_name_plural': 'NIBSS Outbox',
+                'ordering': ['available_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='nibssoutbox',
+            index=models.Index(fields=['available_at'], name='directdebit_availab_d78bfd_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-19 17:58
+
+from django.db import migrations, models
+
+
+# FULLTEXT indexes only exist on MySQL, other databases fall back to LIKE (directdebit/search.py)
+def create_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX mandate_search ON directdebit_mandate (payerName, accountName, payerEmail, subscriberCode)'
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP INDEX mandate_search ON directdebit_mandate')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directdebit', '0004_mandaterequest_nibssoutbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mandate',
+            index=models.Index(fields=['accountNumber'], name='mandate_account_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mandate',
+            index=models.Index(fields=['phoneNumber'], name='mandate_phone_number_idx'),
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
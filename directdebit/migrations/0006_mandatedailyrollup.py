@@ -0,0 +1,45 @@
+# Generated by Django 4.2 on 2026-10-19 18:00
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+# Roll up the mandates created before the rollups were maintained
+def build_rollups(apps, schema_editor):
+    Mandate = apps.get_model('directdebit', 'Mandate')
+    MandateDailyRollup = apps.get_model('directdebit', 'MandateDailyRollup')
+    totals = (Mandate.objects.annotate(day=TruncDate('created_at')).values('day', 'branch')
+              .annotate(count=Count('pk'), total=Sum('amount')).order_by())
+    MandateDailyRollup.objects.bulk_create([
+        MandateDailyRollup(branch=row['branch'], day=row['day'], mandates=row['count'], amount=row['total']) for row in totals
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directdebit', '0005_mandate_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MandateDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch', models.CharField(choices=[('HEAD OFFICE', 'Head Office'), ('EBUTE METTA', 'Ebute Metta'), ('IDUMAGBO', 'Idumagbo'), ('IDUMOTA', 'Idumota'), ('SANGO', 'Sango'), ('IKEJA', 'Ikeja'), ('AGEGE', 'Agege'), ('IKORODU', 'Ikorodu'), ('MUSHIN', 'Mushin'), ('TRADE FAIR', 'Trade Fair'), ('IKOTUN', 'Ikotun'), ('AJAH', 'Ajah'), ('ABEOKUTA', 'Abeokuta'), ('IBANDAN', 'Ibandan')], max_length=255)),
+                ('day', models.DateField()),
+                ('mandates', models.PositiveIntegerField(default=0)),
+                ('amount', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-day', 'branch'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='mandatedailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'branch'), name='mandate_rollup_day_branch'),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
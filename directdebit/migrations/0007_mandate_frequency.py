@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directdebit', '0006_mandatedailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mandate',
+            name='frequency',
+            field=models.CharField(blank=True, choices=[('0', 'Variable'), ('1', 'Weekly'), ('2', 'Every 2 Weeks'), ('4', 'Monthly')], default='', max_length=2),
+        ),
+    ]
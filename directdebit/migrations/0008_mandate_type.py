@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-19 18:34
+
+from django.db import migrations, models
+
+
+# Balance enquiry e-mandates created through the outbox can still be told apart by their request payload
+def mark_balance_enquiries(apps, schema_editor):
+    Mandate = apps.get_model('directdebit', 'Mandate')
+    MandateRequest = apps.get_model('directdebit', 'MandateRequest')
+    requests = MandateRequest.objects.filter(operation='CREATE_E_MANDATE').exclude(mandateCode='').values_list('mandateCode', 'payload')
+    codes = [code for code, payload in requests.iterator(chunk_size=2000) if str(payload.get('mandateType')) == '2']
+    for i in range(0, len(codes), 1000):
+        Mandate.objects.filter(mandateCode__in=codes[i:i + 1000]).update(mandateType='2')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directdebit', '0007_mandate_frequency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mandate',
+            name='mandateType',
+            field=models.CharField(choices=[('1', 'Direct Debit'), ('2', 'Balance Enquiry')], default='1', max_length=1),
+        ),
+        migrations.RunPython(mark_balance_enquiries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 18:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directdebit', '0008_mandate_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mandaterequest',
+            name='requester_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+# Paper balance enquiries were saved as direct debits, their audit events still name the mandate
+def mark_paper_balance_enquiries(apps, schema_editor):
+    Mandate = apps.get_model('directdebit', 'Mandate')
+    AuditLog = apps.get_model('accounts', 'AuditLog')
+    events = AuditLog.objects.filter(action='INITIATE BALANCE ENQUIRY MANDATE', target_type='MANDATE').exclude(target_id='')
+    codes = list(events.values_list('target_id', flat=True).distinct())
+    for i in range(0, len(codes), 1000):
+        Mandate.objects.filter(mandateCode__in=codes[i:i + 1000]).update(mandateType='2')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_auditlog_structured'),
+        ('directdebit', '0009_mandaterequest_requester'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_paper_balance_enquiries, migrations.RunPython.noop),
+    ]
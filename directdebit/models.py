@@ -1,4 +1,6 @@
 from django.db import models
+from django.utils import timezone
+from uuid import uuid4
 
 # Create your models here.
 # Branches
@@ -85,6 +87,18 @@ class WorkflowStatus(models.TextChoices):
     BANK_APPROVED = "8", "Bank Approved"
     BANK_DISAPPROVED = "9", "Bank Disapproved"
     BANK_INITIATED = "10", "Bank Initiated"
+
+# Mandate Request Operations
+class RequestOperation(models.TextChoices):
+    CREATE_E_MANDATE = "CREATE_E_MANDATE", "Create E-Mandate"
+    UPDATE_MANDATE_STATUS = "UPDATE_MANDATE_STATUS", "Update Mandate Status"
+    PROCESS_MANDATE = "PROCESS_MANDATE", "Process Mandate"
+
+# Mandate Request Status
+class RequestStatus(models.TextChoices):
+    PENDING = "PENDING", "Pending"
+    COMPLETED = "COMPLETED", "Completed"
+    FAILED = "FAILED", "Failed"
     
 
 class Mandate(models.Model):
@@ -99,6 +113,10 @@ class Mandate(models.Model):
     payerName = models.CharField(max_length=255)
     payerEmail = models.EmailField(max_length=255)
     amount = models.IntegerField()
+    # Debit schedule of e-mandates, blank for paper mandates created without one
+    frequency = models.CharField(choices=Frequency.choices, max_length=2, blank=True, default='')
+    # Balance enquiry mandates only let the biller check the account balance, they are never debited
+    mandateType = models.CharField(choices=MandateType.choices, max_length=1, default=MandateType.DIRECT_DEBIT)
     phoneNumber = models.CharField(max_length=11)
     subscriberCode = models.CharField(max_length=255)
     startDate = models.DateField()
@@ -107,7 +125,72 @@ class Mandate(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # Prefix searches on account and phone numbers (directdebit/search.py)
+        indexes = [
+            models.Index(fields=['accountNumber'], name='mandate_account_number_idx'),
+            models.Index(fields=['phoneNumber'], name='mandate_phone_number_idx'),
+        ]
     
     def __str__(self):
         return f"{self.mandateCode} | {self.branch}"
-    
\ No newline at end of file
+
+
+class MandateRequest(models.Model):
+    """
+    This model will serve as the pending record of a NIBSS write operation accepted asynchronously
+    """
+    id = models.UUIDField(default=uuid4, unique=True, primary_key=True, editable=False)
+    operation = models.CharField(choices=RequestOperation.choices, max_length=50)
+    status = models.CharField(choices=RequestStatus.choices, max_length=20, default=RequestStatus.PENDING)
+    payload = models.JSONField()
+    requested_by = models.CharField(max_length=255)
+    # Recorded as the actor of the audit event once NIBSS has processed the request
+    requester_id = models.UUIDField(null=True, blank=True)
+    mandateCode = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.operation} | {self.status}"
+
+
+class NIBSSOutbox(models.Model):
+    """
+    This model will serve as the queue of mandate requests waiting to be sent to NIBSS by the outbox worker
+    """
+    mandate_request = models.OneToOneField(MandateRequest, on_delete=models.CASCADE, related_name='outbox')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['available_at']
+        indexes = [models.Index(fields=['available_at'])]
+        verbose_name = 'NIBSS Outbox'
+        verbose_name_plural = 'NIBSS Outbox'
+
+    def __str__(self):
+        return f"{self.mandate_request_id} | attempt {self.attempts}"
+
+
+class MandateDailyRollup(models.Model):
+    """
+    This model will serve as the per branch, per day count and total amount of created mandates, kept current by directdebit/rollups.py
+    """
+    branch = models.CharField(choices=Branch.choices, max_length=255)
+    day = models.DateField()
+    mandates = models.PositiveIntegerField(default=0)
+    amount = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-day', 'branch']
+        constraints = [models.UniqueConstraint(fields=['day', 'branch'], name='mandate_rollup_day_branch')]
+
+    def __str__(self):
+        return f"{self.day} | {self.branch}"
@@ -0,0 +1,210 @@
+from datetime import date, timedelta
+from django.conf import settings
+from django.urls import reverse
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from rest_framework.response import Response
+from accounts.models import AuditAction, AuditTarget
+from .models import Mandate, MandateRequest, NIBSSOutbox, RequestOperation, RequestStatus
+from .statuses import invalidate_status
+from core.metrics import NIBSS_RETRIES, endpoint_label
+from utils import format_date, make_api_request, log_audit_event, general_logger, request_api_token
+import asyncio
+
+
+# NIBSS endpoint used by each asynchronous operation
+ENDPOINTS = {
+    RequestOperation.CREATE_E_MANDATE: "ndd/api/MandateRequest/CreateEmandate",
+    RequestOperation.UPDATE_MANDATE_STATUS: "ndd/api/MandateRequest/UpdateMandateStatus",
+    RequestOperation.PROCESS_MANDATE: "ndd/api/MandateRequest/BillerProcesMandate",
+}
+
+
+# Checks whether the client asked for (or the deployment enforces) asynchronous NIBSS writes
+def async_requested(request):
+    return settings.NIBSS_ASYNC_WRITES or 'respond-async' in request.headers.get('Prefer', '')
+
+
+# Write the pending mandate request and its outbox row in one transaction
+def enqueue_request(operation, payload, user):
+    payload = {key: format_date(value) for key, value in payload.items()}
+    with transaction.atomic():
+        mandate_request = MandateRequest.objects.create(
+            operation=operation,
+            payload=payload,
+            requested_by=getattr(user, 'email', str(user)),
+            requester_id=getattr(user, 'id', None),
+            mandateCode=payload.get('mandateCode', ''),
+        )
+        NIBSSOutbox.objects.create(mandate_request=mandate_request)
+    return mandate_request
+
+
+# 202 response pointing the client at the status endpoint of the tracking id
+def accepted_response(request, mandate_request):
+    status_url = request.build_absolute_uri(reverse('mandate_request_status', args=[mandate_request.pk]))
+    return Response({
+        "status": "success",
+        "message": "Request accepted for processing",
+        "data": {"tracking_id": str(mandate_request.pk), "status": mandate_request.status, "status_url": status_url},
+    }, status=202)
+
+
+# Claim a batch of due outbox rows by pushing their availability past the lease period
+def claim_batch(limit):
+    now = timezone.now()
+    with transaction.atomic():
+        entries = list(
+            NIBSSOutbox.objects.select_for_update(skip_locked=True)
+            .select_related('mandate_request')
+            .filter(available_at__lte=now)[:limit]
+        )
+        if entries:
+            NIBSSOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+                available_at=now + timedelta(seconds=settings.NIBSS_OUTBOX_LEASE)
+            )
+    return entries
+
+
+def _mandate_record(payload, mandate_code):
+    fields = [field.name for field in Mandate._meta.concrete_fields if field.name not in ('mandateCode', 'created_at')]
+    record = {field: payload[field] for field in fields if field in payload}
+    record['startDate'] = date.fromisoformat(payload['startDate'][:10])
+    record['endDate'] = date.fromisoformat(payload['endDate'][:10])
+    record['mandateCode'] = mandate_code
+    return record
+
+
+def _audit(mandate_request):
+    payload = mandate_request.payload
+    metadata = {'accountNumber': payload.get('accountNumber'), 'request': str(mandate_request.pk)}
+    if mandate_request.operation == RequestOperation.CREATE_E_MANDATE:
+        action, details = AuditAction.CREATE_E_MANDATE, f"Created e-mandate for {payload.get('accountNumber')} - {payload.get('payerName')}"
+        metadata.update(payerName=payload.get('payerName'), branch=payload.get('branch'))
+    elif mandate_request.operation == RequestOperation.UPDATE_MANDATE_STATUS:
+        action, details = AuditAction.UPDATE_MANDATE_STATUS, f'Updated mandate for {payload.get("mandateCode")} - {payload.get("accountNumber")} to {payload.get("mandateStatus")}'
+        metadata.update(mandateStatus=payload.get('mandateStatus'))
+    else:
+        action, details = AuditAction.PROCESS_MANDATE, f'Mandate code {payload.get("mandateCode")} processed to {payload.get("workflowStatus")}'
+        metadata = {'workflowStatus': payload.get('workflowStatus'), 'request': str(mandate_request.pk)}
+    asyncio.run(log_audit_event(
+        user=mandate_request.requested_by, actor_id=mandate_request.requester_id, action=action, details=details,
+        target_type=AuditTarget.MANDATE, target_id=mandate_request.mandateCode, metadata=metadata,
+    ))
+
+
+def _finish(entry, status, result=None, error=''):
+    mandate_request = entry.mandate_request
+    mandate_request.status = status
+    mandate_request.result = result
+    mandate_request.error = error
+    mandate_request.save(update_fields=['status', 'result', 'error', 'mandateCode', 'updated_at'])
+    entry.delete()
+
+
+def _retry_or_fail(entry, error, upstream=True):
+    entry.attempts += 1
+    if entry.attempts >= settings.NIBSS_OUTBOX_MAX_ATTEMPTS:
+        general_logger.error(f"Mandate request {entry.mandate_request_id} failed after {entry.attempts} attempts: {error}")
+        with transaction.atomic():
+            _finish(entry, RequestStatus.FAILED, result=entry.mandate_request.result, error=error)
+        return
+    if upstream:
+        NIBSS_RETRIES.labels(endpoint_label(ENDPOINTS[entry.mandate_request.operation])).inc()
+    # Exponential back-off between attempts, capped at 10 minutes
+    delay = min(2 ** entry.attempts * 5, 600)
+    entry.available_at = timezone.now() + timedelta(seconds=delay)
+    entry.save(update_fields=['attempts', 'available_at'])
+    general_logger.error(f"Mandate request {entry.mandate_request_id} attempt {entry.attempts} failed, retrying in {delay}s: {error}")
+
+
+# A call NIBSS may or may not have acted on: retried, except for creations, which NIBSS does not de-duplicate
+def _retry_or_review(entry, error):
+    mandate_request = entry.mandate_request
+    if mandate_request.operation != RequestOperation.CREATE_E_MANDATE:
+        return _retry_or_fail(entry, error)
+    general_logger.critical(f"Mandate request {mandate_request.pk} may have been created at NIBSS, left for review: {error}")
+    with transaction.atomic():
+        _finish(entry, RequestStatus.FAILED, error=f"Outcome unknown, check NIBSS for the mandate before resubmitting: {error}")
+
+
+# Write the outcome NIBSS accepted to our own tables; retried on its own when that fails
+def _finalize(entry, data):
+    mandate_request = entry.mandate_request
+    try:
+        with transaction.atomic():
+            code = mandate_request.mandateCode
+            if mandate_request.operation == RequestOperation.CREATE_E_MANDATE and not Mandate.objects.filter(mandateCode=code).exists():
+                Mandate.objects.create(**_mandate_record(mandate_request.payload, code))
+            _finish(entry, RequestStatus.COMPLETED, result=data)
+    except Exception as e:
+        return _retry_or_fail(entry, f"NIBSS accepted the request but saving it failed: {e}", upstream=False)
+    if mandate_request.operation != RequestOperation.CREATE_E_MANDATE:
+        invalidate_status(mandate_request.mandateCode)
+    _audit(mandate_request)
+
+
+# Send a claimed outbox row to NIBSS and finalize its mandate request
+def process_entry(entry):
+    mandate_request = entry.mandate_request
+    # A result on a pending request means NIBSS accepted it on an earlier attempt, it is never sent twice
+    if mandate_request.result is not None:
+        return _finalize(entry, mandate_request.result)
+
+    endpoint = ENDPOINTS[mandate_request.operation]
+    # Fetched up front so that a token failure, when nothing reached NIBSS yet, stays retryable
+    try:
+        request_api_token(endpoint)
+    except Exception as e:
+        return _retry_or_fail(entry, f"Failed to get a NIBSS token: {e}")
+
+    api_payload = dict(mandate_request.payload)
+    api_payload.pop('branch', None)
+    try:
+        response = make_api_request(method="POST", endpoint=endpoint, payload=api_payload)
+    except Exception as e:
+        return _retry_or_review(entry, str(e))
+
+    if isinstance(response, Response):
+        message = response.data.get('message', 'NIBSS request failed')
+        # Client errors are rejected by NIBSS and will not succeed on retry
+        if response.status_code < 500:
+            with transaction.atomic():
+                _finish(entry, RequestStatus.FAILED, result=response.data, error=message)
+            return
+        # Timeouts and server errors do not tell whether NIBSS acted on the request
+        return _retry_or_review(entry, message)
+
+    try:
+        data = response.json().get("data") or {}
+    except Exception as parse_err:
+        return _retry_or_review(entry, f"Failed to parse API response: {parse_err}")
+
+    if mandate_request.operation == RequestOperation.CREATE_E_MANDATE:
+        if "mandateCode" not in data:
+            with transaction.atomic():
+                _finish(entry, RequestStatus.FAILED, result=data, error="Invalid API response")
+            return
+        mandate_request.mandateCode = data['mandateCode']
+    # Recorded before the local writes, so a failure there never sends the request to NIBSS again
+    mandate_request.result = data
+    try:
+        mandate_request.save(update_fields=['mandateCode', 'result', 'updated_at'])
+    except Exception as e:
+        general_logger.critical(f"NIBSS accepted mandate request {mandate_request.pk} ({mandate_request.mandateCode}) but it could not be recorded: {e}")
+        raise
+    _finalize(entry, data)
+
+
+# Depth and age of the outbox for monitoring
+def outbox_stats():
+    now = timezone.now()
+    oldest = NIBSSOutbox.objects.aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        "depth": NIBSSOutbox.objects.count(),
+        "due": NIBSSOutbox.objects.filter(available_at__lte=now).count(),
+        "retrying": NIBSSOutbox.objects.filter(attempts__gt=0).count(),
+        "oldest_age_seconds": round((now - oldest).total_seconds(), 3) if oldest else 0,
+        "failed": MandateRequest.objects.filter(status=RequestStatus.FAILED).count(),
+    }
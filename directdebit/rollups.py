@@ -0,0 +1,68 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+from .models import Mandate, MandateDailyRollup
+
+
+def _add(branch, day, mandates, amount):
+    rows = MandateDailyRollup.objects.filter(branch=branch, day=day)
+    if rows.update(mandates=F('mandates') + mandates, amount=F('amount') + amount):
+        return
+    if mandates < 0:
+        # Nothing rolled up for that day yet, e.g. before the first rebuild
+        return
+    try:
+        with transaction.atomic():
+            MandateDailyRollup.objects.create(branch=branch, day=day, mandates=mandates, amount=amount)
+    except IntegrityError:
+        # Another worker created the row first
+        rows.update(mandates=F('mandates') + mandates, amount=F('amount') + amount)
+
+
+# Count a created (sign=1) or deleted (sign=-1) mandate in its branch/day rollup
+def apply_mandate(mandate, sign=1):
+    _add(mandate.branch, timezone.localdate(mandate.created_at), sign, sign * mandate.amount)
+
+
+# Move an edited mandate from the rollup of its previous branch, amount and day (a values() dict) to its current one
+def apply_change(before, mandate):
+    day = timezone.localdate(before['created_at'])
+    if (before['branch'], before['amount'], day) == (mandate.branch, mandate.amount, timezone.localdate(mandate.created_at)):
+        return
+    _add(before['branch'], day, -1, -before['amount'])
+    apply_mandate(mandate)
+
+
+def rebuild(since=None):
+    """
+    Recomputes the rollups from the mandates table, from `since` onwards or entirely.
+    Returns the number of rollup rows written.
+    """
+    mandates = Mandate.objects.all()
+    rollups = MandateDailyRollup.objects.all()
+    if since:
+        mandates = mandates.filter(created_at__date__gte=since)
+        rollups = rollups.filter(day__gte=since)
+    totals = (mandates.annotate(day=TruncDate('created_at')).values('day', 'branch')
+              .annotate(count=Count('pk'), total=Sum('amount')).order_by())
+    with transaction.atomic():
+        rollups.delete()
+        created = MandateDailyRollup.objects.bulk_create([
+            MandateDailyRollup(branch=row['branch'], day=row['day'], mandates=row['count'], amount=row['total'])
+            for row in totals
+        ], batch_size=1000)
+    return len(created)
+
+
+def summarize(period, start, end, branch=None):
+    """
+    Mandate counts and amounts per branch per day or month between start and end, read from the rollups only.
+    """
+    rows = MandateDailyRollup.objects.filter(day__range=(start, end))
+    if branch:
+        rows = rows.filter(branch=branch)
+    bucket = TruncMonth('day') if period == 'month' else F('day')
+    rows = (rows.annotate(period=bucket).values('period', 'branch')
+            .annotate(count=Sum('mandates'), total=Sum('amount')).order_by('period', 'branch'))
+    return [{'period': row['period'], 'branch': row['branch'], 'mandates': row['count'], 'amount': row['total']} for row in rows]
@@ -0,0 +1,59 @@
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from rest_framework.pagination import PageNumberPagination
+import re
+
+
+# Columns covered by the mandate_search FULLTEXT index (directdebit/migrations/0005_mandate_search_indexes.py)
+TEXT_FIELDS = ('payerName', 'accountName', 'payerEmail', 'subscriberCode')
+# Shortest word InnoDB indexes (innodb_ft_min_token_size), shorter words can only be matched with LIKE
+MIN_TOKEN_SIZE = 3
+
+
+class MandateSearchPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def _words(term):
+    # Boolean mode operators would change the meaning of the query, keep only the words
+    return re.sub(r'[+\-<>()~*"@]', ' ', term).split()
+
+
+def _fulltext(queryset, words):
+    # Every word must match, as a prefix, in any of the indexed columns
+    against = ' '.join(f'+{word}*' for word in words)
+    columns = ', '.join(connection.ops.quote_name(field) for field in TEXT_FIELDS)
+    rank = RawSQL(f"MATCH ({columns}) AGAINST (%s IN BOOLEAN MODE)", (against,))
+    return queryset.annotate(rank=rank).filter(rank__gt=0).order_by('-rank', '-created_at')
+
+
+def _contains(queryset, words):
+    # Databases without the FULLTEXT index (SQLite in development) scan with LIKE and rank prefix matches first
+    condition, rank = Q(), Value(0)
+    for word in words:
+        condition &= Q(*(Q(**{f'{field}__icontains': word}) for field in TEXT_FIELDS), _connector=Q.OR)
+        for field in TEXT_FIELDS:
+            rank = rank + Case(When(**{f'{field}__istartswith': word}, then=Value(1)), default=Value(0), output_field=IntegerField())
+    return queryset.filter(condition).annotate(rank=rank).order_by('-rank', '-created_at')
+
+
+def search_mandates(queryset, term):
+    """
+    Filters and ranks mandates for a search term.
+    Digits are matched as a prefix of accountNumber or phoneNumber through their indexes,
+    anything else against payerName, accountName, payerEmail and subscriberCode.
+    """
+    term = term.strip()
+    if term.isdigit():
+        rank = Case(When(accountNumber=term, then=Value(2)), When(phoneNumber=term, then=Value(2)), default=Value(1), output_field=IntegerField())
+        return (queryset.filter(Q(accountNumber__startswith=term) | Q(phoneNumber__startswith=term))
+                .annotate(rank=rank).order_by('-rank', '-created_at'))
+    words = _words(term)
+    if not words:
+        return queryset.none()
+    if connection.vendor == 'mysql' and all(len(word) >= MIN_TOKEN_SIZE for word in words):
+        return _fulltext(queryset, words)
+    return _contains(queryset, words)
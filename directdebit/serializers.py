@@ -1,3 +1,5 @@
+from datetime import date, timedelta
+from django.conf import settings
 from rest_framework import serializers
 from .models import *
 from utils import BILLER_ID
@@ -80,6 +82,16 @@ class MandateStatusSerializer(serializers.Serializer):
     mandate_code = serializers.CharField(min_length=10, max_length=50)
 
 
+class MandateStatusBatchSerializer(serializers.Serializer):
+    mandate_codes = serializers.ListField(
+        child=serializers.CharField(min_length=10, max_length=50), min_length=1, max_length=settings.MANDATE_STATUS_BATCH_MAX,
+    )
+
+    def validate_mandate_codes(self, value):
+        # Ask NIBSS once per code, keeping the order of first appearance
+        return list(dict.fromkeys(value))
+
+
 class UpdateMandateStatusSerializer(serializers.Serializer):
     mandateCode = serializers.CharField(min_length=10, max_length=50)
     billerId = serializers.HiddenField(default=BILLER_ID)
@@ -103,4 +115,39 @@ class DBMandateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Mandate
         fields = '__all__'
+
+
+class MandateSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=3, max_length=100, help_text='Payer or account name, email, subscriber code, or the leading digits of an account or phone number')
+
+
+class MandateSearchResultSerializer(DBMandateSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+
+class MandateSummarySerializer(serializers.Serializer):
+    period = serializers.ChoiceField(choices=['day', 'month'], default='day')
+    start = serializers.DateField(required=False, help_text='First day (YYYY-MM-DD), defaults to 30 days or 12 months back')
+    end = serializers.DateField(required=False, help_text='Last day (YYYY-MM-DD), defaults to today')
+    branch = serializers.ChoiceField(choices=Branch.choices, required=False)
+
+    def validate(self, attrs):
+        end = attrs.setdefault('end', date.today())
+        if 'start' not in attrs:
+            attrs['start'] = end - timedelta(days=30) if attrs['period'] == 'day' else (end - timedelta(days=335)).replace(day=1)
+        if attrs['start'] > end:
+            raise serializers.ValidationError("start must not be after end")
+        return attrs
+
+
+class MandateForecastSerializer(serializers.Serializer):
+    start = serializers.DateField(default=date.today, help_text='First day of the forecast (YYYY-MM-DD), defaults to today')
+    days = serializers.IntegerField(default=30, min_value=1, max_value=366, help_text='Number of days to forecast')
+    branch = serializers.ChoiceField(choices=Branch.choices, required=False)
+
+
+class MandateRequestSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MandateRequest
+        fields = ['id', 'operation', 'status', 'mandateCode', 'result', 'error', 'created_at', 'updated_at']
         
\ No newline at end of file
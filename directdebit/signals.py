@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Mandate
+from .rollups import apply_change, apply_mandate
+
+ROLLUP_FIELDS = {'branch', 'amount', 'created_at'}
+
+
+# Remember what an edited mandate was counted under, e.g. a branch or amount corrected in the admin
+@receiver(pre_save, sender=Mandate)
+def mandate_changing(sender, instance, update_fields=None, **kwargs):
+    instance._rollup_before = None
+    if instance._state.adding or (update_fields is not None and not ROLLUP_FIELDS & set(update_fields)):
+        return
+    instance._rollup_before = Mandate.objects.filter(pk=instance.pk).values(*ROLLUP_FIELDS).first()
+
+
+# Keep the branch/day rollups in step with the mandates table, in the same transaction as the change
+@receiver(post_save, sender=Mandate)
+def mandate_created(sender, instance, created, **kwargs):
+    if created:
+        apply_mandate(instance)
+    elif before := getattr(instance, '_rollup_before', None):
+        apply_change(before, instance)
+
+
+@receiver(post_delete, sender=Mandate)
+def mandate_deleted(sender, instance, **kwargs):
+    apply_mandate(instance, sign=-1)
+
+
+@contextmanager
+def rollups_paused():
+    # For bulk changes that rebuild the rollups afterwards, lets deletes run without a per-row signal
+    pre_save.disconnect(mandate_changing, sender=Mandate)
+    post_save.disconnect(mandate_created, sender=Mandate)
+    post_delete.disconnect(mandate_deleted, sender=Mandate)
+    try:
+        yield
+    finally:
+        pre_save.connect(mandate_changing, sender=Mandate)
+        post_save.connect(mandate_created, sender=Mandate)
+        post_delete.connect(mandate_deleted, sender=Mandate)
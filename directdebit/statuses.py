@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+from utils import make_api_request, request_api_token, general_logger
+import contextvars
+
+
+STATUS_ENDPOINT = "ndd/api/MandateRequest/MandateStatus"
+
+
+def status_key(mandate_code):
+    return f'mandate-status:{mandate_code}'
+
+
+# Drop the cached status after our own status change so the next lookup asks NIBSS
+def invalidate_status(mandate_code):
+    if mandate_code:
+        cache.delete(status_key(mandate_code))
+
+
+def fetch_status(mandate_code):
+    """
+    Asks NIBSS for the status of one mandate and caches a successful answer for MANDATE_STATUS_CACHE_TTL seconds.
+    Returns the `requests` response, or the DRF Response make_api_request produced for a failure.
+    """
+    response = make_api_request(method="POST", endpoint=f"{STATUS_ENDPOINT}?MandateCode={mandate_code}", coalesce=True)
+    if not isinstance(response, Response):
+        try:
+            cache.set(status_key(mandate_code), response.json().get("data", {}), settings.MANDATE_STATUS_CACHE_TTL)
+        except Exception as e:
+            general_logger.error(f"Could not cache status of mandate {mandate_code}: {e}")
+    return response
+
+
+def _result(mandate_code, response):
+    if isinstance(response, Response):
+        return {'mandate_code': mandate_code, 'status': 'error', 'cached': False, 'status_code': response.status_code,
+                'message': response.data.get('message', 'NIBSS request failed')}
+    try:
+        data = response.json().get("data", {})
+    except Exception as e:
+        return {'mandate_code': mandate_code, 'status': 'error', 'cached': False, 'status_code': response.status_code,
+                'message': f"Failed to parse API response: {e}"}
+    return {'mandate_code': mandate_code, 'status': 'success', 'cached': False, 'status_code': response.status_code, 'data': data}
+
+
+def _fetch(mandate_code):
+    try:
+        return _result(mandate_code, fetch_status(mandate_code))
+    except Exception as e:
+        general_logger.error(f"Failed to fetch status of mandate {mandate_code}: {e}")
+        return {'mandate_code': mandate_code, 'status': 'error', 'cached': False, 'status_code': 500, 'message': str(e)}
+
+
+def fetch_statuses(mandate_codes):
+    """
+    Statuses of many mandates, in the order given: cached ones straight away,
+    the rest from NIBSS in parallel on at most MANDATE_STATUS_FANOUT threads.
+    """
+    cached = cache.get_many([status_key(code) for code in mandate_codes])
+    results = {}
+    missing = []
+    for code in mandate_codes:
+        if status_key(code) in cached:
+            results[code] = {'mandate_code': code, 'status': 'success', 'cached': True, 'status_code': 200, 'data': cached[status_key(code)]}
+        else:
+            missing.append(code)
+
+    if missing:
+        # Get the token once up front instead of letting every thread miss the cache at the same time
+        request_api_token(STATUS_ENDPOINT)
+        # Each call runs in a copy of the request context so its timing and upstream capture are still recorded
+        workers = min(settings.MANDATE_STATUS_FANOUT, len(missing))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mandate-status') as executor:
+            futures = [executor.submit(contextvars.copy_context().run, _fetch, code) for code in missing]
+            for code, future in zip(missing, futures):
+                results[code] = future.result()
+    return [results[code] for code in mandate_codes]
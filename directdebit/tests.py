@@ -1,3 +1,440 @@
-from django.test import TestCase
-
-# Create your tests here.
+"""
+Behaviour tests of the mandate endpoints and the NIBSS client against the local fake NIBSS.
+
+Run with:  python manage.py test directdebit --settings=benchmarks.settings
+"""
+from calendar import monthrange
+from datetime import date, timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from accounts.models import AuditLog, Role, UserModel
+from accounts.serializers import RoleTokenObtainPairSerializer
+from benchmarks.fake_nibss import FakeNIBSS
+from benchmarks.run import mandate_payload
+from utils import _coalesced, _flights, release_lock
+from .forecast import BRANCHES, INTERVALS, expand, load_schedules
+from .models import Branch, Frequency, Mandate, MandateDailyRollup, MandateRequest, MandateType, NIBSSOutbox, RequestOperation, RequestStatus
+from .outbox import enqueue_request, process_entry
+from .rollups import rebuild
+import random, threading, time
+
+
+def create_mandate(code, branch=Branch.Ikeja, amount=1000, **fields):
+    return Mandate.objects.create(**{
+        'mandateCode': code, 'branch': branch, 'productId': 1, 'accountNumber': '0123456789', 'accountName': 'Payer',
+        'payerName': 'Payer', 'payerEmail': 'payer@example.com', 'amount': amount, 'phoneNumber': '08012345678',
+        'subscriberCode': 'AMFB/1', 'startDate': '2025-01-01', 'endDate': '2025-12-31', **fields,
+    })
+
+
+class FakeNIBSSTestCase(TransactionTestCase):
+    """
+    Runs every test against a fresh fake NIBSS, with one user per role and an empty cache.
+    """
+    latency = 0.0
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.fake = FakeNIBSS(latency=cls.latency).start()
+        cls.nibss = override_settings(NIBSS_BASE_URL=cls.fake.url)
+        cls.nibss.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.nibss.disable()
+        cls.fake.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.fake.reset_calls()
+        self.users = {role: UserModel.objects.create_user(
+            email=f'{role.lower()}@tests.local', password='test-password', role=role,
+            is_active=True, first_name=role.title(), last_name='Tests',
+        ) for role in Role.values}
+
+    def client_for(self, role):
+        client = APIClient()
+        token = RoleTokenObtainPairSerializer.get_token(self.users[role]).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client
+
+
+class IdempotencyTests(FakeNIBSSTestCase):
+    # Long enough for a duplicate to arrive while the first request is at NIBSS
+    latency = 0.3
+
+    def create(self, key, payload=None):
+        return self.client_for(Role.CSO).post(
+            '/api/v1/mandates/e-mandate', payload or mandate_payload(1), format='json', HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_repeated_key_replays_the_stored_response(self):
+        first, second = self.create('key-1'), self.create('key-1')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(self.fake.calls['CreateEmandate'], 1)
+        self.assertEqual(Mandate.objects.count(), 1)
+
+    def test_key_reused_with_another_payload_is_rejected(self):
+        self.create('key-1')
+        response = self.create('key-1', mandate_payload(2))
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.fake.calls['CreateEmandate'], 1)
+
+    def test_concurrent_duplicates_share_one_nibss_call(self):
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(self.create('key-1'))) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([response.status_code for response in responses], [200, 200, 200])
+        self.assertEqual(len({response.json()['data']['mandateCode'] for response in responses}), 1)
+        self.assertEqual(sum(response.has_header('Idempotent-Replayed') for response in responses), 2)
+        self.assertEqual(self.fake.calls['CreateEmandate'], 1)
+
+    def test_lock_taken_over_after_expiry_is_not_released(self):
+        cache.set('idempotency:lock:test', 'other-request')
+        release_lock('idempotency:lock:test', 'this-request')
+        self.assertEqual(cache.get('idempotency:lock:test'), 'other-request')
+        release_lock('idempotency:lock:test', 'other-request')
+        self.assertIsNone(cache.get('idempotency:lock:test'))
+
+
+class PaperMandateTests(FakeNIBSSTestCase):
+    def post(self, path):
+        payload = mandate_payload(1)
+        payload.pop('frequency')
+        payload.pop('mandateType')
+        payload['mandateImageFile'] = SimpleUploadedFile('mandate.png', b'\x89PNG' + b'0' * 2048, content_type='image/png')
+        return self.client_for(Role.CSO).post(path, payload, format='multipart')
+
+    def test_balance_enquiry_is_stored_as_a_balance_enquiry(self):
+        self.assertEqual(self.post('/api/v1/mandates/balance').status_code, 200)
+        self.assertEqual(Mandate.objects.get().mandateType, MandateType.BALANCE_ENQUIRY)
+
+    def test_paper_mandate_is_stored_as_a_direct_debit(self):
+        self.assertEqual(self.post('/api/v1/mandates/create').status_code, 200)
+        self.assertEqual(Mandate.objects.get().mandateType, MandateType.DIRECT_DEBIT)
+
+
+class OutboxTests(FakeNIBSSTestCase):
+    def process_due(self):
+        for entry in NIBSSOutbox.objects.select_related('mandate_request'):
+            process_entry(entry)
+
+    def test_failed_local_write_is_retried_without_calling_nibss_again(self):
+        mandate_request = enqueue_request(RequestOperation.CREATE_E_MANDATE, mandate_payload(1), self.users[Role.CSO])
+        with mock.patch.object(Mandate.objects, 'create', side_effect=DatabaseError('database went away')):
+            self.process_due()
+        mandate_request.refresh_from_db()
+        self.assertEqual(mandate_request.status, RequestStatus.PENDING)
+        self.assertTrue(mandate_request.mandateCode)
+        self.assertEqual(NIBSSOutbox.objects.get().attempts, 1)
+
+        NIBSSOutbox.objects.update(available_at=timezone.now())
+        self.process_due()
+        mandate_request.refresh_from_db()
+        self.assertEqual(mandate_request.status, RequestStatus.COMPLETED)
+        self.assertTrue(Mandate.objects.filter(mandateCode=mandate_request.mandateCode).exists())
+        self.assertFalse(NIBSSOutbox.objects.exists())
+        self.assertEqual(self.fake.calls['CreateEmandate'], 1)
+
+    @override_settings(NIBSS_OUTBOX_MAX_ATTEMPTS=1)
+    def test_request_failing_locally_keeps_the_nibss_mandate_code(self):
+        mandate_request = enqueue_request(RequestOperation.CREATE_E_MANDATE, mandate_payload(1), self.users[Role.CSO])
+        with mock.patch.object(Mandate.objects, 'create', side_effect=DatabaseError('database went away')):
+            self.process_due()
+        mandate_request.refresh_from_db()
+        self.assertEqual(mandate_request.status, RequestStatus.FAILED)
+        self.assertEqual(mandate_request.mandateCode, mandate_request.result['mandateCode'])
+
+    def test_creation_with_an_unknown_outcome_is_not_resent(self):
+        mandate_request = enqueue_request(RequestOperation.CREATE_E_MANDATE, mandate_payload(1), self.users[Role.CSO])
+        timed_out = Response({'status': 'error', 'message': 'Request timed out'}, status=504)
+        with mock.patch('directdebit.outbox.make_api_request', return_value=timed_out) as call:
+            self.process_due()
+        mandate_request.refresh_from_db()
+        self.assertEqual(call.call_count, 1)
+        self.assertEqual(mandate_request.status, RequestStatus.FAILED)
+        self.assertTrue(mandate_request.error.startswith('Outcome unknown'))
+        self.assertFalse(NIBSSOutbox.objects.exists())
+
+    def test_creation_is_retried_when_no_token_could_be_fetched(self):
+        mandate_request = enqueue_request(RequestOperation.CREATE_E_MANDATE, mandate_payload(1), self.users[Role.CSO])
+        with mock.patch('directdebit.outbox.request_api_token', side_effect=ConnectionError('NIBSS unreachable')):
+            self.process_due()
+        mandate_request.refresh_from_db()
+        self.assertEqual(mandate_request.status, RequestStatus.PENDING)
+        self.assertEqual(NIBSSOutbox.objects.get().attempts, 1)
+        self.assertEqual(self.fake.calls['CreateEmandate'], 0)
+
+    def test_status_update_with_an_unknown_outcome_is_retried(self):
+        mandate_request = enqueue_request(RequestOperation.UPDATE_MANDATE_STATUS, {
+            'mandateCode': 'MC0000000001', 'productId': 1, 'accountNumber': '0123456789', 'mandateStatus': '2',
+        }, self.users[Role.CREDIT])
+        timed_out = Response({'status': 'error', 'message': 'Request timed out'}, status=504)
+        with mock.patch('directdebit.outbox.make_api_request', return_value=timed_out):
+            self.process_due()
+        mandate_request.refresh_from_db()
+        self.assertEqual(mandate_request.status, RequestStatus.PENDING)
+        self.assertEqual(NIBSSOutbox.objects.get().attempts, 1)
+
+    def test_audit_event_records_the_requester_without_looking_them_up(self):
+        user = self.users[Role.CSO]
+        enqueue_request(RequestOperation.CREATE_E_MANDATE, mandate_payload(1), user)
+        with mock.patch.object(UserModel.objects, 'filter', side_effect=AssertionError("requester looked up by email")):
+            self.process_due()
+        event = AuditLog.objects.get()
+        self.assertEqual((event.user, event.actor_id), (user.email, user.pk))
+
+    def test_mandate_type_is_kept(self):
+        enqueue_request(RequestOperation.CREATE_E_MANDATE, {**mandate_payload(1), 'mandateType': MandateType.BALANCE_ENQUIRY}, self.users[Role.CSO])
+        self.process_due()
+        self.assertEqual(Mandate.objects.get().mandateType, MandateType.BALANCE_ENQUIRY)
+
+    def test_requests_are_only_visible_to_their_requester_and_staff(self):
+        mandate_request = MandateRequest.objects.create(
+            operation=RequestOperation.CREATE_E_MANDATE, payload={}, requested_by=self.users[Role.CSO].email,
+        )
+        path = f'/api/v1/mandates/requests/{mandate_request.pk}'
+        self.assertEqual(self.client_for(Role.CSO).get(path).status_code, 200)
+        self.assertEqual(self.client_for(Role.IT).get(path).status_code, 200)
+        self.assertEqual(self.client_for(Role.CREDIT).get(path).status_code, 404)
+
+
+class RollupTests(TestCase):
+    create = staticmethod(create_mandate)
+
+    def rollups(self):
+        return {(row.branch, row.day): (row.mandates, row.amount) for row in MandateDailyRollup.objects.all()}
+
+    def test_created_mandates_are_added_to_their_branch_and_day(self):
+        self.create('MC1', amount=1000)
+        self.create('MC2', amount=2500)
+        self.create('MC3', branch=Branch.Agege, amount=500)
+        today = timezone.localdate()
+        self.assertEqual(self.rollups(), {(Branch.Ikeja, today): (2, 3500), (Branch.Agege, today): (1, 500)})
+
+    def test_deleted_mandates_are_subtracted(self):
+        self.create('MC1', amount=1000)
+        self.create('MC2', amount=2500).delete()
+        self.assertEqual(self.rollups(), {(Branch.Ikeja, timezone.localdate()): (1, 1000)})
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        for i in range(5):
+            self.create(f'MC{i}', branch=[Branch.Ikeja, Branch.Agege][i % 2], amount=1000 * (i + 1))
+        Mandate.objects.get(mandateCode='MC3').delete()
+        incremental = self.rollups()
+        rebuild()
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_edited_branch_and_amount_move_between_rollups(self):
+        self.create('MC1', amount=1000)
+        self.create('MC2', amount=2500)
+        edited = Mandate.objects.get(mandateCode='MC1')
+        edited.amount = 4000
+        edited.save()
+        moved = Mandate.objects.get(mandateCode='MC2')
+        moved.branch = Branch.Agege
+        moved.save()
+        today = timezone.localdate()
+        self.assertEqual(self.rollups(), {(Branch.Ikeja, today): (1, 4000), (Branch.Agege, today): (1, 2500)})
+        incremental = self.rollups()
+        rebuild()
+        self.assertEqual(self.rollups(), incremental)
+
+
+class MandateSearchTests(TestCase):
+    def setUp(self):
+        user = UserModel.objects.create_user(email='cso@tests.local', password='test-password', role=Role.CSO, is_active=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RoleTokenObtainPairSerializer.get_token(user).access_token}")
+        for i in range(3):
+            create_mandate(f'MC{i}', payerName=f'Ada Payer {i}')
+        create_mandate('MC9', payerName='Someone Else', accountName='Someone Else')
+
+    def search(self, **params):
+        return self.client.get('/api/v1/mandates/search', params)
+
+    def test_pages_of_matches(self):
+        response = self.search(q='Ada', page_size=2, page=2)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual((data['count'], len(data['results'])), (3, 1))
+
+    def test_page_past_the_last_is_not_found(self):
+        response = self.search(q='Ada', page=5)
+        self.assertEqual(response.status_code, 404)
+
+
+def reference_debits(mandate, start, days):
+    """
+    Debit dates of one mandate within the horizon, walked one debit at a time.
+    """
+    end = start + timedelta(days=days - 1)
+    dates = []
+    if mandate.frequency in INTERVALS:
+        day = mandate.startDate
+        while day <= min(mandate.endDate, end):
+            if day >= start:
+                dates.append(day)
+            day += timedelta(days=INTERVALS[mandate.frequency])
+    elif mandate.frequency == Frequency.MONTHLY:
+        year, month = mandate.startDate.year, mandate.startDate.month
+        while date(year, month, 1) <= min(mandate.endDate, end):
+            day = date(year, month, min(mandate.startDate.day, monthrange(year, month)[1]))
+            if max(mandate.startDate, start) <= day <= min(mandate.endDate, end):
+                dates.append(day)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return dates
+
+
+class ForecastTests(TestCase):
+    start, days = date(2025, 1, 15), 120
+
+    def forecast(self):
+        return expand(load_schedules(self.start, self.start + timedelta(days=self.days - 1)), self.start, self.days)
+
+    def expected(self, mandates):
+        amounts, debits = {}, {}
+        for mandate in mandates:
+            for day in reference_debits(mandate, self.start, self.days):
+                cell = (BRANCHES.index(mandate.branch), (day - self.start).days)
+                amounts[cell] = amounts.get(cell, 0) + mandate.amount
+                debits[cell] = debits.get(cell, 0) + 1
+        return amounts, debits
+
+    def assert_matches_reference(self, mandates):
+        amounts, debits = self.forecast()
+        expected_amounts, expected_debits = self.expected(mandates)
+        self.assertEqual({cell: int(amounts[cell]) for cell in zip(*amounts.nonzero())}, expected_amounts)
+        self.assertEqual({cell: int(debits[cell]) for cell in zip(*debits.nonzero())}, expected_debits)
+
+    def test_monthly_debits_move_to_the_last_day_of_shorter_months(self):
+        mandate = create_mandate('MC1', frequency=Frequency.MONTHLY, startDate=date(2024, 12, 31), endDate=date(2025, 4, 30))
+        self.assertEqual(reference_debits(mandate, self.start, self.days),
+                         [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)])
+        self.assert_matches_reference([mandate])
+
+    def test_schedules_starting_before_the_horizon_keep_their_phase(self):
+        mandates = [
+            create_mandate('MC1', frequency=Frequency.WEEKLY, startDate=date(2024, 12, 30), endDate=date(2025, 12, 31)),
+            create_mandate('MC2', frequency=Frequency.EVERY_2_WEEKS, startDate=date(2025, 1, 10), endDate=date(2025, 12, 31)),
+        ]
+        self.assertEqual(reference_debits(mandates[0], self.start, self.days)[0], date(2025, 1, 20))
+        self.assertEqual(reference_debits(mandates[1], self.start, self.days)[0], date(2025, 1, 24))
+        self.assert_matches_reference(mandates)
+
+    def test_debits_stop_at_the_end_date(self):
+        mandates = [
+            create_mandate('MC1', frequency=Frequency.WEEKLY, startDate=date(2025, 1, 15), endDate=date(2025, 2, 4)),
+            create_mandate('MC2', frequency=Frequency.MONTHLY, startDate=date(2025, 1, 20), endDate=date(2025, 3, 19)),
+        ]
+        self.assertEqual(reference_debits(mandates[0], self.start, self.days), [date(2025, 1, 15), date(2025, 1, 22), date(2025, 1, 29)])
+        self.assertEqual(reference_debits(mandates[1], self.start, self.days), [date(2025, 1, 20), date(2025, 2, 20)])
+        self.assert_matches_reference(mandates)
+
+    def test_random_schedules_match_the_reference(self):
+        rng = random.Random(0)
+        mandates = []
+        for i in range(300):
+            start = self.start + timedelta(days=rng.randrange(-200, self.days + 10))
+            mandates.append(create_mandate(
+                f'MC{i}', branch=rng.choice(BRANCHES), amount=rng.randrange(1000, 100000),
+                frequency=rng.choice([Frequency.WEEKLY, Frequency.EVERY_2_WEEKS, Frequency.MONTHLY, Frequency.VARIABLE, '']),
+                startDate=start, endDate=start + timedelta(days=rng.randrange(0, 400)),
+            ))
+        self.assert_matches_reference(mandates)
+
+    def test_balance_enquiry_mandates_are_not_forecast(self):
+        create_mandate('MC1', frequency=Frequency.WEEKLY, mandateType=MandateType.BALANCE_ENQUIRY)
+        self.assertEqual(len(load_schedules(date(2025, 1, 1), date(2025, 12, 31))['amount']), 0)
+
+
+class CoalescingTests(SimpleTestCase):
+    endpoint = 'ndd/api/Product/GetProduct'
+
+    def setUp(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def call(self, result):
+        def upstream():
+            self.calls.append(result)
+            self.release.wait(5)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return upstream
+
+    def run_concurrently(self, requests):
+        """
+        Starts the first request of each key, then the others while it is in flight, and returns every outcome.
+        """
+        outcomes = [None] * len(requests)
+
+        def run(i, key, result):
+            try:
+                outcomes[i] = _coalesced(key, self.endpoint, self.call(result))
+            except Exception as e:
+                outcomes[i] = e
+
+        threads = [threading.Thread(target=run, args=(i, key, result)) for i, (key, result) in enumerate(requests)]
+        leaders = {}
+        for (key, _), thread in zip(requests, threads):
+            if key in leaders:
+                continue
+            leaders[key] = thread
+            thread.start()
+            while key not in _flights:
+                time.sleep(0.001)
+        for thread in threads:
+            if thread not in leaders.values():
+                thread.start()
+        # Followers are waiting on the flight by now
+        time.sleep(0.1)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(_flights, {})
+        return outcomes
+
+    def test_one_upstream_call_per_key(self):
+        outcomes = self.run_concurrently([('products', 'leader')] + [('products', 'follower')] * 4)
+        self.assertEqual(self.calls, ['leader'])
+        self.assertEqual(outcomes, ['leader'] * 5)
+
+    def test_distinct_keys_are_not_shared(self):
+        outcomes = self.run_concurrently([('products', 'all'), ('mandate', 'one'), ('products', 'all'), ('mandate', 'one')])
+        self.assertEqual(sorted(self.calls), ['all', 'one'])
+        self.assertEqual(outcomes, ['all', 'one', 'all', 'one'])
+
+    def test_followers_get_their_own_response(self):
+        outcomes = self.run_concurrently([('products', Response({'data': [1]}, status=200))] * 3)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len({id(response) for response in outcomes}), 3)
+        self.assertEqual({(response.status_code, str(response.data)) for response in outcomes}, {(200, "{'data': [1]}")})
+
+    @mock.patch('utils.timeout', 0.01)
+    def test_followers_share_the_leaders_timeout_instead_of_calling_again(self):
+        # The leader is slower than the request timeout, e.g. a token fetch followed by a timed out call
+        outcomes = self.run_concurrently([('products', Response({'message': 'Request timed out'}, status=504))] * 3)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual([response.status_code for response in outcomes], [504] * 3)
+
+    def test_followers_call_again_when_the_leader_raised(self):
+        error = ConnectionError('connection reset')
+        outcomes = self.run_concurrently([('products', error), ('products', 'retried'), ('products', 'retried')])
+        self.assertEqual(outcomes, [error, 'retried', 'retried'])
+        self.assertEqual(self.calls, [error, 'retried', 'retried'])
@@ -1,14 +1,24 @@
 from rest_framework import views, generics
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from drf_yasg.utils import swagger_auto_schema
+from drf_spectacular.utils import extend_schema
 from requests.exceptions import RequestException
 from django.db import transaction
 from .models import *
-from accounts.models import Role
+from accounts.models import AuditAction, AuditTarget, Role
 from .serializers import *
-from utils import IsAuthorized, format_date, request_api_token, make_api_request, log_audit_event, general_logger
+from core.db.routers import replica_reads
+from core.fastlist import fast_rows
+from core.renderers import FastJSONRenderer
+from core.timing import span
+from .outbox import accepted_response, async_requested, enqueue_request, outbox_stats
+from .rollups import summarize
+from .search import MandateSearchPagination, search_mandates
+from .statuses import fetch_status, fetch_statuses, invalidate_status
+from utils import IsAuthorized, format_date, idempotent, request_api_token, make_api_request, log_audit_event, general_logger
 import asyncio
 
 
@@ -37,10 +47,10 @@ class CreateBillerView(generics.GenericAPIView):
     """
     serializer_class = CreateBillerSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthorized]
+    throttle_scope = 'nibss'
     allowed_roles = ['IT']
     parser_classes = [JSONParser,]
 
-    @swagger_auto_schema(request_body=CreateBillerSerializer, responses={200:'OK', 401:'UNAUTHORIZED', 403:'FORBIDDEN', 500:'SERVER ERROR', 502:'BAD GATEWAY'})
     def post(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
@@ -53,8 +63,11 @@ class CreateBillerView(generics.GenericAPIView):
             res = response.json()
             asyncio.run(log_audit_event(
                 user=request.user,
-                action=f'CREATE BILLER',
-                details=f'Created biller named {res.get("data", {"billerName"})}'
+                action=AuditAction.CREATE_BILLER,
+                details=f'Created biller named {data.get("name")}',
+                target_type=AuditTarget.BILLER,
+                target_id=data.get("rcNumber"),
+                metadata={"name": data.get("name"), "accountNumber": data.get("accountNumber")}
             ))
             return Response({"status": "success", "message": "Biller created successfully", "data": res.get("data", {})}, status=response.status_code)
         except RequestException as e:
@@ -76,10 +89,10 @@ class UpdateBillerView(generics.GenericAPIView):
     """
     serializer_class = UpdateBillerSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthorized]
+    throttle_scope = 'nibss'
     allowed_roles = ['IT']
     parser_classes = [JSONParser,]
 
-    @swagger_auto_schema(request_body=UpdateBillerSerializer, responses={200:'OK', 401:'UNAUTHORIZED', 403:'FORBIDDEN', 500:'SERVER ERROR', 502:'BAD GATEWAY'})
     def post(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
@@ -92,8 +105,11 @@ class UpdateBillerView(generics.GenericAPIView):
             res = response.json()
             asyncio.run(log_audit_event(
                 user=request.user,
-                action=f'UPDATE BILLER',
-                details=f'Updated biller details for {res.get("data", {"name"})}'
+                action=AuditAction.UPDATE_BILLER,
+                details=f'Updated biller details for {data.get("billerName")}',
+                target_type=AuditTarget.BILLER,
+                target_id=data.get("id"),
+                metadata={"name": data.get("billerName"), "accountNumber": data.get("accountNumber"), "status": data.get("status")}
             ))
             return Response({"status": "success", "message": "Biller updated successfully", "data": res.get("data", {})}, status=response.status_code)
         except RequestException as e:
@@ -115,10 +131,10 @@ class CreateProductView(generics.GenericAPIView):
     """
     serializer_class = CreateProductSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthorized]
+    throttle_scope = 'nibss'
     allowed_roles = ['IT']
     parser_classes = [JSONParser,]
 
-    @swagger_auto_schema(request_body=CreateProductSerializer, responses={200:'OK', 401:'UNAUTHORIZED', 403:'FORBIDDEN', 500:'SERVER ERROR', 502:'BAD GATEWAY'})
     def post(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
@@ -131,8 +147,11 @@ class CreateProductView(generics.GenericAPIView):
             res = response.json()
             asyncio.run(log_audit_event(
                 user=request.user,
-                action=f'CREATE PRODUCT',
-                details=f'Created product named {res.get("data", {"name"})}'
+                action=AuditAction.CREATE_PRODUCT,
+                details=f'Created product named {data.get("productName")}',
+                target_type=AuditTarget.PRODUCT,
+                target_id=data.get("productName"),
+                metadata={"productName": data.get("productName")}
             ))
             return Response({"status": "success", "message": "Product created successfully", "data": res.get("data", {})}, status=response.status_code)
         except RequestException as e:
@@ -154,11 +173,11 @@ class GetProductView(views.APIView):
     """
     serializer_class = None
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'nibss'
     
-    @swagger_auto_schema(responses={200:'OK', 401:'UNAUTHORIZED', 403:'FORBIDDEN', 500:'SERVER ERROR', 502:'BAD GATEWAY'})
     def get(self, request, *args, **kwargs):
         try:
-            response = make_api_request(method="GET", endpoint="ndd/api/Biller/GetProduct/455")
+            response = make_api_request(method="GET", endpoint="ndd/api/Biller/GetProduct/455", coalesce=True)
             # If make_api_request returned a DRF Response, return it directly
             if isinstance(response, Response):
                 return response
@@ -183,10 +202,10 @@ class DisableProductView(generics.GenericAPIView):
     """
     serializer_class = DisableProductSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthorized]
+    throttle_scope = 'nibss'
     allowed_roles = ['IT']
     parser_classes = [JSONParser,]
 
-    @swagger_auto_schema(request_body=DisableProductSerializer, responses={200:'OK', 401:'UNAUTHORIZED', 403:'FORBIDDEN', 500:'SERVER ERROR', 502:'BAD GATEWAY'})
     def post(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
@@ -199,8 +218,10 @@ class DisableProductView(generics.GenericAPIView):
             res = response.json()
             asyncio.run(log_audit_event(
                 user=request.user,
-                action=f'DISABLE PRODUCT',
-                details=f'Disabled product named {res.get("data", {"name"})}'
+                action=AuditAction.DISABLE_PRODUCT,
+                details=f'Disabled product {data.get("productID")}',
+                target_type=AuditTarget.PRODUCT,
+                target_id=data.get("productID")
             ))
             return Response({"status": "success", "message": "Product disabled successfully", "data": res.get("data", {})}, status=response.status_code)
         except RequestException as e:
@@ -222,14 +243,16 @@ class CreateMandateView(generics.CreateAPIView):
     """
     serializer_class = CreateMandateSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthorized]
+    throttle_scope = 'nibss'
     allowed_roles = ['CSO', 'IT']
     parser_classes = [MultiPartParser, FormParser]
 
-    @swagger_auto_schema(request_body=CreateMandateSerializer, responses={200:'OK', 401:'UNAUTHORIZED', 403:'FORBIDDEN', 500:'SERVER ERROR', 502:'BAD GATEWAY'})
+    @idempotent
     def create(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
-            serializer.is_valid(raise_exception=True)
+            with span('validate'):
+                serializer.is_valid(raise_exception=True)
             api_payload = serializer.validated_data
             db_payload = api_payload.copy()
             api_payload['startDate'] = format_date(api_payload.get('startDate'))
@@ -264,10 +287,10 @@ class CreateMandateView(generics.CreateAPIView):
             # Persist data into DB atomically
             try:
                 db_payload['mandateCode'] = res['mandateCode']
-                fields_to_remove = ["billerId", "bankCode", "mandateType", "payerAddress", "frequency", "narration", "mandateImageFile"]
+                fields_to_remove = ["billerId", "bankCode", "mandateType", "payerAddress", "narration", "mandateImageFile"]
                 for field in fields_to_remove:
                     db_payload.pop(field, None)
-                with transaction.atomic():
+                with span('insert'), transaction.atomic():
                     Mandate.objects.create(**db_payload)
             except Exception as db_err:
                 general_logger.error(f"Database error: {db_err}")
@@ -276,8 +299,11 @@ class CreateMandateView(generics.CreateAPIView):
             # Log audit event asynchronously
             asyncio.run(log_audit_event(
                 user=request.user,
-                action="CREATE PAPER MANDATE",
-                details=f"Created paper mandate for {api_payload.get('accountNumber')} - {api_payload.get('payerName')}"
+                action=AuditAction.CREATE_PAPER_MANDATE,
+                details=f"Created paper mandate for {api_payload.get('accountNumber')} - {api_payload.get('payerName')}",
+                target_type=AuditTarget.MANDATE,
+                target_id=res['mandateCode'],
+                metadata={"accountNumber": api_payload.get('accountNumber'), "payerName": api_payload.get('payerName'), "branch": db_payload.get('branch')}
             ))
             return Response({"status": "success", "message": "Paper mandate created successfully", "data": res}, status=response.status_code)
         except Exception as e:
@@ -294,16 +320,18 @@ class BalanceEnquiryView(generics.GenericAPIView):
     """
     serializer_class = CreateMandateSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthorized]
+    throttle_scope = 'nibss'
     allowed_roles = ['CSO']
     parser_classes = [MultiPartParser, FormParser]
 
-    @swagger_auto_schema(request_body=CreateMandateSerializer, responses={200:'OK', 401:'UNAUTHORIZED', 403:'FORBIDDEN', 500:'SERVER ERROR', 502:'BAD GATEWAY'})
     def post(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
-            serializer.is_valid(raise_exception=True)
+            with span('validate'):
+                serializer.is_valid(raise_exception=True)
             api_payload = serializer.validated_data
             db_payload = api_payload.copy()
+            db_payload['mandateType'] = MandateType.BALANCE_ENQUIRY
             api_payload['startDate'] = format_date(api_payload.get('startDate'))
             api_payload['endDate'] = format_date(api_payload.get('endDate'))
             api_payload.pop("branch", None)
@@ -336,10 +364,10 @@ class BalanceEnquiryView(generics.GenericAPIView):
             # Persist data into DB atomically
             try:
                 db_payload['mandateCode'] = res['mandateCode']
-                fields_to_remove = ["billerId", "bankCode", "mandateType", "payerAddress", "frequency", "narration", "mandateImageFile"]
+                fields_to_remove = ["billerId", "bankCode", "payerAddress", "narration", "mandateImageFile"]
                 for field in fields_to_remove:
                     db_payload.pop(field, None)
-                with transaction.atomic():
+                with span('insert'), transaction.atomic():
                     Mandate.objects.create(**db_payload)
             except Exception as db_err:
                 general_logger.error(f"Database error: {db_err}")
@@ -348,8 +376,11 @@ class BalanceEnquiryView(generics.GenericAPIView):
             # Log audit event asynchronously
             asyncio.run(log_audit_event(
                 user=request.user,
-                action="INITIATE BALANCE ENQUIRY MANDATE",
-                details=f"Initiated balance enquiry mandate for {api_payload.get('accountNumber')} - {api_payload.get('payerName')}"
+                action=AuditAction.INITIATE_BALANCE_ENQUIRY,
+                details=f"Initiated balance enquiry mandate for {api_payload.get('accountNumber')} - {api_payload.get('payerName')}",
+                target_type=AuditTarget.MANDATE,
+                target_id=res['mandateCode'],
+                metadata={"accountNumber": api_payload.get('accountNumber'), "payerName": api_payload.get('payerName'), "branch": db_payload.get('branch')}
             ))
             return Response({"status": "success", "message": "Balance enquiry initiated successfully", "data": res}, status=response.status_code)
         except Exception as e:
@@ -366,14 +397,19 @@ class CreateEMandateView(generics.GenericAPIView):
     """
     serializer_class = EMandateSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthorized]
+    throttle_scope = 'nibss'
     allowed_roles = ['CSO', 'IT']
     parser_classes = [JSONParser]
 
-    @swagger_auto_schema(request_body=EMandateSerializer, responses={200:'OK', 401:'UNAUTHORIZED', 403:'FORBIDDEN', 500:'SERVER ERROR', 502:'BAD GATEWAY'})
+    @idempotent
     def post(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
-            serializer.is_valid(raise_exception=True)
+            with span('validate'):
+                serializer.is_valid(raise_exception=True)
+            if async_requested(request):
+                mandate_request = enqueue_request(RequestOperation.CREATE_E_MANDATE, serializer.validated_data, request.user)
+                return accepted_response(request, mandate_request)
             api_payload = serializer.validated_data
             db_payload = api_payload.copy()
             api_payload['startDate'] = format_date(api_payload.get('startDate'))
@@ -397,10 +433,10 @@ class CreateEMandateView(generics.GenericAPIView):
             # Persist data into DB atomically
             try:
                 db_payload['mandateCode'] = res['mandateCode']
-                fields_to_remove = ["billerId", "bankCode", "mandateType", "payerAddress", "frequency", "narration"]
+                fields_to_remove = ["billerId", "bankCode", "payerAddress", "narration"]
                 for field in fields_to_remove:
                     db_payload.pop(field, None)
-                with transaction.atomic():
+                with span('insert'), transaction.atomic():
                     Mandate.objects.create(**db_payload)
             except Exception as db_err:
                 general_logger.error(f"Database error: {db_err}")
@@ -409,8 +445,11 @@ class CreateEMandateView(generics.GenericAPIView):
             # Log audit event asynchronously
             asyncio.run(log_audit_event(
                 user=request.user,
-                action="CREATE E-MANDATE",
-                details=f"Created e-mandate for {api_payload.get('accountNumber')} - {api_payload.get('payerName')}"
+                action=AuditAction.CREATE_E_MANDATE,
+                details=f"Created e-mandate for {api_payload.get('accountNumber')} - {api_payload.get('payerName')}",
+                target_type=AuditTarget.MANDATE,
+                target_id=res['mandateCode'],
+                metadata={"accountNumber": api_payload.get('accountNumber'), "payerName": api_payload.get('payerName'), "branch": db_payload.get('branch')}
             ))
             return Response({"status": "success", "message": "Mandate created successfully", "data": res}, status=response.status_code)
         except Exception as e:
@@ -427,15 +466,15 @@ class MandateStatusView(generics.GenericAPIView):
     """
     serializer_class = MandateStatusSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'nibss'
     parser_classes = [JSONParser]
 
-    @swagger_auto_schema(request_body=MandateStatusSerializer, responses={200:'OK', 401:'UNAUTHORIZED', 403:'FORBIDDEN', 500:'SERVER ERROR', 502:'BAD GATEWAY'})
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         mandate_code = serializer.validated_data["mandate_code"]
         try:
-            response = make_api_request(method="POST", endpoint=f"ndd/api/MandateRequest/MandateStatus?MandateCode={mandate_code}")
+            response = fetch_status(mandate_code)
             # If make_api_request returned a DRF Response, return it directly
             if isinstance(response, Response):
                 return response
@@ -450,7 +489,38 @@ class MandateStatusView(generics.GenericAPIView):
             error_msg = f"Server error: {str(e)}"
             general_logger.error(error_msg)
             return Response({"status": "error", "message": error_msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+
+
+class MandateStatusBatchView(generics.GenericAPIView):
+    """
+        Mandate Management Endpoint
+
+        View the status of many mandates at once, recently fetched statuses are served from cache
+    """
+    serializer_class = MandateStatusBatchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'nibss'
+    parser_classes = [JSONParser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            results = fetch_statuses(serializer.validated_data["mandate_codes"])
+            failed = sum(result['status'] == 'error' for result in results)
+            cached = sum(result['cached'] for result in results)
+            message = f"Fetched {len(results) - failed} of {len(results)} mandate statuses ({cached} from cache)"
+            return Response({"status": "success", "message": message, "data": results}, status=status.HTTP_200_OK)
+        except RequestException as e:
+            # Handles token and HTTP request-related issues
+            error_msg = f"Failed to fetch mandate statuses: {str(e)}"
+            general_logger.error(error_msg)
+            return Response({"status": "error", "message": error_msg}, status=status.HTTP_502_BAD_GATEWAY)
+        except Exception as e:
+            error_msg = f"Server error: {str(e)}"
+            general_logger.error(error_msg)
+            return Response({"status": "error", "message": error_msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 
 class UpdateMandateStatusView(generics.GenericAPIView):
     """
@@ -460,24 +530,32 @@ class UpdateMandateStatusView(generics.GenericAPIView):
     """
     serializer_class = UpdateMandateStatusSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthorized]
+    throttle_scope = 'nibss'
     allowed_roles = ['CREDIT', 'IT']
     parser_classes = [JSONParser,]
 
-    @swagger_auto_schema(request_body=UpdateMandateStatusSerializer, responses={200:'OK', 401:'UNAUTHORIZED', 403:'FORBIDDEN', 500:'SERVER ERROR', 502:'BAD GATEWAY'})
+    @idempotent
     def post(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
             data = serializer.validated_data
+            if async_requested(request):
+                mandate_request = enqueue_request(RequestOperation.UPDATE_MANDATE_STATUS, data, request.user)
+                return accepted_response(request, mandate_request)
             response = make_api_request(method="POST", endpoint=f"ndd/api/MandateRequest/UpdateMandateStatus", payload=data)
             # If make_api_request returned a DRF Response, return it directly
             if isinstance(response, Response):
                 return response
             res = response.json()
+            invalidate_status(data.get("mandateCode"))
             asyncio.run(log_audit_event(
                 user=request.user,
-                action=f'UPDATE MANDATE STATUS',
-                details=f'Updated mandate for {data.get("mandateCode")} - {data.get("accountNumber")} to {data.get("status")}'
+                action=AuditAction.UPDATE_MANDATE_STATUS,
+                details=f'Updated mandate for {data.get("mandateCode")} - {data.get("accountNumber")} to {data.get("mandateStatus")}',
+                target_type=AuditTarget.MANDATE,
+                target_id=data.get("mandateCode"),
+                metadata={"accountNumber": data.get("accountNumber"), "mandateStatus": data.get("mandateStatus")}
             ))
             return Response({'status': 'success', 'message': 'Mandate status updated successfully', 'data': res.get("data", {})}, status=response.status_code)
         except RequestException as e:
@@ -494,23 +572,32 @@ class UpdateMandateStatusView(generics.GenericAPIView):
 class ProcessMandateView(generics.GenericAPIView):
     serializer_class = ProcessMandateSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthorized]
+    throttle_scope = 'nibss'
     allowed_roles = ['CREDIT', 'IT']
     parser_classes = [JSONParser,]
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
             data = serializer.validated_data
+            if async_requested(request):
+                mandate_request = enqueue_request(RequestOperation.PROCESS_MANDATE, data, request.user)
+                return accepted_response(request, mandate_request)
             response = make_api_request(method="POST", endpoint=f"ndd/api/MandateRequest/BillerProcesMandate", payload=data)
             # If make_api_request returned a DRF Response, return it directly
             if isinstance(response, Response):
                 return response
             res = response.json()
+            invalidate_status(data.get("mandateCode"))
             asyncio.run(log_audit_event(
                 user=request.user,
-                action=f'PROCESS MANDATE',
-                details=f'Mandate code {data.get("mandateCode")} processed to {data.get("workflowStatus")}'
+                action=AuditAction.PROCESS_MANDATE,
+                details=f'Mandate code {data.get("mandateCode")} processed to {data.get("workflowStatus")}',
+                target_type=AuditTarget.MANDATE,
+                target_id=data.get("mandateCode"),
+                metadata={"workflowStatus": data.get("workflowStatus")}
             ))
             return Response({'status': 'success', 'message': 'Mandate processed successfully', 'data': res.get("data", {})}, status=response.status_code)
         except RequestException as e:
@@ -527,9 +614,9 @@ class ProcessMandateView(generics.GenericAPIView):
 class FetchMandateView(generics.GenericAPIView):
     serializer_class = FetchMandateSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'nibss'
     parser_classes = [JSONParser,]
 
-    @swagger_auto_schema(request_body=FetchMandateSerializer, responses={200:'OK', 401:'UNAUTHORIZED', 403:'FORBIDDEN', 500:'SERVER ERROR', 502:'BAD GATEWAY'})
     def post(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
@@ -537,7 +624,7 @@ class FetchMandateView(generics.GenericAPIView):
             data = serializer.validated_data
             endpoint="ndd/api/MandateRequest/FetchMandate/1/20"
             # endpoint="ndd/api/MandateRequest/FetchMandate?page=1&pageSize=20"
-            response = make_api_request(method="POST", endpoint=endpoint, payload=data)
+            response = make_api_request(method="POST", endpoint=endpoint, payload=data, coalesce=True)
             # If make_api_request returned a DRF Response, return it directly
             if isinstance(response, Response):
                 return response
@@ -575,13 +662,137 @@ class MandateListView(generics.GenericAPIView):
     """
     serializer_class = DBMandateSerializer
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
-    @swagger_auto_schema(responses={200:'OK', 401:'UNAUTHORIZED', 403:'FORBIDDEN', 500:'SERVER ERROR', 502:'BAD GATEWAY'})
+    @replica_reads
     def get(self, request, *args, **kwargs):
         try:
             queryset = Mandate.objects.all()
-            serializer = self.serializer_class(queryset, many=True)
-            return Response({'status': 'success', 'message': 'Fetched created mandate successfully', 'data': serializer.data}, status=status.HTTP_200_OK)
+            # Tuples straight from values_list, the serializer's output without building model instances
+            data = fast_rows(self.serializer_class, queryset)
+            return Response({'status': 'success', 'message': 'Fetched created mandate successfully', 'data': data}, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'status': 'error', 'error': f'{e}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class MandateSearchView(generics.GenericAPIView):
+    """
+        Mandate Management Endpoint
+
+        Search created mandates by payer or account name, email, subscriber code, account or phone number
+    """
+    serializer_class = MandateSearchResultSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MandateSearchPagination
+
+    @extend_schema(parameters=[MandateSearchSerializer])
+    @replica_reads
+    def get(self, request, *args, **kwargs):
+        params = MandateSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        try:
+            page = self.paginate_queryset(search_mandates(Mandate.objects.all(), params.validated_data['q']))
+            data = self.get_paginated_response(self.get_serializer(page, many=True).data).data
+            return Response({'status': 'success', 'message': 'Mandate search completed successfully', 'data': data}, status=status.HTTP_200_OK)
+        except APIException:
+            # e.g. NotFound for a page past the last one, answered by DRF with its own status
+            raise
+        except Exception as e:
+            general_logger.error(f"Mandate search failed: {e}")
+            return Response({'status': 'error', 'message': f'{e}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class MandateSummaryView(generics.GenericAPIView):
+    """
+        Mandate Reporting Endpoint
+
+        Number and total amount of created mandates per branch per day or month
+    """
+    serializer_class = MandateSummarySerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(parameters=[MandateSummarySerializer])
+    @replica_reads
+    def get(self, request, *args, **kwargs):
+        params = self.get_serializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        try:
+            rows = summarize(**params.validated_data)
+            data = {
+                'rows': rows,
+                'mandates': sum(row['mandates'] for row in rows),
+                'amount': sum(row['amount'] for row in rows),
+            }
+            return Response({'status': 'success', 'message': 'Mandate summary retrieved successfully', 'data': data}, status=status.HTTP_200_OK)
+        except Exception as e:
+            general_logger.error(f"Mandate summary failed: {e}")
+            return Response({'status': 'error', 'message': f'{e}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class MandateForecastView(generics.GenericAPIView):
+    """
+        Mandate Reporting Endpoint
+
+        Expected direct debits per day and branch from the amount, frequency and period of running mandates
+    """
+    serializer_class = MandateForecastSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(parameters=[MandateForecastSerializer])
+    @replica_reads
+    def get(self, request, *args, **kwargs):
+        params = self.get_serializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        try:
+            # Imported here so workers only load NumPy once a forecast is asked for
+            from .forecast import expected_collections
+            data = expected_collections(**params.validated_data)
+            return Response({'status': 'success', 'message': 'Collections forecast computed successfully', 'data': data}, status=status.HTTP_200_OK)
+        except Exception as e:
+            general_logger.error(f"Collections forecast failed: {e}")
+            return Response({'status': 'error', 'message': f'{e}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class MandateRequestStatusView(generics.RetrieveAPIView):
+    """
+        Mandate Management Endpoint
+
+        Track the status of a mandate request accepted for asynchronous processing
+    """
+    queryset = MandateRequest.objects.all()
+    serializer_class = MandateRequestSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    # Roles that may look up requests made by anyone, everyone else only sees their own
+    staff_roles = ['IT']
+
+    def get_queryset(self):
+        user = self.request.user
+        if getattr(user, 'role', None) in self.staff_roles:
+            return self.queryset
+        return self.queryset.filter(requested_by=user.email)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            instance = self.get_object()
+            serializer = self.get_serializer(instance)
+            return Response({'status': 'success', 'message': 'Mandate request fetched successfully', 'data': serializer.data}, status=status.HTTP_200_OK)
+        except Exception as e:
+            general_logger.error(f"Mandate request lookup failed: {e}")
+            return Response({'status': 'error', 'message': 'Mandate request not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+
+class OutboxMetricsView(views.APIView):
+    """
+        Mandate Management Endpoint
+
+        Depth and age of the NIBSS outbox waiting to be processed
+    """
+    serializer_class = None
+    permission_classes = [permissions.IsAuthenticated, IsAuthorized]
+    allowed_roles = ['IT']
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return Response({'status': 'success', 'message': 'Outbox metrics fetched successfully', 'data': outbox_stats()}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({'status': 'error', 'error': f'{e}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
\ No newline at end of file
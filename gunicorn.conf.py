@@ -0,0 +1,18 @@
+# gunicorn configuration for Prometheus multi-process metrics.
+# Export PROMETHEUS_MULTIPROC_DIR (an empty, writable directory) before starting gunicorn so every
+# worker writes its samples there and /metrics aggregates them across workers.
+import glob, os
+
+
+def on_starting(server):
+    # Samples left over from a previous run would be added to the new totals
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,12 +1,15 @@
-from django.core.mail import EmailMultiAlternatives
 from django.core.cache import cache
+from django.db import close_old_connections, transaction
 from django.conf import settings
 from rest_framework.response import Response
 from rest_framework import permissions
 from datetime import datetime
+from functools import wraps
 from requests.exceptions import RequestException
 from asgiref.sync import sync_to_async
-import logging, requests
+from core.timing import record_upstream, span
+from core.metrics import EMAIL_DISPATCH_QUEUE, NIBSS_COALESCED, NIBSS_REQUEST_SECONDS, NIBSS_RESPONSES, NIBSS_TIMEOUTS, NIBSS_TOKEN_CACHE, endpoint_label
+import logging, requests, hashlib, json, queue, threading, time, uuid
 
 
 # Get the email and general error logger
@@ -16,6 +19,7 @@ general_logger = logging.getLogger('general_logger')
 
 BILLER_ID='455'
 
+
 # Permission that checks if the user's role is allowed. It reads allowed_roles from the view.
 class IsAuthorized(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -27,24 +31,112 @@ class IsAuthorized(permissions.BasePermission):
         )
     
 
-# Async function to create audit log entry
-async def log_audit_event(user, action, details):
-    from accounts.models import AuditLog  # Local import to avoid circular imports
+# Writes the audit log row, run in a worker thread by log_audit_event
+def _record_audit_event(user, action, details, target_type, target_id, metadata, actor_id):
+    from accounts.models import AuditLog, UserModel  # Local import to avoid circular imports
+    if isinstance(user, str):
+        email = user
+        if actor_id is None:
+            # Only callers that kept the email alone, e.g. outbox requests queued before requester_id existed
+            actor_id = UserModel.objects.filter(email=user).values_list('id', flat=True).first()
+    else:
+        actor_id, email = user.id, user.email
+    AuditLog.objects.create(
+        user=email, actor_id=actor_id, action=action, details=details,
+        target_type=target_type, target_id='' if target_id is None else str(target_id), metadata=metadata or {},
+    )
+
+
+# user is the acting user, or their email together with actor_id (the user's id) when only those were kept.
+# target_type is an AuditTarget and metadata the event's identifiers as JSON
+async def log_audit_event(user, action, details='', target_type='', target_id='', metadata=None, actor_id=None):
     try:
-        await sync_to_async(AuditLog.objects.create)(
-            user=user, action=action, details=details
-        )
+        with span('audit'):
+            await sync_to_async(_record_audit_event)(user, action, details, target_type, target_id, metadata, actor_id)
     except Exception as e:
         await sync_to_async(general_logger.error)(f"Failed to create audit log: {str(e)}")
 
 
-# Asynchronous email sending
-def send_async_email(subject, message, recipient_list):
-    try:
-        email = EmailMultiAlternatives(subject, message, settings.DEFAULT_FROM_EMAIL, recipient_list)
-        email.send()
-    except Exception as e:
-        email_logger.error(f"Error sending email: {e}")
+class EmailDispatcher:
+    """
+    Bounded pool of worker threads that deliver emails from the email outbox as soon as they are queued.
+    Each worker sends its batch over one SMTP connection, keeps it open while there is work and closes it once idle.
+    Emails that fail here stay in the outbox and are retried by the send_queued_emails command.
+    """
+    idle_timeout = 30
+
+    def __init__(self, workers, batch_size, max_queue_size):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, email_id):
+        self._start()
+        try:
+            self.queue.put_nowait(email_id)
+            EMAIL_DISPATCH_QUEUE.inc()
+            return True
+        except queue.Full:
+            email_logger.error(f"Email queue is full, email {email_id} left for the outbox sender")
+            return False
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def _start(self):
+        if len(self._threads) >= self.workers:
+            return
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f'email-dispatcher-{len(self._threads)}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        from accounts.emails import claim_emails, send_emails  # Local import to avoid circular imports
+        connection = None
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.idle_timeout)]
+            except queue.Empty:
+                if connection is not None:
+                    connection.close()
+                    connection = None
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            EMAIL_DISPATCH_QUEUE.dec(len(batch))
+            try:
+                connection = send_emails(claim_emails(len(batch), ids=batch), connection)
+            except Exception as e:
+                email_logger.error(f"Email dispatcher failed to deliver batch: {e}")
+            finally:
+                close_old_connections()
+
+
+email_dispatcher = EmailDispatcher(
+    workers=settings.EMAIL_DISPATCH_WORKERS,
+    batch_size=settings.EMAIL_DISPATCH_BATCH_SIZE,
+    max_queue_size=settings.EMAIL_DISPATCH_QUEUE_SIZE,
+)
+
+
+# Store an email in the email outbox and hand it to the email dispatcher once committed
+def queue_email(subject, message, recipient_list):
+    from accounts.models import EmailOutbox  # Local import to avoid circular imports
+    email = EmailOutbox.objects.create(subject=subject, body=message, recipients=list(recipient_list))
+    transaction.on_commit(lambda: email_dispatcher.submit(email.pk))
+    return email
+
+
+# Number of emails waiting for the email dispatcher in this process
+def email_queue_depth():
+    return email_dispatcher.depth()
         
 
 # Format date
@@ -52,20 +144,109 @@ def format_date(date):
     return date.isoformat() if isinstance(date, datetime) else date
 
 
+# Fingerprint of the submitted data, uploaded files are represented by their name and size
+def request_fingerprint(request):
+    data = request.data.items() if hasattr(request.data, 'items') else enumerate(request.data)
+    normalized = {
+        str(key): f"{value.name}:{value.size}" if hasattr(value, 'read') else value
+        for key, value in data
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# Deletes KEYS[1] only while it still holds ARGV[1], in one step
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+# Release a cache lock taken with cache.add(key, token): once it has expired another request may hold it
+def release_lock(key, token):
+    if settings.CACHES['default']['BACKEND'].startswith('django_redis'):
+        from django_redis import get_redis_connection
+        # Compared with the value as django-redis stored it
+        get_redis_connection('default').eval(RELEASE_LOCK_SCRIPT, 1, cache.make_key(key), cache.client.encode(token))
+    elif cache.get(key) == token:
+        # The local memory cache is per process, the check and the delete are not atomic but only race within it
+        cache.delete(key)
+
+
+# Idempotency-Key support for write endpoints
+def idempotent(view_method):
+    """
+    Replays the stored response of the first request sent with the same Idempotency-Key header
+    instead of executing the view (and calling NIBSS) again. Duplicates that arrive while the
+    first request is still in flight wait for it to finish and receive its response.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if not idempotency_key:
+            return view_method(self, request, *args, **kwargs)
+        if len(idempotency_key) > 255:
+            return Response({"status": "error", "message": "Idempotency-Key must not exceed 255 characters"}, status=400)
+
+        scope = hashlib.sha256(f"{request.user.pk}:{request.path}:{idempotency_key}".encode()).hexdigest()
+        response_key, lock_key = f"idempotency:response:{scope}", f"idempotency:lock:{scope}"
+        fingerprint = request_fingerprint(request)
+        # Identifies this request's lock, duplicates share the fingerprint
+        lock_token = uuid.uuid4().hex
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+
+        while True:
+            if stored := cache.get(response_key):
+                if stored['fingerprint'] != fingerprint:
+                    return Response({"status": "error", "message": "Idempotency-Key was already used with a different payload"}, status=422)
+                general_logger.info(f"Replaying stored response for idempotency key on {request.path}")
+                response = Response(stored['data'], status=stored['status'])
+                response['Idempotent-Replayed'] = 'true'
+                return response
+            # Only one request per key may run at a time, the rest wait for its stored response
+            if cache.add(lock_key, lock_token, timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT):
+                break
+            if time.monotonic() >= deadline:
+                return Response({"status": "error", "message": "A request with this Idempotency-Key is still being processed"}, status=409)
+            time.sleep(0.2)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+            # Server errors are not stored so that the client can retry with the same key
+            if response.status_code < 500:
+                cache.set(response_key, {
+                    'fingerprint': fingerprint, 'status': response.status_code, 'data': response.data
+                }, timeout=settings.IDEMPOTENCY_KEY_TTL)
+            return response
+        finally:
+            release_lock(lock_key, lock_token)
+    return wrapper
+
+
 timeout = int(settings.API_REQUEST_TIMEOUT)
 
 
 # Request API Token
-def request_api_token():
+def request_api_token(endpoint=None):
     """
     Retrieves an API token from cache if available; otherwise fetches a new one from NIBSS API.
     Automatically caches the token with proper expiry handling.
+    The optional endpoint is the NIBSS path the token is requested for, used to label cache metrics.
     """
+    with span('token'):
+        return _request_api_token(endpoint)
+
+
+def _request_api_token(endpoint):
+    label = endpoint_label(endpoint) if endpoint else 'direct'
     if cached_token := cache.get('token_key'):
         general_logger.info("Using cached API token")
+        NIBSS_TOKEN_CACHE.labels(label, 'hit').inc()
         return cached_token
+    NIBSS_TOKEN_CACHE.labels(label, 'miss').inc()
 
-    url = "https://api.nibss-plc.com.ng/v2/reset"
+    url = f"{settings.NIBSS_BASE_URL}/v2/reset"
     headers = {"Content-Type": "application/x-www-form-urlencoded", "Accept": "*/*", "apikey": settings.API_KEY}
     payload = {
         "grant_type": "client_credentials",
@@ -74,8 +255,10 @@ def request_api_token():
         "scope": settings.SCOPE,
     }
 
+    started = time.perf_counter()
     try:
         response = requests.post(url, headers=headers, data=payload, timeout=timeout)
+        record_upstream_call("POST", "v2/reset", response.status_code, started)
         response.raise_for_status()
         data = response.json()
 
@@ -95,6 +278,7 @@ def request_api_token():
         general_logger.error(error_msg)
         raise RequestException(error_msg)
     except requests.exceptions.Timeout:
+        record_upstream_call("POST", "v2/reset", 'timeout', started)
         general_logger.error("API token request timed out")
         raise RequestException("Token request timed out")
     except Exception as e:
@@ -102,32 +286,103 @@ def request_api_token():
         raise RequestException(str(e))
     
 
+# Record latency and outcome of a NIBSS call, returns the timing fields for its log record
+def record_upstream_call(method, endpoint, status_code, started):
+    elapsed = time.perf_counter() - started
+    label = endpoint_label(endpoint)
+    NIBSS_REQUEST_SECONDS.labels(label, method.upper()).observe(elapsed)
+    NIBSS_RESPONSES.labels(label, str(status_code)).inc()
+    if status_code == 'timeout':
+        NIBSS_TIMEOUTS.labels(label).inc()
+    record_upstream({'endpoint': label, 'method': method.upper(), 'status': status_code, 'ms': round(elapsed * 1000, 2)})
+    return {
+        'upstream_method': method.upper(),
+        'upstream_endpoint': endpoint.split('?')[0],
+        'upstream_status': status_code,
+        'upstream_ms': round(elapsed * 1000, 2),
+    }
+
+
+class _Flight:
+    # One NIBSS call in progress and the callers waiting for its result
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _coalesced(key, endpoint, call):
+    """
+    Runs call() once for concurrent callers with the same key: the first caller makes the NIBSS call,
+    the others wait for it and get its result, error responses and timeouts included.
+    Followers only make their own call when the leader's call raised.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if leader:
+        try:
+            flight.result = call()
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with _flights_lock:
+                del _flights[key]
+            flight.done.set()
+        return flight.result
+
+    # No timeout of our own: the leader's call is bounded by the NIBSS request timeout and always sets done
+    flight.done.wait()
+    if flight.failed:
+        return call()
+    NIBSS_COALESCED.labels(endpoint_label(endpoint)).inc()
+    result = flight.result
+    # A DRF Response is rendered by the view that returns it, so every caller needs its own
+    if isinstance(result, Response):
+        return Response(result.data, status=result.status_code)
+    return result
+
+
 # Make API request function
-def make_api_request(method: str, endpoint: str, payload=None, params=None, files=None):
+def make_api_request(method: str, endpoint: str, payload=None, params=None, files=None, coalesce=False):
     """
     Makes an API request to the NIBSS endpoint using Bearer token authentication.
     Supports GET, POST, PUT and file uploads.
+    With coalesce=True (reads only) identical calls in flight in this process share one NIBSS call.
     """
+    if coalesce and not files:
+        key = (method.upper(), endpoint, json.dumps(payload, sort_keys=True, default=str), json.dumps(params, sort_keys=True, default=str))
+        return _coalesced(key, endpoint, lambda: make_api_request(method, endpoint, payload, params))
     try:
-        token = request_api_token()
+        token = request_api_token(endpoint)
     except RequestException as e:
         return Response({"status": "error", "message": str(e)}, status=500)
 
-    url = f"https://api.nibss-plc.com.ng/{endpoint.lstrip('/')}"
+    url = f"{settings.NIBSS_BASE_URL}/{endpoint.lstrip('/')}"
     headers = {"Authorization": f"Bearer {token}"}
+    started = time.perf_counter()
     try:
-        general_logger.info(f"Making API request: {method.upper()} {url}")
-        if method.upper() == "GET":
-            response = requests.get(url, headers=headers, params=params, timeout=timeout)
-        elif method.upper() == "POST":
-            if files:
-                response = requests.post(url, headers=headers, data=payload, files=files, timeout=timeout)
+        with span('nibss'):
+            if method.upper() == "GET":
+                response = requests.get(url, headers=headers, params=params, timeout=timeout)
+            elif method.upper() == "POST":
+                if files:
+                    response = requests.post(url, headers=headers, data=payload, files=files, timeout=timeout)
+                else:
+                    response = requests.post(url, headers=headers, json=payload, timeout=timeout)
+            elif method.upper() == "PUT":
+                response = requests.put(url, headers=headers, json=payload, timeout=timeout)
             else:
-                response = requests.post(url, headers=headers, json=payload, timeout=timeout)
-        elif method.upper() == "PUT":
-            response = requests.put(url, headers=headers, json=payload, timeout=timeout)
-        else:
-            raise ValueError(f"Unsupported HTTP method: {method}")
+                raise ValueError(f"Unsupported HTTP method: {method}")
+        log_extra = record_upstream_call(method, endpoint, response.status_code, started)
+        general_logger.info(f"API request: {method.upper()} {url} -> {response.status_code} in {log_extra['upstream_ms']}ms", extra=log_extra)
         # Raise exception for 4xx & 5xx responses
         response.raise_for_status()
         return response
@@ -139,9 +394,10 @@ def make_api_request(method: str, endpoint: str, payload=None, params=None, file
         general_logger.error(f"API request failed: {error_message}")
         return Response({"status": "error", "message": error_message}, status=response.status_code)
     except requests.exceptions.Timeout:
-        general_logger.error(f"API request timed out for {url}")
+        general_logger.error(f"API request timed out for {url}", extra=record_upstream_call(method, endpoint, 'timeout', started))
         return Response({"status": "error", "message": "Request timed out"}, status=504)
     except Exception as e:
+        record_upstream_call(method, endpoint, 'error', started)
         general_logger.error(f"Unexpected API request error: {e}")
         return Response({"status": "error", "message": str(e)}, status=500)
     
\ No newline at end of file